@@ -1,3 +1,4 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
@@ -13,12 +14,72 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Take the client address from the headers set by trusted reverse proxies
+    proxies = app.config.get('TRUSTED_PROXY_COUNT', 0)
+    if proxies:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
+    
     # Initialize extensions
+    from app.utils.database import engine_options, engine_pool
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
     db.init_app(app)
+    engine_pool.init_app(app)
     jwt.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
     CORS(app, origins=app.config['CORS_ORIGINS'])
     
+    # Initialize catalog search backends
+    from app.services.search_index import product_index
+    from app.services.fulltext import fulltext_search
+    from app.services.facet_index import product_facets
+    from app.services.embedding_index import product_embeddings
+    product_index.init_app(app)
+    fulltext_search.init_app(app)
+    product_facets.init_app(app)
+    product_embeddings.init_app(app)
+    
+    # Initialize the bounded password hashing pool and login admission control
+    from app.services.passwords import password_hasher
+    from app.services.login_throttle import login_throttle
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+    
+    # Initialize cached user profiles and deferred last_login writes
+    from app.services.user_cache import user_cache
+    user_cache.init_app(app)
+    
+    # Initialize chat message persistence (synchronous or write-behind)
+    from app.services.chat_writer import chat_writer
+    chat_writer.init_app(app)
+    
+    # Initialize cached catalog summary (category counts, sample products)
+    from app.services.catalog_summary import catalog_summary
+    catalog_summary.init_app(app)
+    
+    # Initialize cache of product detail and category list responses
+    from app.services.catalog_cache import catalog_cache
+    catalog_cache.init_app(app)
+    
+    # Initialize cache of product listing totals
+    from app.services.listing_counts import listing_counts
+    listing_counts.init_app(app)
+    
+    # Initialize co-occurrence product recommendations
+    from app.services.recommender import recommender
+    recommender.init_app(app)
+    
+    # Expose per-request SQL statement counts for N+1 regression checks
+    if app.config.get('QUERY_COUNT_HEADER'):
+        from app.utils.query_counter import init_query_counter
+        init_query_counter(app)
+    
+    # Chat requests wait on their LLM calls; some threads must stay free for everything else
+    llm_slots = app.config.get('LLM_MAX_CONCURRENCY', 4) + app.config.get('LLM_MAX_QUEUE', 2)
+    if llm_slots >= app.config.get('WEB_THREADS', 8):
+        print(f"Warning: LLM_MAX_CONCURRENCY + LLM_MAX_QUEUE ({llm_slots}) is not below the "
+              f"{app.config.get('WEB_THREADS', 8)} request threads; slow LLM calls can hold every thread.")
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.products import products_bp
@@ -35,4 +96,27 @@ def create_app(config_name='default'):
     def health_check():
         return {'status': 'healthy', 'message': 'E-commerce Chatbot API is running'}
     
+    # Runtime metrics (LLM pool utilization, caches, ...)
+    from app.utils.metrics import register_metrics, collect_metrics, metrics_authorized
+    from app.services.chat_service import get_chat_service
+    register_metrics(app, 'db_pool', engine_pool.metrics)
+    register_metrics(app, 'llm_dispatcher', lambda: get_chat_service().dispatcher.metrics())
+    register_metrics(app, 'llm_provider', lambda: get_chat_service().llm.metrics() if get_chat_service().llm else None)
+    register_metrics(app, 'llm_coalescing', lambda: get_chat_service().in_flight.metrics())
+    register_metrics(app, 'response_cache', lambda: get_chat_service().response_cache.metrics())
+    register_metrics(app, 'catalog_cache', lambda: catalog_cache.backend.metrics())
+    register_metrics(app, 'listing_count_cache', lambda: listing_counts.cache.metrics())
+    register_metrics(app, 'recommender', recommender.metrics)
+    register_metrics(app, 'password_hasher', password_hasher.metrics)
+    register_metrics(app, 'login_throttle', login_throttle.metrics)
+    register_metrics(app, 'user_cache', user_cache.metrics)
+    register_metrics(app, 'chat_writer', chat_writer.metrics)
+    
+    # Pool and throttle saturation is not for the public; not found without the token
+    @app.route('/api/metrics')
+    def metrics():
+        if not metrics_authorized():
+            return {'error': 'Not found'}, 404
+        return collect_metrics()
+    
     return app
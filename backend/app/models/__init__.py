@@ -1,6 +1,7 @@
 from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload
 from app import db
-import bcrypt
+from app.services.passwords import password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -21,11 +22,17 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Check if provided password matches hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Check if provided password matches hash, rehashing it if BCRYPT_ROUNDS changed"""
+        if not password_hasher.verify(password, self.password_hash):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            # Saved with the caller's next commit
+            self.set_password(password)
+            password_hasher.record_rehash()
+        return True
     
     def to_dict(self):
         return {
@@ -104,6 +111,10 @@ class Category(db.Model):
 
 class ChatSession(db.Model):
     __tablename__ = 'chat_sessions'
+    __table_args__ = (
+        # A user's sessions, most recently updated first
+        db.Index('ix_chat_sessions_user_id_updated_at', 'user_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -127,6 +138,10 @@ class ChatSession(db.Model):
 
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        # A session's messages in time order
+        db.Index('ix_chat_messages_session_id_timestamp', 'session_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_sessions.id'), nullable=False)
@@ -147,6 +162,10 @@ class ChatMessage(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # A user's orders, newest first
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -197,3 +216,15 @@ class OrderItem(db.Model):
             'unit_price': float(self.unit_price),
             'total_price': float(self.total_price)
         }
+
+
+# Loading plans: loader options matching what each to_dict() reads, so
+# endpoints can serialize a page of rows without per-row lazy loads.
+
+def product_loading_plan():
+    """Load the category that Product.to_dict reads"""
+    return joinedload(Product.category)
+
+def order_loading_plan():
+    """Load order items and their products that Order.to_dict reads"""
+    return selectinload(Order.items).joinedload(OrderItem.product)
@@ -1,11 +1,21 @@
+import math
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from datetime import datetime
 from app import db
 from app.models import User
+from app.services.passwords import PasswordHasherBusyError
+from app.services.login_throttle import login_throttle
+from app.services.user_cache import user_cache
 
 auth_bp = Blueprint('auth', __name__)
 
+def _busy_response():
+    """503 for when the password hashing pool is full"""
+    response = jsonify({'error': 'The server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -32,13 +42,16 @@ def register():
             first_name=data['first_name'],
             last_name=data['last_name']
         )
-        user.set_password(data['password'])
+        try:
+            user.set_password(data['password'])
+        except PasswordHasherBusyError:
+            return _busy_response()
         
         db.session.add(user)
         db.session.commit()
         
         # Create access token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=str(user.id))
         
         return jsonify({
             'message': 'User registered successfully',
@@ -59,28 +72,45 @@ def login():
         if not data.get('username') or not data.get('password'):
             return jsonify({'error': 'Username and password are required'}), 400
         
+        # Turn away floods from one address or against one account before hashing anything
+        retry_after = login_throttle.admit(request.remote_addr or 'unknown', data['username'])
+        if retry_after:
+            response = jsonify({'error': 'Too many login attempts, please try again later'})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+        
         # Find user by username or email
         user = User.query.filter(
             (User.username == data['username']) | (User.email == data['username'])
         ).first()
         
-        if not user or not user.check_password(data['password']):
+        try:
+            authenticated = user is not None and user.check_password(data['password'])
+        except PasswordHasherBusyError:
+            login_throttle.release(data['username'])
+            return _busy_response()
+        
+        if not authenticated:
+            login_throttle.record_failure(data['username'])
             return jsonify({'error': 'Invalid credentials'}), 401
+        login_throttle.record_success(data['username'])
         
         if not user.is_active:
             return jsonify({'error': 'Account is disabled'}), 401
         
-        # Update last login
-        user.last_login = datetime.utcnow()
-        db.session.commit()
+        # Save a hash upgraded by check_password; last login is written in the background
+        if db.session.is_modified(user):
+            db.session.commit()
+        logged_in_at = datetime.utcnow()
+        user_cache.record_login(user.id, logged_in_at)
         
         # Create access token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=str(user.id))
         
         return jsonify({
             'message': 'Login successful',
             'access_token': access_token,
-            'user': user.to_dict()
+            'user': {**user.to_dict(), 'last_login': logged_in_at.isoformat()}
         }), 200
         
     except Exception as e:
@@ -91,13 +121,12 @@ def login():
 def get_current_user():
     """Get current authenticated user"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = user_cache.profile(get_jwt_identity())
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()}), 200
+        return jsonify({'user': user}), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get user', 'details': str(e)}), 500
@@ -1,14 +1,51 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 import uuid
-import re
+import json
 from app import db
 from app.models import ChatSession, ChatMessage, Product, Category
-from app.services.chat_service import ChatService
+from app.services.chat_service import get_chat_service
+from app.services.chat_writer import PendingMessage, chat_writer, unwritten
+from app.utils.pagination import keyset_paginate, page_size, InvalidCursor
 
 chat_bp = Blueprint('chat', __name__)
 
+def _find_session(user_id, session_token):
+    """Return the user's active chat session for session_token, if any"""
+    if not session_token:
+        return None
+    return ChatSession.query.filter_by(
+        session_token=session_token,
+        user_id=user_id,
+        is_active=True
+    ).first()
+
+def _get_or_create_session(user_id, session_token, session=None):
+    """Return the user's active chat session, creating one if needed"""
+    if session is None:
+        session = _find_session(user_id, session_token)
+    
+    if not session:
+        session = ChatSession(
+            user_id=user_id,
+            session_token=str(uuid.uuid4())
+        )
+        db.session.add(session)
+        db.session.flush()
+    
+    return session
+
+def _busy_response():
+    """503 for a message that needs the LLM while every LLM slot is taken; nothing is saved"""
+    response = jsonify({'error': 'The assistant is busy right now, please try again in a moment'})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def _sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @chat_bp.route('/message', methods=['POST'])
 @jwt_required()
 def send_message():
@@ -20,67 +57,131 @@ def send_message():
         if not data.get('message'):
             return jsonify({'error': 'Message is required'}), 400
         
-        session_token = data.get('session_token')
+        # Generate the response before writing anything, so no write
+        # transaction is held open while the LLM is working
+        received_at = datetime.utcnow()
+        session = _find_session(user_id, data.get('session_token'))
+        chat_service = get_chat_service()
+        bot_response = chat_service.process_message(data['message'], session.id if session else None)
+        if bot_response.get('metadata', {}).get('reason') == 'llm_busy':
+            return _busy_response()
         
         # Get or create chat session
-        if session_token:
-            session = ChatSession.query.filter_by(
-                session_token=session_token,
-                user_id=user_id,
-                is_active=True
-            ).first()
-        else:
-            session = None
-        
-        if not session:
-            session = ChatSession(
-                user_id=user_id,
-                session_token=str(uuid.uuid4())
-            )
-            db.session.add(session)
-            db.session.flush()
-        
-        # Save user message
-        user_message = ChatMessage(
-            session_id=session.id,
-            message_type='user',
-            content=data['message']
-        )
-        db.session.add(user_message)
-        
-        # Process message and generate response
-        chat_service = ChatService()
-        bot_response = chat_service.process_message(data['message'], session.id)
-          # Save bot response
-        bot_message = ChatMessage(
-            session_id=session.id,
-            message_type='bot',
-            content=bot_response['content'],
-            extra_data=bot_response.get('metadata')
-        )
-        db.session.add(bot_message)
+        session = _get_or_create_session(user_id, data.get('session_token'), session)
         
-        # Update session timestamp
-        session.updated_at = datetime.utcnow()
-        db.session.commit()
+        # Save the user message and bot response, and update the session timestamp
+        user_message, bot_message = chat_writer.save(session.id, [
+            PendingMessage(session.id, 'user', data['message'], timestamp=received_at),
+            PendingMessage(session.id, 'bot', bot_response['content'], bot_response.get('metadata'))
+        ])
         
         return jsonify({
             'session_token': session.session_token,
-            'user_message': user_message.to_dict(),
-            'bot_response': bot_message.to_dict()
+            'user_message': user_message,
+            'bot_response': bot_message
         }), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to process message', 'details': str(e)}), 500
 
+@chat_bp.route('/message/stream', methods=['POST'])
+@jwt_required()
+def stream_message():
+    """Process chat message and stream the bot response as Server-Sent Events
+    
+    Events: 'session' (session token and saved user message), 'chunk' (a piece
+    of response text), then 'done' (the saved bot message) or 'error'.
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        if not data.get('message'):
+            return jsonify({'error': 'Message is required'}), 400
+        
+        # Refuse up front while it can still be a 503; a stream that loses the
+        # race for the last slot answers with the busy message instead
+        if get_chat_service().llm_busy(data['message']):
+            return _busy_response()
+        
+        session = _get_or_create_session(user_id, data.get('session_token'))
+        user_message = PendingMessage(session.id, 'user', data['message'])
+        if chat_writer.write_behind:
+            # Queued together with the response, or alone if the stream is dropped
+            db.session.commit()
+            user_message_id = None
+            user_message_data = user_message.to_dict()
+        else:
+            # Save the user message up front so it survives a dropped stream
+            saved = ChatMessage(**user_message.row())
+            db.session.add(saved)
+            db.session.commit()
+            user_message_id = saved.id
+            user_message_data = saved.to_dict()
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to process message', 'details': str(e)}), 500
+    
+    session_id = session.id
+    session_token = session.session_token
+    message = data['message']
+    
+    def generate():
+        # Turn messages still to be handed to the write-behind queue
+        unsaved = [user_message] if user_message_id is None else []
+        try:
+            yield _sse_event('session', {
+                'session_token': session_token,
+                'user_message': user_message_data
+            })
+            
+            bot_response = None
+            for item in get_chat_service().stream_message(message, session_id, user_message_id):
+                if 'delta' in item:
+                    yield _sse_event('chunk', {'content': item['delta']})
+                else:
+                    bot_response = item['response']
+            
+            # Persist the bot message once the stream has completed
+            bot_message = PendingMessage(session_id, 'bot', bot_response['content'], bot_response.get('metadata'))
+            saved = chat_writer.save(session_id, unsaved + [bot_message])
+            unsaved = []
+            
+            yield _sse_event('done', {
+                'session_token': session_token,
+                'bot_response': saved[-1]
+            })
+            
+        except Exception as e:
+            db.session.rollback()
+            yield _sse_event('error', {'error': 'Failed to process message', 'details': str(e)})
+        finally:
+            if unsaved:
+                chat_writer.save(session_id, unsaved)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @chat_bp.route('/history', methods=['GET'])
 @jwt_required()
 def get_chat_history():
-    """Get chat history for current session"""
+    """Get chat history for current session
+    
+    Pass ``cursor`` (empty for the latest messages) to page backwards through
+    long histories; each page is in chronological order and ``next_cursor``
+    points to the older messages before it.
+    
+    With write-behind chat persistence, messages this process has not written
+    yet are included (on the first page) with a null id.
+    """
     try:
         user_id = get_jwt_identity()
         session_token = request.args.get('session_token')
+        cursor = request.args.get('cursor')
         
         if not session_token:
             return jsonify({'error': 'Session token is required'}), 400
@@ -93,25 +194,67 @@ def get_chat_history():
         if not session:
             return jsonify({'error': 'Session not found'}), 404
         
+        # Taken before loading, so a message written in between shows up in the load
+        pending = chat_writer.pending(session.id) if not cursor else []
+        
+        if cursor is not None:
+            per_page = page_size(50)
+            messages, next_cursor = keyset_paginate(
+                ChatMessage.query.filter_by(session_id=session.id),
+                [ChatMessage.timestamp, ChatMessage.id], cursor, per_page, descending=True
+            )
+            messages = list(reversed(messages)) + unwritten(pending, messages)
+            return jsonify({
+                'session': session.to_dict(),
+                'messages': [message.to_dict() for message in messages],
+                'pagination': {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'has_next': next_cursor is not None
+                }
+            }), 200
+        
         messages = ChatMessage.query.filter_by(session_id=session.id)\
                                    .order_by(ChatMessage.timestamp.asc()).all()
+        messages += unwritten(pending, messages)
         
         return jsonify({
             'session': session.to_dict(),
             'messages': [message.to_dict() for message in messages]
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get chat history', 'details': str(e)}), 500
 
 @chat_bp.route('/sessions', methods=['GET'])
 @jwt_required()
 def get_chat_sessions():
-    """Get all chat sessions for user"""
+    """Get all chat sessions for user, most recently updated first
+    
+    Pass ``cursor`` (empty for the first page) to use keyset pagination
+    instead of page numbers; responses then carry ``next_cursor``.
+    """
     try:
         user_id = get_jwt_identity()
+        cursor = request.args.get('cursor')
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        per_page = page_size(20)
+        
+        if cursor is not None:
+            sessions, next_cursor = keyset_paginate(
+                ChatSession.query.filter_by(user_id=user_id),
+                [ChatSession.updated_at, ChatSession.id], cursor, per_page, descending=True
+            )
+            return jsonify({
+                'sessions': [session.to_dict() for session in sessions],
+                'pagination': {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'has_next': next_cursor is not None
+                }
+            }), 200
         
         sessions = ChatSession.query.filter_by(user_id=user_id)\
                                    .order_by(ChatSession.updated_at.desc())\
@@ -127,6 +270,8 @@ def get_chat_sessions():
             }
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get chat sessions', 'details': str(e)}), 500
 
@@ -148,6 +293,7 @@ def reset_chat():
             if session:
                 session.is_active = False
                 db.session.commit()
+                get_chat_service().conversation.forget(session.id)
         
         return jsonify({'message': 'Chat session reset successfully'}), 200
         
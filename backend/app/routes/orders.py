@@ -1,9 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-import uuid
+from sqlalchemy import update
 from app import db
-from app.models import Order, OrderItem, Product, User
+from app.models import Order, Product, order_loading_plan
+from app.services.order_service import place_order, place_orders, OrderError, STOCK_COLUMNS
+from app.utils.pagination import keyset_paginate, page_size, InvalidCursor
 
 orders_bp = Blueprint('orders', __name__)
 
@@ -15,94 +17,115 @@ def create_order():
         user_id = get_jwt_identity()
         data = request.get_json()
         
-        # Validate required fields
-        if not data.get('items') or not isinstance(data['items'], list):
-            return jsonify({'error': 'Order items are required'}), 400
-        
-        if not data.get('shipping_address'):
-            return jsonify({'error': 'Shipping address is required'}), 400
-        
-        # Calculate total amount and validate items
-        total_amount = 0
-        order_items = []
-        
-        for item_data in data['items']:
-            product_id = item_data.get('product_id')
-            quantity = item_data.get('quantity', 1)
-            
-            if not product_id or quantity <= 0:
-                return jsonify({'error': 'Invalid item data'}), 400
-            
-            product = Product.query.get(product_id)
-            if not product or not product.is_active:
-                return jsonify({'error': f'Product {product_id} not found'}), 404
-            
-            if product.stock_quantity < quantity:
-                return jsonify({'error': f'Insufficient stock for {product.name}'}), 400
-            
-            item_total = float(product.price) * quantity
-            total_amount += item_total
-            
-            order_items.append({
-                'product': product,
-                'quantity': quantity,
-                'unit_price': product.price,
-                'total_price': item_total
-            })
-        
-        # Create order
-        order = Order(
-            user_id=user_id,
-            order_number=f'ORD-{uuid.uuid4().hex[:8].upper()}',
-            total_amount=total_amount,
-            shipping_address=data['shipping_address'],
-            billing_address=data.get('billing_address', data['shipping_address']),
-            payment_method=data.get('payment_method', 'card')
-        )
-        
-        db.session.add(order)
-        db.session.flush()
-        
-        # Create order items and update stock
-        for item_data in order_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data['product'].id,
-                quantity=item_data['quantity'],
-                unit_price=item_data['unit_price'],
-                total_price=item_data['total_price']
-            )
-            db.session.add(order_item)
-            
-            # Update product stock
-            item_data['product'].stock_quantity -= item_data['quantity']
+        order = place_order(user_id, data)
         
+        # Serialize before committing, while the products are still loaded
+        order_data = order.to_dict()
         db.session.commit()
         
         return jsonify({
             'message': 'Order created successfully',
-            'order': order.to_dict()
+            'order': order_data
         }), 201
         
+    except OrderError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to create order', 'details': str(e)}), 500
 
+@orders_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def create_orders_batch():
+    """Create many orders in one transaction
+    
+    Takes ``orders`` (a list of create-order payloads) and reports success or
+    failure per order, in the same order. Orders that can be placed are
+    created even if others fail, unless ``atomic`` is true, in which case
+    either every order is created or none is.
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        orders_data = data.get('orders')
+        atomic = bool(data.get('atomic', False))
+        max_orders = current_app.config.get('ORDER_BATCH_MAX_ORDERS', 100)
+        
+        if not orders_data or not isinstance(orders_data, list):
+            return jsonify({'error': 'Orders are required'}), 400
+        
+        if len(orders_data) > max_orders:
+            return jsonify({'error': f'At most {max_orders} orders can be placed in one batch'}), 400
+        
+        results = place_orders(user_id, orders_data)
+        failed = sum(1 for result in results if not result.ok)
+        
+        if atomic and failed:
+            db.session.rollback()
+            return jsonify({
+                'results': [
+                    {'index': index, 'success': False, 'error': result.error.message, 'status': result.error.status_code}
+                    if not result.ok else
+                    {'index': index, 'success': False, 'error': 'Not created because another order in the batch failed', 'status': 409}
+                    for index, result in enumerate(results)
+                ],
+                'created': 0,
+                'failed': len(results)
+            }), 400
+        
+        # Serialize before committing, while the products are still loaded
+        response = {
+            'results': [
+                {'index': index, 'success': True, 'order': result.order.to_dict()}
+                if result.ok else
+                {'index': index, 'success': False, 'error': result.error.message, 'status': result.error.status_code}
+                for index, result in enumerate(results)
+            ],
+            'created': len(results) - failed,
+            'failed': failed
+        }
+        db.session.commit()
+        
+        return jsonify(response), 201 if not failed else 200 if failed < len(results) else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create orders', 'details': str(e)}), 500
+
 @orders_bp.route('', methods=['GET'])
 @jwt_required()
 def get_orders():
-    """Get user's orders"""
+    """Get user's orders, newest first
+    
+    Pass ``cursor`` (empty for the first page) to use keyset pagination
+    instead of page numbers; responses then carry ``next_cursor``.
+    """
     try:
         user_id = get_jwt_identity()
+        cursor = request.args.get('cursor')
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        per_page = page_size(20)
         status = request.args.get('status')
         
-        query = Order.query.filter_by(user_id=user_id)
+        query = Order.query.options(order_loading_plan()).filter_by(user_id=user_id)
         
         if status:
             query = query.filter_by(status=status)
         
+        if cursor is not None:
+            orders, next_cursor = keyset_paginate(
+                query, [Order.created_at, Order.id], cursor, per_page, descending=True
+            )
+            return jsonify({
+                'orders': [order.to_dict() for order in orders],
+                'pagination': {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'has_next': next_cursor is not None
+                }
+            }), 200
+        
         orders = query.order_by(Order.created_at.desc())\
                      .paginate(page=page, per_page=per_page, error_out=False)
         
@@ -116,6 +139,8 @@ def get_orders():
             }
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get orders', 'details': str(e)}), 500
 
@@ -125,7 +150,8 @@ def get_order(order_id):
     """Get specific order"""
     try:
         user_id = get_jwt_identity()
-        order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+        order = Order.query.options(order_loading_plan())\
+                           .filter_by(id=order_id, user_id=user_id).first()
         
         if not order:
             return jsonify({'error': 'Order not found'}), 404
@@ -141,7 +167,8 @@ def cancel_order(order_id):
     """Cancel an order"""
     try:
         user_id = get_jwt_identity()
-        order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+        order = Order.query.options(order_loading_plan())\
+                           .filter_by(id=order_id, user_id=user_id).first()
         
         if not order:
             return jsonify({'error': 'Order not found'}), 404
@@ -149,12 +176,28 @@ def cancel_order(order_id):
         if order.status not in ['pending', 'confirmed']:
             return jsonify({'error': 'Order cannot be cancelled'}), 400
         
-        # Restore product stock
-        for item in order.items:
-            item.product.stock_quantity += item.quantity
+        # Only one of two concurrent cancellations may give the stock back
+        cancelled = db.session.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.status.in_(['pending', 'confirmed']))
+            .values(status='cancelled', updated_at=datetime.utcnow())
+        )
+        if cancelled.rowcount != 1:
+            db.session.rollback()
+            return jsonify({'error': 'Order cannot be cancelled'}), 400
         
-        order.status = 'cancelled'
-        order.updated_at = datetime.utcnow()
+        # Restore product stock in the database, not from the quantities read
+        # above, so a concurrent checkout's decrement is not overwritten
+        restored = {}
+        for item in order.items:
+            restored[item.product_id] = restored.get(item.product_id, 0) + item.quantity
+        for product_id in sorted(restored):
+            db.session.execute(
+                update(Product)
+                .where(Product.id == product_id)
+                .values(stock_quantity=Product.stock_quantity + restored[product_id])
+                .execution_options(updated_columns=STOCK_COLUMNS)
+            )
         
         db.session.commit()
         
@@ -1,17 +1,55 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_, and_
 from app import db
-from app.models import Product, Category
+from app.models import Product, Category, product_loading_plan
+from app.services import product_search
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog_summary import catalog_summary
+from app.services.facet_index import product_facets
+from app.services.listing_counts import listing_counts
+from app.services.recommender import recommender
+from app.utils.pagination import keyset_paginate, page_size, InvalidCursor
 
 products_bp = Blueprint('products', __name__)
 
+def _facets(category_id, brand, min_price, max_price, search):
+    """Facet counts for a product listing's filters"""
+    restrict_to = None
+    if search:
+        # Text matching is left to the database; one id-only query
+        restrict_to = {
+            row.id for row in db.session.query(Product.id)
+                                        .filter(Product.is_active == True, product_search.search_filter(search))
+        }
+    return product_facets.facets(
+        catalog_summary.get()['categories'],
+        category_id=category_id or None,
+        brand=brand,
+        min_price=min_price,
+        max_price=max_price,
+        restrict_to=restrict_to
+    )
+
 @products_bp.route('', methods=['GET'])
 def get_products():
-    """Get products with optional filtering and pagination"""
+    """Get products with optional filtering and pagination
+    
+    Pass ``cursor`` (empty for the first page) to use keyset pagination
+    instead of page numbers; responses then carry ``next_cursor``. With
+    ``facets=true`` the response also holds per-category, per-brand and
+    price range counts for the current filters.
+    
+    ``total`` picks how page-number responses count matching products:
+    ``cached`` (default) reuses a recent count for the same filters,
+    ``exact`` always counts, and ``none`` skips the count and only reports
+    whether there is a next page.
+    """
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        cursor = request.args.get('cursor')
+        include_facets = request.args.get('facets', 'false').lower() == 'true'
+        total_mode = request.args.get('total', 'cached')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = page_size(20)
         category_id = request.args.get('category_id', type=int)
         brand = request.args.get('brand')
         min_price = request.args.get('min_price', type=float)
@@ -21,7 +59,7 @@ def get_products():
         sort_order = request.args.get('sort_order', 'asc')
         
         # Build query
-        query = Product.query.filter(Product.is_active == True)
+        query = Product.query.options(product_loading_plan()).filter(Product.is_active == True)
         
         # Apply filters
         if category_id:
@@ -37,14 +75,7 @@ def get_products():
             query = query.filter(Product.price <= max_price)
         
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                or_(
-                    Product.name.ilike(search_term),
-                    Product.description.ilike(search_term),
-                    Product.brand.ilike(search_term)
-                )
-            )
+            query = query.filter(product_search.search_filter(search))
         
         # Apply sorting
         if sort_by == 'name':
@@ -58,30 +89,57 @@ def get_products():
         else:
             order_column = Product.name
         
-        if sort_order == 'desc':
-            query = query.order_by(order_column.desc())
+        if cursor is not None:
+            products, next_cursor = keyset_paginate(
+                query, [order_column, Product.id], cursor, per_page, descending=sort_order == 'desc'
+            )
+            result = {
+                'products': [product.to_dict() for product in products],
+                'pagination': {
+                    'per_page': per_page,
+                    'next_cursor': next_cursor,
+                    'has_next': next_cursor is not None
+                }
+            }
         else:
-            query = query.order_by(order_column.asc())
-        
-        # Paginate
-        products = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        return jsonify({
-            'products': [product.to_dict() for product in products.items],
-            'pagination': {
+            if sort_order == 'desc':
+                query = query.order_by(order_column.desc())
+            else:
+                query = query.order_by(order_column.asc())
+            
+            # Paginate, fetching one extra row to tell whether there is a next page
+            products = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+            
+            pagination = {
                 'page': page,
                 'per_page': per_page,
-                'total': products.total,
-                'pages': products.pages,
-                'has_next': products.has_next,
-                'has_prev': products.has_prev
+                'has_next': len(products) > per_page,
+                'has_prev': page > 1
             }
-        }), 200
+            
+            if total_mode != 'none':
+                if total_mode == 'exact':
+                    total = query.order_by(None).count()
+                else:
+                    total = listing_counts.count(query, {
+                        'category_id': category_id, 'brand': brand, 'min_price': min_price,
+                        'max_price': max_price, 'search': search
+                    })
+                pagination['total'] = total
+                pagination['pages'] = (total + per_page - 1) // per_page
+            
+            result = {
+                'products': [product.to_dict() for product in products[:per_page]],
+                'pagination': pagination
+            }
+        
+        if include_facets:
+            result['facets'] = _facets(category_id, brand, min_price, max_price, search)
         
+        return jsonify(result), 200
+        
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get products', 'details': str(e)}), 500
 
@@ -89,12 +147,18 @@ def get_products():
 def get_product(product_id):
     """Get specific product by ID"""
     try:
-        product = Product.query.filter_by(id=product_id, is_active=True).first()
-        
-        if not product:
+        def build():
+            product = Product.query.options(product_loading_plan())\
+                                   .filter_by(id=product_id, is_active=True).first()
+            if not product:
+                return None
+            return {'product': product.to_dict()}, product.updated_at or product.created_at
+        
+        entry = catalog_cache.get_or_build(f'product:{product_id}', build)
+        if entry is None:
             return jsonify({'error': 'Product not found'}), 404
         
-        return jsonify({'product': product.to_dict()}), 200
+        return catalog_cache.response(entry)
         
     except Exception as e:
         return jsonify({'error': 'Failed to get product', 'details': str(e)}), 500
@@ -107,18 +171,8 @@ def search_products():
         if not query_text:
             return jsonify({'error': 'Search query is required'}), 400
         
-        # Perform search
-        search_term = f'%{query_text}%'
-        products = Product.query.filter(
-            and_(
-                Product.is_active == True,
-                or_(
-                    Product.name.ilike(search_term),
-                    Product.description.ilike(search_term),
-                    Product.brand.ilike(search_term)
-                )
-            )
-        ).limit(50).all()
+        # Perform ranked search
+        products = product_search.search_products(query_text, limit=50)
         
         return jsonify({
             'products': [product.to_dict() for product in products],
@@ -133,11 +187,12 @@ def search_products():
 def get_categories():
     """Get all product categories"""
     try:
-        categories = Category.query.filter_by(is_active=True).all()
+        def build():
+            categories = Category.query.filter_by(is_active=True).all()
+            # Categories carry no modification time; clients revalidate by ETag
+            return {'categories': [category.to_dict() for category in categories]}, None
         
-        return jsonify({
-            'categories': [category.to_dict() for category in categories]
-        }), 200
+        return catalog_cache.response(catalog_cache.get_or_build('categories', build))
         
     except Exception as e:
         return jsonify({'error': 'Failed to get categories', 'details': str(e)}), 500
@@ -145,15 +200,16 @@ def get_categories():
 @products_bp.route('/recommendations', methods=['GET'])
 @jwt_required()
 def get_recommendations():
-    """Get product recommendations for user"""
+    """Get product recommendations for user
+    
+    Products often bought or browsed together with the user's orders and
+    chat results, topped up with popular products.
+    """
     try:
         user_id = get_jwt_identity()
-        limit = request.args.get('limit', 10, type=int)
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
         
-        # Simple recommendation: popular products
-        products = Product.query.filter_by(is_active=True)\
-                                .order_by(Product.rating.desc(), Product.review_count.desc())\
-                                .limit(limit).all()
+        products = recommender.recommend(user_id, limit=limit)
         
         return jsonify({
             'recommendations': [product.to_dict() for product in products]
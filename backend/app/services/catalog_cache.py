@@ -0,0 +1,188 @@
+import json
+import hashlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import Response, current_app, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+from app.models import Product, Category
+from app.utils.cache import create_cache
+
+# Marker for "every product entry" in the pending invalidations of a session
+ALL_PRODUCTS = '*'
+
+
+class CatalogCache:
+    """Flask extension caching serialized catalog responses.
+
+    Holds the JSON body of product detail and category list responses with a
+    strong ETag, plus a Last-Modified date for products (categories have no
+    modification time), so endpoints answer repeat requests without
+    touching the database and conditional requests with 304. Entries
+    are dropped when a transaction that wrote the product (including stock
+    changes made with bulk UPDATE statements) or any category commits.
+    The backend is an in-process LRU, or Redis when CATALOG_CACHE_BACKEND is
+    'redis', which lets invalidations reach every worker process.
+    
+    It also holds per-product text snippets (e.g. for LLM prompts), which
+    are dropped together with the product's response.
+    """
+
+    extension_key = 'catalog_cache'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = create_cache(
+            app.config.get('CATALOG_CACHE_BACKEND', 'memory'),
+            url=app.config.get('CATALOG_CACHE_URL'),
+            prefix='catalog:',
+            max_entries=app.config.get('CATALOG_CACHE_SIZE', 2048),
+            ttl=app.config.get('CATALOG_CACHE_TTL', 300)
+        )
+        app.extensions[self.extension_key] = {'backend': backend, 'generation': 0}
+        if not event.contains(Session, 'after_flush', _track_cached_writes):
+            event.listen(Session, 'after_flush', _track_cached_writes)
+            event.listen(Session, 'do_orm_execute', _track_bulk_writes)
+            event.listen(Session, 'after_commit', _invalidate_cached_writes)
+            event.listen(Session, 'after_rollback', _discard_cached_writes)
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def backend(self):
+        return self._state()['backend']
+
+    def get_or_build(self, key: str, build: Callable[[], Optional[Tuple[Dict[str, Any], Optional[datetime]]]]
+                     ) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for key, building it on a miss.
+
+        build returns the response payload and its last modification time
+        (None if unknown), or None when there is nothing to return (which is
+        not cached).
+        """
+        state = self._state()
+        cached = state['backend'].get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        generation = state['generation']
+        built = build()
+        if built is None:
+            return None
+        payload, last_modified = built
+        body = current_app.json.dumps(payload)
+        entry = {
+            'body': body,
+            'etag': hashlib.sha1(body.encode('utf-8')).hexdigest(),
+            'last_modified': last_modified.isoformat() if last_modified else None
+        }
+        # Skip storing if a commit invalidated entries while this one was
+        # being built, as it may hold data from before that commit
+        if state['generation'] == generation:
+            state['backend'].set(key, json.dumps(entry))
+        return entry
+
+    def get_or_build_snippets(self, product_ids: List[int],
+                              build: Callable[[List[int]], Dict[int, str]]) -> Dict[int, str]:
+        """Cached snippets of product_ids, building the missing ones in one call.
+        
+        build receives the ids without a cached snippet and returns the
+        snippets of those that exist.
+        """
+        state = self._state()
+        snippets = {}
+        missing = []
+        for product_id in product_ids:
+            cached = state['backend'].get(f'snippet:{product_id}')
+            if cached is not None:
+                snippets[product_id] = cached
+            else:
+                missing.append(product_id)
+        
+        if missing:
+            generation = state['generation']
+            built = build(missing)
+            if state['generation'] == generation:
+                for product_id, snippet in built.items():
+                    state['backend'].set(f'snippet:{product_id}', snippet)
+            snippets.update(built)
+        return snippets
+    
+    def response(self, entry: Dict[str, Any]) -> Response:
+        """JSON response for an entry, or 304 if the client's copy is current"""
+        response = Response(entry['body'], mimetype='application/json')
+        response.set_etag(entry['etag'])
+        if entry['last_modified']:
+            response.last_modified = datetime.fromisoformat(entry['last_modified'])
+        # Let clients keep the body but revalidate it on every use
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    def invalidate(self, product_ids=(), categories: bool = False):
+        state = self._state()
+        state['generation'] += 1
+        if categories or ALL_PRODUCTS in product_ids:
+            # Product responses and snippets embed the category name
+            self.backend.clear('product:')
+            self.backend.clear('snippet:')
+        elif product_ids:
+            self.backend.delete(*(f'{prefix}:{product_id}' for product_id in product_ids
+                                  for prefix in ('product', 'snippet')))
+        if categories:
+            self.backend.delete('categories')
+
+
+def _pending(session) -> Dict[str, Any]:
+    return session.info.setdefault('catalog_cache_writes', {'products': set(), 'categories': False})
+
+
+def _track_cached_writes(session, flush_context):
+    for instance in session.new | session.dirty | session.deleted:
+        if isinstance(instance, Product) and instance.id is not None:
+            _pending(session)['products'].add(instance.id)
+        elif isinstance(instance, Category):
+            _pending(session)['categories'] = True
+
+
+def _targeted_ids(statement) -> Optional[set]:
+    """Product ids an UPDATE/DELETE is restricted to by `Product.id == value`"""
+    ids = set()
+    if statement.whereclause is not None:
+        for clause in visitors.iterate(statement.whereclause):
+            if (isinstance(clause, BinaryExpression) and clause.operator is operators.eq
+                    and getattr(clause.left, 'table', None) is Product.__table__
+                    and clause.left.key == 'id' and isinstance(clause.right, BindParameter)):
+                ids.add(clause.right.value)
+    return ids or None
+
+
+def _track_bulk_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    if mapper.class_ is Category:
+        _pending(orm_execute_state.session)['categories'] = True
+    elif mapper.class_ is Product:
+        ids = _targeted_ids(orm_execute_state.statement)
+        _pending(orm_execute_state.session)['products'].update(ids or [ALL_PRODUCTS])
+
+
+def _invalidate_cached_writes(session):
+    writes = session.info.pop('catalog_cache_writes', None)
+    if writes and has_app_context() and CatalogCache.extension_key in current_app.extensions:
+        catalog_cache.invalidate(writes['products'], writes['categories'])
+
+
+def _discard_cached_writes(session):
+    session.info.pop('catalog_cache_writes', None)
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,135 @@
+import threading
+from typing import Dict, Any
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Product, Category
+
+
+class CatalogSummary:
+    """Flask extension caching an aggregate view of the catalog.
+
+    The summary holds every category with its active product count and price
+    range (computed in one grouped query) plus a few sample products. It is
+    dropped whenever a transaction that wrote products or categories commits,
+    and ``version`` is bumped so other caches can key on the catalog state.
+    """
+
+    extension_key = 'catalog_summary'
+    sample_size = 5
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions[self.extension_key] = {'summary': None, 'version': 0}
+        if not event.contains(Session, 'after_flush', _track_catalog_writes):
+            event.listen(Session, 'after_flush', _track_catalog_writes)
+            event.listen(Session, 'after_commit', _invalidate_on_commit)
+            event.listen(Session, 'after_rollback', _discard_catalog_writes)
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def version(self) -> int:
+        """Counter bumped on every committed catalog write"""
+        return self._state()['version']
+
+    def invalidate(self):
+        state = self._state()
+        with self._lock:
+            state['summary'] = None
+            state['version'] += 1
+
+    def get(self) -> Dict[str, Any]:
+        """Return the cached summary, rebuilding it if needed"""
+        state = self._state()
+        summary = state['summary']
+        if summary is None:
+            with self._lock:
+                summary = state['summary']
+                if summary is None:
+                    summary = self._build(state['version'])
+                    state['summary'] = summary
+        return summary
+
+    def _build(self, version: int) -> Dict[str, Any]:
+        stats = {
+            row.category_id: row
+            for row in db.session.query(
+                Product.category_id,
+                func.count(Product.id).label('product_count'),
+                func.min(Product.price).label('min_price'),
+                func.max(Product.price).label('max_price')
+            ).filter(Product.is_active == True).group_by(Product.category_id)
+        }
+
+        categories = []
+        for category in Category.query.order_by(Category.id).all():
+            row = stats.get(category.id)
+            categories.append({
+                'id': category.id,
+                'name': category.name,
+                'description': category.description,
+                'parent_id': category.parent_id,
+                'product_count': row.product_count if row else 0,
+                'min_price': float(row.min_price) if row else None,
+                'max_price': float(row.max_price) if row else None
+            })
+
+        sample_products = [
+            {'id': row.id, 'name': row.name, 'price': float(row.price)}
+            for row in Product.query.with_entities(Product.id, Product.name, Product.price)
+                                    .filter(Product.is_active == True)
+                                    .order_by(Product.id)
+                                    .limit(self.sample_size)
+        ]
+
+        return {
+            'version': version,
+            'categories': categories,
+            'sample_products': sample_products,
+            'total_products': sum(category['product_count'] for category in categories)
+        }
+
+
+# Product columns that change on every order and never affect the summary
+VOLATILE_PRODUCT_FIELDS = frozenset(['stock_quantity', 'updated_at', 'order_items'])
+
+
+def _is_catalog_change(instance) -> bool:
+    if isinstance(instance, Category):
+        return True
+    if not isinstance(instance, Product):
+        return False
+    state = inspect(instance)
+    changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+    return bool(changed - VOLATILE_PRODUCT_FIELDS)
+
+
+def _track_catalog_writes(session, flush_context):
+    for instance in session.new | session.deleted:
+        if isinstance(instance, (Product, Category)):
+            session.info['catalog_changed'] = True
+            return
+    for instance in session.dirty:
+        if _is_catalog_change(instance):
+            session.info['catalog_changed'] = True
+            return
+
+
+def _invalidate_on_commit(session):
+    if session.info.pop('catalog_changed', False) and has_app_context():
+        if CatalogSummary.extension_key in current_app.extensions:
+            catalog_summary.invalidate()
+
+
+def _discard_catalog_writes(session):
+    session.info.pop('catalog_changed', None)
+
+
+catalog_summary = CatalogSummary()
@@ -1,75 +1,78 @@
 import re
 import os
 import json
-from typing import Dict, List, Any, Optional
-from sqlalchemy import or_
+import hashlib
+import threading
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from flask import current_app
-import google.generativeai as genai
-from app.models import Product, Category
+from app import db
+from app.models import Product
+from app.services.intent_matcher import intent_matcher
+from app.services.search_index import STOPWORDS, tokenize
+from app.services.product_search import search_products
+from app.services.catalog_summary import catalog_summary
+from app.services.recommender import recommender
+from app.services.embedding_index import product_embeddings
+from app.services.llm_dispatcher import LLMDispatcher, LLMOverloadedError
+from app.services.llm_provider import CircuitBreaker, LLMUnavailableError, ResilientLLM, create_provider
+from app.services.response_cache import ResponseCache, normalize_query
+from app.services.single_flight import SingleFlight
+from app.services.conversation import ConversationContextBuilder
+from app.services.chat_writer import chat_writer
+from app.services.prompt_context import CatalogContextBuilder
 
 class ChatService:
-    """Service class for processing chat messages using Google Gemini AI"""
+    """Service class for processing chat messages, using an LLM (Google Gemini by default)"""
     
     def __init__(self):
-        self.intent_patterns = {
-            'greeting': [
-                r'\b(hi|hello|hey|good morning|good afternoon|good evening)\b',
-                r'\bwhat\'s up\b',
-                r'\bhow are you\b'
-            ],
-            'search_product': [
-                r'\b(looking for|search|find|want|need|show me)\b.*\b(product|item|thing)\b',
-                r'\b(do you have|got any|sell)\b',
-                r'\b(price of|cost of|how much)\b'
-            ],
-            'category_browse': [
-                r'\b(category|categories|section|browse|explore)\b',
-                r'\b(electronics|books|clothing|home|garden|sports)\b'
-            ],
-            'product_details': [
-                r'\b(details|specifications|specs|features|info|information)\b',
-                r'\btell me (more )?about\b',
-                r'\bwhat is\b'
-            ],
-            'add_to_cart': [
-                r'\b(add to cart|buy|purchase|order|get this)\b',
-                r'\bi want (to buy|this)\b'
-            ],
-            'help': [
-                r'\b(help|assist|support|guide)\b',
-                r'\bwhat can you do\b',
-                r'\bhow does this work\b'
-            ],
-            'goodbye': [
-                r'\b(bye|goodbye|see you|thanks|thank you)\b',
-                r'\bthat\'s all\b',
-                r'\bi\'m done\b'
-            ]
-        }
+        self.intent_matcher = intent_matcher
+        self.dispatcher = LLMDispatcher(
+            max_concurrency=current_app.config.get('LLM_MAX_CONCURRENCY', 8),
+            max_queue=current_app.config.get('LLM_MAX_QUEUE', 16),
+            timeout=current_app.config.get('LLM_TIMEOUT', 30)
+        )
+        self.response_cache = ResponseCache(
+            max_entries=current_app.config.get('RESPONSE_CACHE_SIZE', 512),
+            ttl=current_app.config.get('RESPONSE_CACHE_TTL', 3600),
+            similarity_threshold=current_app.config.get('RESPONSE_CACHE_SIMILARITY', 0)
+        )
+        self.conversation = ConversationContextBuilder(
+            max_messages=current_app.config.get('MAX_CONVERSATION_HISTORY', 20),
+            token_budget=current_app.config.get('CONVERSATION_TOKEN_BUDGET', 800),
+            summary_tokens=current_app.config.get('CONVERSATION_SUMMARY_TOKENS', 200),
+            pending_messages=chat_writer.pending if chat_writer.write_behind else None
+        )
         
-        # Initialize Gemini AI
-        self._initialize_gemini()
-    
-    def _initialize_gemini(self):
-        """Initialize Google Gemini AI client"""
-        try:
-            api_key = current_app.config.get('GEMINI_API_KEY')
-            if not api_key:
-                print("Warning: GEMINI_API_KEY not found. Using fallback responses.")
-                self.gemini_client = None
-                return
-            
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(
-                model_name=current_app.config.get('GEMINI_MODEL', 'gemini-2.0-flash-exp')
+        # How product search messages are turned into products
+        self.retrieval = current_app.config.get('CHAT_RETRIEVAL', 'embedding')
+        if self.retrieval == 'embedding' and not product_embeddings.enabled:
+            print("Warning: numpy/scipy not installed. Using keyword product retrieval.")
+            self.retrieval = 'keyword'
+        self.catalog_context = CatalogContextBuilder(
+            product_limit=current_app.config.get('PROMPT_PRODUCT_LIMIT', 5),
+            description_chars=current_app.config.get('PROMPT_DESCRIPTION_CHARS', 0),
+            semantic=self.retrieval == 'embedding'
+        )
+        
+        # Initialize the LLM provider (Gemini, or the local stand-in)
+        provider = create_provider(current_app.config.get('LLM_PROVIDER', 'gemini'), current_app.config)
+        self.llm = ResilientLLM(
+            provider,
+            self.dispatcher,
+            timeout=current_app.config.get('LLM_TIMEOUT', 30),
+            retries=current_app.config.get('LLM_RETRIES', 1),
+            backoff=current_app.config.get('LLM_RETRY_BACKOFF', 0.2),
+            breaker=CircuitBreaker(
+                failure_threshold=current_app.config.get('LLM_CIRCUIT_FAILURES', 5),
+                reset_timeout=current_app.config.get('LLM_CIRCUIT_RESET', 30)
             )
-            self.gemini_client = True
-            print(f"Gemini AI initialized with model: {current_app.config.get('GEMINI_MODEL', 'gemini-2.0-flash-exp')}")
-        except Exception as e:
-            print(f"Error initializing Gemini AI: {str(e)}")
-            self.gemini_client = None
+        ) if provider is not None else None
+        # Concurrent identical prompts share one LLM call
+        self.coalesce = current_app.config.get('LLM_COALESCE', True)
+        self.in_flight = SingleFlight()
     
-    def process_message(self, message: str, session_id: int) -> Dict[str, Any]:
+    def process_message(self, message: str, session_id: Optional[int],
+                        before_message_id: Optional[int] = None) -> Dict[str, Any]:
         """Process user message and return appropriate response"""
         message_lower = message.lower().strip()
         
@@ -93,15 +96,33 @@ class ChatService:
             return self._handle_goodbye()
         else:
             # Use Gemini AI for complex queries
-            return self._handle_gemini_response(message)
+            return self._handle_gemini_response(message, session_id, before_message_id)
+    
+    def stream_message(self, message: str, session_id: Optional[int],
+                       before_message_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Process user message, yielding the response as it is generated.
+        
+        Yields {'delta': text} items followed by one {'response': response}
+        item holding the complete response as process_message returns it.
+        Only Gemini responses are streamed; rule-based responses arrive as
+        a single delta. Messages of the session from before_message_id on
+        are left out of the conversation context.
+        """
+        if self.llm and self._detect_intent(message.lower().strip()) == 'general':
+            yield from self._stream_gemini_response(message, session_id, before_message_id)
+            return
+        
+        response = self.process_message(message, session_id, before_message_id)
+        yield {'delta': response['content']}
+        yield {'response': response}
+    
+    def llm_busy(self, message: str) -> bool:
+        """Whether message would be answered by the LLM while every LLM slot is taken"""
+        return bool(self.llm) and self.dispatcher.full and self._detect_intent(message.lower().strip()) == 'general'
     
     def _detect_intent(self, message: str) -> str:
         """Detect user intent from message"""
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, message, re.IGNORECASE):
-                    return intent
-        return 'general'
+        return self.intent_matcher.detect(message)
     
     def _handle_greeting(self) -> Dict[str, Any]:
         """Handle greeting messages"""
@@ -112,8 +133,15 @@ class ChatService:
     
     def _handle_product_search(self, message: str) -> Dict[str, Any]:
         """Handle product search queries"""
-        # Extract search terms
-        search_terms = self._extract_product_keywords(message)
+        if self.retrieval == 'embedding':
+            # The whole message is matched by meaning; its words are only kept for display
+            search_terms = tokenize(message)
+            products = self._retrieve_products(message) if search_terms else []
+            heading = "Great! Here's what I found for you:\n\n"
+        else:
+            search_terms = self._extract_product_keywords(message)
+            products = self._search_products(search_terms) if search_terms else []
+            heading = f"Great! I found some {search_terms[0]} for you:\n\n" if search_terms else ''
         
         if not search_terms:
             return {
@@ -121,12 +149,9 @@ class ChatService:
                 'metadata': {'type': 'search_clarification'}
             }
         
-        # Search for products
-        products = self._search_products(search_terms)
-        
         if products:
             product_list = []
-            response_content = f"Great! I found some {search_terms[0]} for you:\n\n"
+            response_content = heading
             
             for product in products[:5]:  # Limit to 5 products
                 product_list.append({
@@ -137,6 +162,12 @@ class ChatService:
                 })
                 response_content += f"🛍️ **{product.name}** - ${product.price:.2f}\n"
             
+            suggestions = self._suggest_related([product['id'] for product in product_list])
+            if suggestions:
+                response_content += "\nYou might also like:\n"
+                for product in suggestions:
+                    response_content += f"✨ **{product['name']}** - ${product['price']:.2f}\n"
+            
             response_content += "\nWould you like more details about any of these products, or should I search for something else?"
             
             return {
@@ -144,6 +175,7 @@ class ChatService:
                 'metadata': {
                     'type': 'product_search_results',
                     'products': product_list,
+                    'recommendations': suggestions,
                     'search_terms': search_terms
                 }
             }
@@ -155,7 +187,7 @@ class ChatService:
     
     def _handle_category_browse(self, message: str) -> Dict[str, Any]:
         """Handle category browsing requests"""
-        categories = Category.query.all()
+        categories = catalog_summary.get()['categories']
         
         if not categories:
             return {
@@ -168,12 +200,11 @@ class ChatService:
         
         for category in categories:
             category_list.append({
-                'id': category.id,
-                'name': category.name,
-                'description': category.description
+                'id': category['id'],
+                'name': category['name'],
+                'description': category['description']
             })
-            product_count = Product.query.filter_by(category_id=category.id).count()
-            response_content += f"📂 **{category.name}** ({product_count} items)\n   {category.description}\n\n"
+            response_content += f"📂 **{category['name']}** ({category['product_count']} items)\n   {category['description']}\n\n"
         
         response_content += "Which category interests you? Just ask me to 'show electronics' or 'find books' for example!"
         
@@ -224,54 +255,225 @@ Just ask me anything about our products or shopping process!""",
             'metadata': {'type': 'goodbye'}
         }
     
-    def _handle_gemini_response(self, message: str) -> Dict[str, Any]:
+    def _handle_gemini_response(self, message: str, session_id: Optional[int] = None,
+                                before_message_id: Optional[int] = None) -> Dict[str, Any]:
         """Handle complex queries using Gemini AI"""
-        if not self.gemini_client:
-            return {
-                'content': "I'm sorry, I'm having trouble understanding that right now. Could you try asking about our products, categories, or say 'help' to see what I can do?",
-                'metadata': {
-                    'type': 'fallback',
-                    'reason': 'gemini_unavailable'
-                }
-            }
+        if not self.llm:
+            return self._fallback_response('gemini_unavailable')
         
         try:
-            # Get some context about available products
-            context = self._get_shop_context()
+            conversation = self.conversation.build(session_id, before_message_id)
             
-            # Create a detailed prompt for Gemini
-            prompt = f"""You are a helpful e-commerce shopping assistant. The user asked: "{message}"
-
-Here's information about our store:
-{context}
-
-Please provide a helpful, friendly response. If the user is asking about products:
-1. Suggest relevant products from our inventory
-2. Include specific product names and prices when possible
-3. Ask follow-up questions to better help them
-4. Keep responses conversational and under 200 words
-
-If the user is asking general questions, provide helpful shopping advice while staying focused on our e-commerce store."""
-
-            response = self.model.generate_content(prompt)
+            # Answers that depend on earlier turns are not reusable
+            catalog_version = catalog_summary.version
+            if not conversation:
+                cached = self.response_cache.get(message, catalog_version)
+                if cached is not None:
+                    return self._cached_response(cached, message)
             
-            return {
-                'content': response.text,
+            prompt = self._build_gemini_prompt(message, conversation)
+            self._release_db_connection()
+            
+            result = {
+                'content': self._generate(prompt, catalog_version),
                 'metadata': {
                     'type': 'gemini_response',
+                    'provider': self.llm.name,
                     'query': message
                 }
             }
+            if not conversation:
+                self.response_cache.put(message, catalog_version, result)
+            return result
             
+        except LLMOverloadedError:
+            return self._gemini_busy_response()
+        except LLMUnavailableError:
+            return self._rule_based_response(message)
         except Exception as e:
-            print(f"Gemini AI error: {str(e)}")
-            return {
-                'content': "I'm having trouble processing that request right now. Could you try asking about specific products or categories? For example, 'show me laptops' or 'what smartphones do you have?'",
+            print(f"LLM error ({self.llm.name}): {str(e)}")
+            return self._gemini_error_response(e)
+    
+    def _stream_gemini_response(self, message: str, session_id: Optional[int] = None,
+                                before_message_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream a Gemini AI response chunk by chunk"""
+        chunks = []
+        try:
+            conversation = self.conversation.build(session_id, before_message_id)
+            
+            catalog_version = catalog_summary.version
+            if not conversation:
+                cached = self.response_cache.get(message, catalog_version)
+                if cached is not None:
+                    response = self._cached_response(cached, message)
+                    yield {'delta': response['content']}
+                    yield {'response': response}
+                    return
+            
+            prompt = self._build_gemini_prompt(message, conversation)
+            self._release_db_connection()
+            
+            for text in self._stream(prompt, catalog_version):
+                chunks.append(text)
+                yield {'delta': text}
+            
+            result = {
+                'content': ''.join(chunks),
                 'metadata': {
-                    'type': 'error',
-                    'error': str(e)
+                    'type': 'gemini_response',
+                    'provider': self.llm.name,
+                    'query': message
                 }
             }
+            if not conversation:
+                self.response_cache.put(message, catalog_version, result)
+            yield {'response': result}
+            
+        except Exception as e:
+            if isinstance(e, LLMOverloadedError):
+                response = self._gemini_busy_response()
+            elif isinstance(e, LLMUnavailableError):
+                response = self._rule_based_response(message)
+            else:
+                print(f"LLM error ({self.llm.name}): {str(e)}")
+                response = self._gemini_error_response(e)
+            separator = '\n\n' if chunks else ''
+            yield {'delta': separator + response['content']}
+            response['content'] = ''.join(chunks) + separator + response['content']
+            yield {'response': response}
+    
+    def _flight_key(self, prompt: str, catalog_version) -> Tuple[Any, str]:
+        return catalog_version, hashlib.sha1(normalize_query(prompt).encode('utf-8')).hexdigest()
+    
+    def _flight_timeout(self) -> float:
+        """How long a coalesced request waits for the shared call, covering its retries"""
+        return self.llm.timeout * (self.llm.retries + 1) + self.llm.backoff * 2 ** self.llm.retries
+    
+    def _generate(self, prompt: str, catalog_version) -> str:
+        """LLM answer to prompt, shared with concurrent requests for the same prompt"""
+        if not self.coalesce:
+            return self.llm.generate(prompt)
+        key = self._flight_key(prompt, catalog_version)
+        flight, leader = self.in_flight.begin(key)
+        if not leader:
+            with self.dispatcher.slot():
+                return flight.wait(self._flight_timeout())
+        try:
+            content = self.llm.generate(prompt)
+        except Exception as e:
+            self.in_flight.fail(key, flight, e)
+            raise
+        self.in_flight.resolve(key, flight, content)
+        return content
+    
+    def _stream(self, prompt: str, catalog_version) -> Iterator[str]:
+        """LLM answer to prompt in pieces; concurrent requests for the same prompt get it whole when done"""
+        if not self.coalesce:
+            yield from self.llm.stream(prompt)
+            return
+        key = self._flight_key(prompt, catalog_version)
+        flight, leader = self.in_flight.begin(key)
+        if not leader:
+            with self.dispatcher.slot():
+                text = flight.wait(self._flight_timeout())
+            yield text
+            return
+        chunks = []
+        stream = self.llm.stream(prompt)
+        try:
+            for text in stream:
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            self.in_flight.fail(key, flight, e)
+            raise
+        except GeneratorExit:
+            # The leader's client went away; requests waiting on the answer still get it
+            if not self.in_flight.abandon(key, flight):
+                try:
+                    chunks.extend(stream)
+                except Exception as e:
+                    self.in_flight.fail(key, flight, e)
+                else:
+                    self.in_flight.resolve(key, flight, ''.join(chunks))
+            raise
+        self.in_flight.resolve(key, flight, ''.join(chunks))
+    
+    def _cached_response(self, cached: Dict[str, Any], message: str) -> Dict[str, Any]:
+        """Copy of a cached Gemini response, tagged for the current query"""
+        return {
+            'content': cached['content'],
+            'metadata': {
+                **cached['metadata'],
+                'query': message,
+                'cached': True
+            }
+        }
+    
+    def _release_db_connection(self):
+        """Return the request's DB connection to the pool before a slow LLM call.
+        
+        Callers do not hold pending writes at this point (the chat routes write
+        only after the response is generated), so this just ends the read
+        transaction.
+        """
+        db.session.commit()
+    
+    def _build_gemini_prompt(self, message: str, conversation: str = '') -> str:
+        """Build the Gemini prompt for a user message"""
+        # Products relevant to this message, not a fixed sample of the catalog
+        context = self._get_shop_context(message)
+        
+        history = f"\nConversation so far:\n{conversation}\n" if conversation else ''
+        
+        # Create a compact prompt for Gemini
+        return f"""You are a helpful e-commerce shopping assistant. The user asked: "{message}"
+
+Here's information about our store:
+{context}
+{history}
+Please reply in a friendly, conversational way, in under 150 words:
+1. Only suggest products listed above, with their names and prices; if none fit, say so instead of inventing one
+2. Ask a follow-up question when it would help
+3. For general questions, give shopping advice focused on our store"""
+    
+    def _fallback_response(self, reason: str) -> Dict[str, Any]:
+        """Response used when no LLM can answer"""
+        return {
+            'content': "I'm sorry, I'm having trouble understanding that right now. Could you try asking about our products, categories, or say 'help' to see what I can do?",
+            'metadata': {
+                'type': 'fallback',
+                'reason': reason
+            }
+        }
+    
+    def _rule_based_response(self, message: str) -> Dict[str, Any]:
+        """Answer without the LLM while its circuit is open: products for the message if any match"""
+        response = self._handle_product_search(message)
+        if response['metadata']['type'] != 'product_search_results':
+            return self._fallback_response('llm_unavailable')
+        response['metadata']['fallback_reason'] = 'llm_unavailable'
+        return response
+    
+    def _gemini_busy_response(self) -> Dict[str, Any]:
+        """Response used when the LLM pool is at capacity"""
+        return {
+            'content': "I'm getting a lot of questions right now! While I catch up, try asking me to search for a product or browse a category - for example, 'show me laptops'.",
+            'metadata': {
+                'type': 'fallback',
+                'reason': 'llm_busy'
+            }
+        }
+    
+    def _gemini_error_response(self, error: Exception) -> Dict[str, Any]:
+        """Response used when a Gemini AI call fails"""
+        return {
+            'content': "I'm having trouble processing that request right now. Could you try asking about specific products or categories? For example, 'show me laptops' or 'what smartphones do you have?'",
+            'metadata': {
+                'type': 'error',
+                'error': str(error)
+            }
+        }
     
     def _extract_product_keywords(self, message: str) -> List[str]:
         """Extract product-related keywords from message"""
@@ -286,53 +488,60 @@ If the user is asking general questions, provide helpful shopping advice while s
         words = re.findall(r'\b\w+\b', message.lower())
         found_keywords = [word for word in words if word in product_keywords]
         
-        return found_keywords if found_keywords else words[:3]  # Return first 3 words if no keywords found
+        if found_keywords:
+            return found_keywords
+        
+        # Fall back to the first 3 meaningful words
+        return [word for word in words if word not in STOPWORDS][:3]
     
     def _search_products(self, search_terms: List[str]) -> List[Product]:
-        """Search for products based on terms"""
-        query = Product.query
-        
-        # Create search conditions for each term
-        conditions = []
-        for term in search_terms:
-            conditions.extend([
-                Product.name.ilike(f'%{term}%'),
-                Product.description.ilike(f'%{term}%')
-            ])
-        
-        # Join conditions with OR
-        if conditions:
-            query = query.filter(or_(*conditions))
-        
-        return query.limit(10).all()
+        """Search for products based on terms, best match first"""
+        return search_products(' '.join(search_terms), limit=10)
     
-    def _get_shop_context(self) -> str:
-        """Get context about the shop for Gemini AI"""
+    def _retrieve_products(self, message: str, limit: int = 10) -> List[Product]:
+        """Products closest in meaning to message, falling back to keyword search"""
         try:
-            # Get category summary
-            categories = Category.query.all()
-            category_info = []
-            
-            for category in categories[:5]:  # Limit to 5 categories
-                product_count = Product.query.filter_by(category_id=category.id).count()
-                category_info.append(f"- {category.name}: {product_count} products")
-            
-            # Get some sample products
-            sample_products = Product.query.limit(5).all()
-            product_info = []
-            
-            for product in sample_products:
-                product_info.append(f"- {product.name}: ${product.price}")
-            
-            context = f"""
-STORE CATEGORIES:
-{chr(10).join(category_info)}
-
-SAMPLE PRODUCTS:
-{chr(10).join(product_info)}
-
-We have over 100 products across multiple categories including electronics, books, clothing, and more.
-"""
-            return context
+            products = product_embeddings.search(message, limit=limit)
+        except Exception as e:
+            print(f"Embedding retrieval error: {str(e)}")
+            products = []
+        return products or search_products(message, limit=limit)
+    
+    def _suggest_related(self, product_ids: List[int], limit: int = 3) -> List[Dict[str, Any]]:
+        """Products often bought or browsed with product_ids, for 'you might also like'"""
+        try:
+            return [
+                {'id': product.id, 'name': product.name, 'price': float(product.price), 'image_url': product.image_url}
+                for product in recommender.similar(product_ids, limit=limit)
+            ]
+        except Exception as e:
+            # Suggestions are optional; never fail the search over them
+            print(f"Recommender error: {str(e)}")
+            return []
+    
+    def _get_shop_context(self, message: str) -> str:
+        """Get context about the shop relevant to message for Gemini AI"""
+        try:
+            return self.catalog_context.build(message)
         except Exception as e:
             return "We have a wide variety of products across multiple categories including electronics, books, clothing, and home items."
+
+
+_chat_service_lock = threading.Lock()
+
+
+def get_chat_service() -> ChatService:
+    """Return the ChatService shared by every request of the current app.
+
+    The service is built once per app (and therefore once per worker process)
+    so the Gemini client and intent matcher are not rebuilt on every message.
+    """
+    app = current_app._get_current_object()
+    service = app.extensions.get('chat_service')
+    if service is None:
+        with _chat_service_lock:
+            service = app.extensions.get('chat_service')
+            if service is None:
+                service = ChatService()
+                app.extensions['chat_service'] = service
+    return service
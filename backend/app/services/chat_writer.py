@@ -0,0 +1,168 @@
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from flask import current_app
+from sqlalchemy import bindparam
+from app import db
+from app.models import ChatMessage, ChatSession
+from app.utils.write_behind import WriteBehindQueue
+
+
+class PendingMessage:
+    """A chat message queued for writing; it has no id until it is written"""
+
+    __slots__ = ('id', 'session_id', 'message_type', 'content', 'extra_data', 'timestamp')
+
+    def __init__(self, session_id: int, message_type: str, content: str,
+                 extra_data: Optional[Dict[str, Any]] = None, timestamp: Optional[datetime] = None):
+        self.id = None
+        self.session_id = session_id
+        self.message_type = message_type
+        self.content = content
+        self.extra_data = extra_data
+        self.timestamp = timestamp or datetime.utcnow()
+
+    def row(self) -> Dict[str, Any]:
+        return {'session_id': self.session_id, 'message_type': self.message_type, 'content': self.content,
+                'extra_data': self.extra_data, 'timestamp': self.timestamp}
+
+    def to_dict(self):
+        return {
+            'id': None,
+            'session_id': self.session_id,
+            'message_type': self.message_type,
+            'content': self.content,
+            'extra_data': self.extra_data,
+            'timestamp': self.timestamp.isoformat()
+        }
+
+
+def unwritten(pending: List[PendingMessage], written: List[Any]) -> List[PendingMessage]:
+    """The pending messages not among written, messages loaded after pending was taken"""
+    # A flush may have written some of them in between
+    return [message for message in pending
+            if not any((message.timestamp, message.message_type, message.content) ==
+                       (row.timestamp, row.message_type, row.content) for row in written)]
+
+
+class ChatMessageWriter:
+    """Flask extension persisting chat messages, synchronously or write-behind.
+
+    With CHAT_PERSISTENCE 'sync' (the default) each turn's messages and the
+    session's updated_at are committed by the request. With 'write_behind'
+    they are queued in process memory and a background thread inserts them
+    in batches, one executemany per batch, so chats do not queue up on the
+    database's write lock. CHAT_WRITE_BEHIND_INTERVAL bounds how long a
+    message waits (and so how many seconds of chat a killed process can
+    lose); once CHAT_WRITE_BEHIND_MAX_PENDING messages wait, the request
+    writes the queue itself. The queue is flushed at exit. A message that
+    cannot be written (e.g. its session was deleted) is retried alone and
+    finally dropped without holding back the others.
+
+    Queued messages are only known to the process that took them, which
+    reads them back through ``pending`` (chat history, conversation context).
+    """
+
+    extension_key = 'chat_writer'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        mode = app.config.get('CHAT_PERSISTENCE', 'sync')
+        if mode not in ('sync', 'write_behind'):
+            raise ValueError(f'Unknown chat persistence mode: {mode}')
+        app.extensions[self.extension_key] = {
+            'mode': mode,
+            'queue': WriteBehindQueue(
+                app, self._write,
+                interval=app.config.get('CHAT_WRITE_BEHIND_INTERVAL', 0.5),
+                max_batch=app.config.get('CHAT_WRITE_BEHIND_BATCH', 500),
+                name='chat-message-writer',
+                on_drop=self._dropped
+            ),
+            'max_pending': app.config.get('CHAT_WRITE_BEHIND_MAX_PENDING', 10000),
+            'pending': defaultdict(list),
+            'lock': threading.Lock()
+        }
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def write_behind(self) -> bool:
+        return self._state()['mode'] == 'write_behind'
+
+    def save(self, session_id: int, messages: List[PendingMessage]) -> List[Dict[str, Any]]:
+        """Persist a turn's messages and bump the session's updated_at; the messages' to_dict()"""
+        state = self._state()
+        if state['mode'] == 'sync':
+            saved = [ChatMessage(**message.row()) for message in messages]
+            db.session.add_all(saved)
+            ChatSession.query.filter_by(id=session_id).update({'updated_at': datetime.utcnow()})
+            db.session.commit()
+            return [message.to_dict() for message in saved]
+
+        # Only a newly created session is written here; this is a no-op otherwise
+        db.session.commit()
+        if state['queue'].metrics()['pending'] >= state['max_pending']:
+            state['queue'].flush()
+        with state['lock']:
+            state['pending'][session_id].extend(messages)
+        for message in messages:
+            state['queue'].put(('message', message))
+        state['queue'].put(('session', session_id, messages[-1].timestamp), key=('session', session_id))
+        return [message.to_dict() for message in messages]
+
+    def pending(self, session_id: int) -> List[PendingMessage]:
+        """Messages of the session still waiting to be written, oldest first"""
+        state = self._state()
+        with state['lock']:
+            return list(state['pending'].get(session_id, ()))
+
+    def flush(self) -> int:
+        """Write every queued message now"""
+        return self._state()['queue'].flush()
+
+    def _write(self, items):
+        messages = [item[1] for item in items if item[0] == 'message']
+        sessions = [{'session_id': item[1], 'updated_at': item[2]} for item in items if item[0] == 'session']
+        if messages:
+            db.session.execute(ChatMessage.__table__.insert(), [message.row() for message in messages])
+        if sessions:
+            table = ChatSession.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('session_id')).values(updated_at=bindparam('updated_at')),
+                sessions
+            )
+        db.session.commit()
+        self._forget(messages)
+
+    def _dropped(self, items):
+        messages = [item[1] for item in items if item[0] == 'message']
+        if messages:
+            sessions = sorted({message.session_id for message in messages})
+            print(f"Error: lost {len(messages)} chat messages of sessions {sessions}")
+        # Gone for good, so history and conversation context must stop showing them
+        self._forget(messages)
+
+    def _forget(self, messages: List[PendingMessage]):
+        """Stop reporting messages as pending"""
+        state = self._state()
+        with state['lock']:
+            for message in messages:
+                queued = state['pending'].get(message.session_id)
+                if queued is None:
+                    continue
+                queued[:] = [other for other in queued if other is not message]
+                if not queued:
+                    del state['pending'][message.session_id]
+
+    def metrics(self) -> Dict[str, Any]:
+        state = self._state()
+        return {'mode': state['mode'], **state['queue'].metrics()}
+
+
+chat_writer = ChatMessageWriter()
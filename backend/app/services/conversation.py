@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from app.models import ChatMessage
+from app.services.chat_writer import unwritten
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def clip_text(text: str, limit: int) -> str:
+    """Collapse whitespace and cut text to at most limit characters"""
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + '...'
+
+
+class _SessionSummary:
+    __slots__ = ('lines', 'folded_through_id')
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.folded_through_id = 0
+
+
+class ConversationContextBuilder:
+    """Builds a bounded conversation context for LLM prompts.
+
+    Each call loads at most ``max_messages`` recent messages of a session in
+    one query and keeps the newest ones that fit ``token_budget`` verbatim.
+    Older turns are compressed into a rolling per-session summary of short
+    one-line notes, capped at ``summary_tokens``, so they are not resent in
+    full. The verbatim window is kept one turn smaller than the loaded window,
+    which lets every message be folded into the summary before it scrolls out
+    of the loaded rows. Summaries live in process memory; after a restart a
+    session's summary starts again from the messages still in its window.
+
+    ``pending_messages(session_id)``, when given, returns messages that are
+    not written yet (oldest first); they are treated as the newest turns.
+    """
+
+    def __init__(self, max_messages: int = 20, token_budget: int = 800,
+                 summary_tokens: int = 200, max_sessions: int = 10000,
+                 pending_messages: Optional[Callable[[int], List[Any]]] = None):
+        self.max_messages = max(max_messages, 4)
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self.pending_messages = pending_messages
+
+        self._summaries: 'OrderedDict[int, _SessionSummary]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _summary_for(self, session_id: int) -> _SessionSummary:
+        summary = self._summaries.get(session_id)
+        if summary is None:
+            summary = _SessionSummary()
+            self._summaries[session_id] = summary
+            while len(self._summaries) > self.max_sessions:
+                self._summaries.popitem(last=False)
+        else:
+            self._summaries.move_to_end(session_id)
+        return summary
+
+    def _load(self, session_id: int, before_id: Optional[int] = None, after_id: int = 0,
+              limit: Optional[int] = None) -> List[Any]:
+        query = ChatMessage.query.with_entities(
+            ChatMessage.id, ChatMessage.message_type, ChatMessage.content, ChatMessage.extra_data,
+            ChatMessage.timestamp
+        ).filter(ChatMessage.session_id == session_id, ChatMessage.id > after_id)
+        if before_id is not None:
+            query = query.filter(ChatMessage.id < before_id)
+        return query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())\
+                    .limit(limit or self.max_messages).all()
+
+    @staticmethod
+    def _format(message) -> str:
+        speaker = 'User' if message.message_type == 'user' else 'Assistant'
+        return f"{speaker}: {' '.join(message.content.split())}"
+
+    @staticmethod
+    def _compress(message) -> str:
+        """One short line capturing the gist of a message"""
+        if message.message_type == 'user':
+            return f"User asked: {clip_text(message.content, 80)}"
+        products = (message.extra_data or {}).get('products') or []
+        if products:
+            names = ', '.join(product['name'] for product in products[:3])
+            return f"Assistant suggested: {clip_text(names, 100)}"
+        return f"Assistant: {clip_text(message.content, 60)}"
+
+    def _fold(self, summary: _SessionSummary, messages: List[Any]):
+        for message in sorted(messages, key=lambda message: message.id):
+            if message.id > summary.folded_through_id:
+                summary.lines.append(self._compress(message))
+                summary.folded_through_id = message.id
+        while summary.lines and estimate_tokens('\n'.join(summary.lines)) > self.summary_tokens:
+            summary.lines.pop(0)
+
+    def build(self, session_id: Optional[int], before_id: Optional[int] = None) -> str:
+        """Return the conversation context for a prompt, or '' for a new session.
+
+        Messages with an id of ``before_id`` or later (e.g. the message being
+        answered, when it is saved before the response) are left out.
+        """
+        if not session_id:
+            return ''
+
+        # Taken before loading, so a message written in between shows up in the load
+        pending = self.pending_messages(session_id) if self.pending_messages else []
+        loaded = self._load(session_id, before_id=before_id)
+        recent = list(reversed(unwritten(pending, loaded))) + loaded
+        if not recent:
+            return ''
+
+        # Newest messages that fit the budget, leaving one turn of the
+        # loaded window to be folded into the summary
+        verbatim = []
+        used = 0
+        for message in recent[:self.max_messages - 2]:
+            line = self._format(message)
+            cost = estimate_tokens(line)
+            if used + cost > self.token_budget - self.summary_tokens:
+                break
+            verbatim.append(line)
+            used += cost
+        # Unwritten messages have no id to fold them by; they are folded once written
+        older = [message for message in recent[len(verbatim):] if message.id is not None]
+
+        with self._lock:
+            summary = self._summary_for(session_id)
+            folded_through_id = summary.folded_through_id
+
+        # Messages that scrolled out of the window without being folded
+        # (only happens when turns were answered without building context)
+        gap = []
+        if len(loaded) == self.max_messages and loaded[-1].id > folded_through_id + 1:
+            gap = self._load(session_id, before_id=loaded[-1].id, after_id=folded_through_id,
+                             limit=self.max_messages * 5)
+
+        with self._lock:
+            self._fold(summary, gap + older)
+            summary_lines = list(summary.lines)
+
+        sections = []
+        if summary_lines:
+            sections.append("Summary of earlier conversation:\n" + '\n'.join(summary_lines))
+        if verbatim:
+            sections.append("Recent messages:\n" + '\n'.join(reversed(verbatim)))
+        return '\n\n'.join(sections)
+
+    def forget(self, session_id: int):
+        """Drop the rolling summary of a session"""
+        with self._lock:
+            self._summaries.pop(session_id, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'sessions': len(self._summaries), 'max_sessions': self.max_sessions}
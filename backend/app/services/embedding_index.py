@@ -0,0 +1,242 @@
+import os
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+from flask import current_app
+from app.models import Product, Category, product_loading_plan
+from app.services.catalog_summary import catalog_summary
+from app.services.search_index import tokenize
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.linalg import svds
+except ImportError:  # optional, only needed for semantic retrieval
+    np = None
+    sparse = None
+    svds = None
+
+VECTORS_FILE = 'vectors.npy'
+ENCODER_FILE = 'encoder.npz'
+
+
+def product_document(product: Product, categories: Dict[int, Category]) -> str:
+    """Text a product is embedded from: name, brand, category, specs and description"""
+    parts = [product.name, product.brand]
+    category = categories.get(product.category_id)
+    while category is not None:
+        parts.extend((category.name, category.description))
+        category = categories.get(category.parent_id)
+    for key, value in (product.specifications or {}).items():
+        parts.append(key.replace('_', ' '))
+        if value is True:
+            continue
+        parts.append(str(value))
+    parts.append(product.description)
+    return ' '.join(part for part in parts if part)
+
+
+class TfidfSvdEncoder:
+    """Maps text to dense unit vectors: TF-IDF weights projected by a truncated SVD.
+
+    The projection (latent semantic analysis) places terms that appear in
+    the same product documents close together, so a query can match
+    products that share none of its words.
+    """
+
+    def __init__(self, terms: List[str], idf, components):
+        self.terms = {term: column for column, term in enumerate(terms)}
+        self.term_list = list(terms)
+        self.idf = idf
+        self.components = components
+
+    @property
+    def dimensions(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, documents: List[str], dimensions: int) -> Tuple['TfidfSvdEncoder', 'np.ndarray']:
+        """Fit an encoder on documents, returning it and the documents' vectors"""
+        counts = [Counter(tokenize(document)) for document in documents]
+        document_frequency = Counter(term for document in counts for term in document)
+        terms = sorted(document_frequency)
+        idf = np.array([
+            math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1 for term in terms
+        ], dtype=np.float32)
+
+        encoder = cls(terms, idf, np.zeros((0, len(terms)), dtype=np.float32))
+        matrix = encoder._tfidf(counts)
+        rank = min(dimensions, min(matrix.shape) - 1)
+        if rank >= 1:
+            _, _, components = svds(matrix.astype(np.float64), k=rank)
+            encoder.components = components.astype(np.float32)
+        return encoder, _normalize(encoder._project(matrix))
+
+    def _tfidf(self, counts: List[Counter]):
+        rows, columns, values = [], [], []
+        for row, document in enumerate(counts):
+            for term, count in document.items():
+                column = self.terms.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append((1 + math.log(count)) * self.idf[column])
+        matrix = sparse.csr_matrix((values, (rows, columns)), shape=(len(counts), len(self.terms)), dtype=np.float32)
+        norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A.ravel()
+        norms[norms == 0] = 1.0
+        return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+    def _project(self, matrix):
+        return np.asarray(matrix.dot(self.components.T), dtype=np.float32)
+
+    def encode(self, text: str):
+        """Unit vector for text (all zeros if it shares no term with the catalog)"""
+        return _normalize(self._project(self._tfidf([Counter(tokenize(text))])))[0]
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class EmbeddingIndex:
+    """Product vectors (one unit-length row per product) with cosine top-K search"""
+
+    def __init__(self, encoder: TfidfSvdEncoder, product_ids, vectors):
+        self.encoder = encoder
+        self.product_ids = product_ids
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Up to limit (product id, cosine similarity) pairs, best first"""
+        if not len(self.product_ids) or limit <= 0:
+            return []
+        query_vector = self.encoder.encode(query)
+        if not query_vector.any():
+            return []
+        scores = self.vectors.dot(query_vector)
+        candidates = np.flatnonzero(scores > min_score)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(self.product_ids[position]), float(scores[position])) for position in candidates]
+
+    def save(self, directory: str):
+        """Write the index to directory, replacing any previous one in place"""
+        os.makedirs(directory, exist_ok=True)
+        # Write to temporary names, then rename, so readers never load half a file
+        vectors_tmp = os.path.join(directory, f'.{VECTORS_FILE}.tmp')
+        encoder_tmp = os.path.join(directory, f'.{ENCODER_FILE}.tmp')
+        with open(vectors_tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(encoder_tmp, 'wb') as f:
+            np.savez(
+                f,
+                terms=np.array(self.encoder.term_list, dtype=str),
+                idf=self.encoder.idf,
+                components=self.encoder.components,
+                product_ids=np.asarray(self.product_ids, dtype=np.int64)
+            )
+        os.replace(encoder_tmp, os.path.join(directory, ENCODER_FILE))
+        os.replace(vectors_tmp, os.path.join(directory, VECTORS_FILE))
+
+    @classmethod
+    def load(cls, directory: str) -> 'EmbeddingIndex':
+        """Load an index, memory-mapping the vector matrix"""
+        with np.load(os.path.join(directory, ENCODER_FILE)) as data:
+            encoder = TfidfSvdEncoder(list(data['terms']), data['idf'], data['components'])
+            product_ids = data['product_ids']
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode='r')
+        return cls(encoder, product_ids, vectors)
+
+
+def build_embedding_index(dimensions: int) -> EmbeddingIndex:
+    """Embed every active product"""
+    categories = {category.id: category for category in Category.query.all()}
+    products = Product.query.filter(Product.is_active == True).order_by(Product.id).all()
+    documents = [product_document(product, categories) for product in products]
+    encoder, vectors = TfidfSvdEncoder.fit(documents, dimensions)
+    return EmbeddingIndex(encoder, np.array([product.id for product in products], dtype=np.int64), vectors)
+
+
+class ProductEmbeddingIndex:
+    """Flask extension serving semantic product retrieval from an EmbeddingIndex.
+
+    The index is computed offline by ``python run.py build-embeddings`` into
+    EMBEDDING_INDEX_PATH and memory-mapped from there, so every worker shares
+    one copy of the vectors; it is reloaded when the files are replaced.
+    Without that directory the index is computed in-process on first use and
+    recomputed after catalog changes. Needs numpy and scipy.
+    """
+
+    extension_key = 'product_embedding_index'
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions[self.extension_key] = {
+            'path': app.config.get('EMBEDDING_INDEX_PATH') or os.path.join(app.instance_path, 'embeddings'),
+            'index': None,
+            'source': None
+        }
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def enabled(self) -> bool:
+        return np is not None
+
+    def _source(self, state) -> Tuple[str, object]:
+        """What the current index should be built from: the files' mtime, or the catalog version"""
+        try:
+            return 'file', os.stat(os.path.join(state['path'], VECTORS_FILE)).st_mtime_ns
+        except OSError:
+            return 'catalog', catalog_summary.version
+
+    @property
+    def index(self) -> EmbeddingIndex:
+        """The current index, (re)loaded or built when its source has changed"""
+        state = self._state()
+        source = self._source(state)
+        if state['index'] is None or state['source'] != source:
+            with self._lock:
+                if state['index'] is None or state['source'] != source:
+                    if source[0] == 'file':
+                        state['index'] = EmbeddingIndex.load(state['path'])
+                    else:
+                        state['index'] = self.build()
+                    state['source'] = source
+        return state['index']
+
+    def build(self) -> EmbeddingIndex:
+        return build_embedding_index(current_app.config.get('EMBEDDING_DIMENSIONS', 32))
+
+    def save(self, index: EmbeddingIndex) -> str:
+        """Write index to EMBEDDING_INDEX_PATH for every worker to load"""
+        path = self._state()['path']
+        index.save(path)
+        return path
+
+    def search(self, query: str, limit: int = 10) -> List[Product]:
+        """Active products closest in meaning to query, best first"""
+        ranked = self.index.search(query, limit=limit, min_score=current_app.config.get('EMBEDDING_MIN_SCORE', 0.2))
+        if not ranked:
+            return []
+        ids = [product_id for product_id, _ in ranked]
+        products = {
+            product.id: product for product in Product.query.options(product_loading_plan())
+                                                            .filter(Product.id.in_(ids), Product.is_active == True)
+        }
+        return [products[product_id] for product_id in ids if product_id in products]
+
+
+product_embeddings = ProductEmbeddingIndex()
@@ -0,0 +1,240 @@
+import bisect
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import Product
+
+# Exclusive upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_BOUNDS = [25, 50, 100, 250, 500, 1000]
+
+# Product columns the facet index reads
+FACET_FIELDS = frozenset(['category_id', 'brand', 'price', 'is_active'])
+
+
+def price_bucket(price: float) -> int:
+    """Index of the price bucket holding price"""
+    return bisect.bisect_right(PRICE_BUCKET_BOUNDS, price)
+
+
+class FacetIndex:
+    """In-memory posting lists of active products by category, brand and price bucket.
+
+    ``counts`` answers, for a set of filters, how many products each
+    category, brand and price bucket would hold. Each facet is counted with
+    every filter applied except its own, so the counts show what switching
+    to another value of that facet would return.
+    """
+
+    def __init__(self):
+        self._products: Dict[int, tuple] = {}
+        self._by_category: Dict[int, Set[int]] = {}
+        self._by_brand: Dict[str, Set[int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._products)
+
+    def add(self, product_id: int, category_id: int, brand: Optional[str], price: float):
+        with self._lock:
+            self.remove(product_id)
+            self._products[product_id] = (category_id, brand, price)
+            self._by_category.setdefault(category_id, set()).add(product_id)
+            if brand:
+                self._by_brand.setdefault(brand, set()).add(product_id)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            entry = self._products.pop(product_id, None)
+            if entry is None:
+                return
+            category_id, brand, _ = entry
+            for postings, key in ((self._by_category, category_id), (self._by_brand, brand)):
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(product_id)
+                    if not ids:
+                        del postings[key]
+
+    def _matching(self, category_id: Optional[int], brand: Optional[str], min_price: Optional[float],
+                  max_price: Optional[float], restrict_to: Optional[Set[int]]) -> Iterable[int]:
+        candidates = None
+        if category_id is not None:
+            candidates = set(self._by_category.get(category_id, ()))
+        if brand:
+            # Same substring match as the listing's ILIKE brand filter
+            needle = brand.lower()
+            matched = set()
+            for name, ids in self._by_brand.items():
+                if needle in name.lower():
+                    matched |= ids
+            candidates = matched if candidates is None else candidates & matched
+        if restrict_to is not None:
+            candidates = set(restrict_to) if candidates is None else candidates & restrict_to
+        if candidates is None:
+            candidates = self._products.keys()
+
+        if min_price is None and max_price is None:
+            return candidates
+        return [
+            product_id for product_id in candidates
+            if product_id in self._products
+            and (min_price is None or self._products[product_id][2] >= min_price)
+            and (max_price is None or self._products[product_id][2] <= max_price)
+        ]
+
+    def counts(self, category_id: Optional[int] = None, brand: Optional[str] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               restrict_to: Optional[Set[int]] = None) -> Dict[str, Counter]:
+        """Product counts per category id, brand and price bucket index"""
+        with self._lock:
+            categories = Counter(
+                self._products[product_id][0]
+                for product_id in self._matching(None, brand, min_price, max_price, restrict_to)
+            )
+            brands = Counter(
+                self._products[product_id][1]
+                for product_id in self._matching(category_id, None, min_price, max_price, restrict_to)
+                if self._products[product_id][1]
+            )
+            buckets = Counter(
+                price_bucket(self._products[product_id][2])
+                for product_id in self._matching(category_id, brand, None, None, restrict_to)
+            )
+            return {'categories': categories, 'brands': brands, 'price_buckets': buckets}
+
+
+class ProductFacetIndex:
+    """Flask extension keeping a FacetIndex of active products.
+
+    Built on first use, then kept current by SQLAlchemy session events like
+    the product search index. Bulk UPDATE statements that may change a
+    faceted column mark the index for a rebuild on next use.
+    """
+
+    extension_key = 'product_facet_index'
+
+    def __init__(self, app=None):
+        self._build_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions[self.extension_key] = {'index': FacetIndex(), 'built': False}
+        if not event.contains(Session, 'after_flush', _collect_facet_changes):
+            event.listen(Session, 'after_flush', _collect_facet_changes)
+            event.listen(Session, 'do_orm_execute', _track_bulk_facet_writes)
+            event.listen(Session, 'after_commit', _apply_facet_changes)
+            event.listen(Session, 'after_rollback', _discard_facet_changes)
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def index(self) -> FacetIndex:
+        """The current app's index, built from the database on first access"""
+        state = self._state()
+        if not state['built']:
+            self.build()
+        return state['index']
+
+    def build(self):
+        """(Re)build the index from all active products"""
+        state = self._state()
+        with self._build_lock:
+            index = FacetIndex()
+            rows = Product.query.with_entities(
+                Product.id, Product.category_id, Product.brand, Product.price
+            ).filter(Product.is_active == True).all()
+            for row in rows:
+                index.add(row.id, row.category_id, row.brand, float(row.price))
+            state['index'] = index
+            state['built'] = True
+
+    def invalidate(self):
+        """Rebuild the index on next use"""
+        self._state()['built'] = False
+
+    def facets(self, categories: List[Dict[str, Any]], **filters) -> Dict[str, List[Dict[str, Any]]]:
+        """Facet counts for the given listing filters, ready to serialize.
+
+        categories are the catalog's category dicts (id and name), used to
+        label category counts.
+        """
+        counts = self.index.counts(**filters)
+
+        buckets = []
+        lower = 0
+        for position, upper in enumerate(PRICE_BUCKET_BOUNDS + [None]):
+            buckets.append({'min': lower, 'max': upper, 'count': counts['price_buckets'].get(position, 0)})
+            lower = upper
+
+        return {
+            'categories': [
+                {'id': category['id'], 'name': category['name'], 'count': counts['categories'][category['id']]}
+                for category in categories if counts['categories'].get(category['id'])
+            ],
+            'brands': [
+                {'value': brand, 'count': count}
+                for brand, count in sorted(counts['brands'].items(), key=lambda item: (-item[1], item[0]))
+            ],
+            'price_ranges': buckets
+        }
+
+
+def _collect_facet_changes(session, flush_context):
+    pending = session.info.setdefault('facet_index_pending', {})
+    for product in session.new | session.dirty:
+        if isinstance(product, Product) and product.id is not None:
+            pending[product.id] = (
+                (product.category_id, product.brand, float(product.price))
+                if product.is_active is not False else None
+            )
+    for product in session.deleted:
+        if isinstance(product, Product) and product.id is not None:
+            pending[product.id] = None
+
+
+def _track_bulk_facet_writes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Product:
+        return
+    if orm_execute_state.is_update:
+        # Bulk updates may declare the columns they write with the
+        # updated_columns execution option; without it assume any column
+        columns = orm_execute_state.execution_options.get('updated_columns')
+        if columns is not None and not set(columns) & FACET_FIELDS:
+            # e.g. stock decrements at checkout
+            return
+    orm_execute_state.session.info['facet_index_stale'] = True
+
+
+def _apply_facet_changes(session):
+    pending = session.info.pop('facet_index_pending', None)
+    stale = session.info.pop('facet_index_stale', False)
+    if not (pending or stale) or not has_app_context():
+        return
+    state = current_app.extensions.get(ProductFacetIndex.extension_key)
+    if not state or not state['built']:
+        return
+    if stale:
+        state['built'] = False
+        return
+    index = state['index']
+    for product_id, fields in pending.items():
+        if fields is None:
+            index.remove(product_id)
+        else:
+            index.add(product_id, *fields)
+
+
+def _discard_facet_changes(session):
+    session.info.pop('facet_index_pending', None)
+    session.info.pop('facet_index_stale', None)
+
+
+product_facets = ProductFacetIndex()
@@ -0,0 +1,185 @@
+import threading
+from typing import List, Optional
+from flask import current_app
+from sqlalchemy import text, column, Integer
+from app import db
+from app.models import Product, product_loading_plan
+from app.services.search_index import TOKEN_PATTERN, STOPWORDS
+
+
+# SQLite: external-content FTS5 table mirrored from products by triggers
+SQLITE_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, brand, description,
+        content='products', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, brand, description)
+        VALUES (new.id, new.name, new.brand, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, brand, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand, description)
+        VALUES ('delete', old.id, old.name, old.brand, old.description);
+        INSERT INTO products_fts(rowid, name, brand, description)
+        VALUES (new.id, new.name, new.brand, new.description);
+    END""",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')"
+]
+
+SQLITE_TRIGGERS = ('products_fts_ai', 'products_fts_ad', 'products_fts_au')
+
+# PostgreSQL: weighted tsvector expression backed by the expression GIN index
+# ix_products_fulltext (created by migration 3f1c2b7d9a64). Queries must use the
+# same expression for the planner to pick the index. Columns are qualified
+# because product queries may join categories, which also has name and description.
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(products.name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(products.brand, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(products.description, '')), 'C')"
+)
+
+POSTGRES_SETUP = [
+    f"CREATE INDEX IF NOT EXISTS ix_products_fulltext ON products USING GIN (({POSTGRES_DOCUMENT}))"
+]
+
+
+def _query_tokens(query: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(query.lower()) if token not in STOPWORDS]
+
+
+class FullTextSearch:
+    """Optional database full-text backend for product search.
+
+    Enabled with the FULLTEXT_SEARCH setting. On SQLite it maintains an FTS5
+    table synced by triggers; on PostgreSQL it maintains a GIN index over a
+    weighted tsvector. Other databases (or SQLite builds without FTS5) report
+    the backend as unavailable so callers can fall back.
+    """
+
+    extension_key = 'fulltext_search'
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions[self.extension_key] = {'dialect': None, 'checked': False}
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def dialect(self) -> Optional[str]:
+        """Dialect name of the usable backend, or None when unavailable"""
+        state = self._state()
+        if not state['checked']:
+            with self._lock:
+                if not state['checked']:
+                    state['dialect'] = self._detect()
+                    state['checked'] = True
+        return state['dialect']
+
+    @property
+    def available(self) -> bool:
+        return self.dialect is not None
+
+    def _detect(self) -> Optional[str]:
+        if not current_app.config.get('FULLTEXT_SEARCH'):
+            return None
+
+        dialect = db.engine.dialect.name
+        try:
+            if dialect == 'sqlite':
+                # Triggers disappear when products is dropped and recreated
+                objects = set(db.session.execute(text(
+                    "SELECT name FROM sqlite_master WHERE name LIKE 'products_fts%'"
+                )).scalars())
+                if not objects.issuperset(('products_fts',) + SQLITE_TRIGGERS):
+                    self.install()
+                return dialect
+            if dialect == 'postgresql':
+                if db.session.execute(text("SELECT to_regclass('ix_products_fulltext')")).scalar() is None:
+                    print("Warning: ix_products_fulltext is missing, full-text search will scan products. "
+                          "Run `flask --app run.py db upgrade`.")
+                return dialect
+        except Exception as e:
+            db.session.rollback()
+            print(f"Full-text search unavailable: {str(e)}")
+        return None
+
+    def install(self):
+        """Create the full-text structures for the current database (on PostgreSQL,
+        what the migration creates, for databases made by create_all)"""
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            statements = SQLITE_SETUP
+        elif dialect == 'postgresql':
+            statements = POSTGRES_SETUP
+        else:
+            return
+
+        with db.engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+
+    def reset(self):
+        """Forget the detected backend, e.g. after tables were recreated"""
+        state = self._state()
+        state['checked'] = False
+        state['dialect'] = None
+
+    def filter_clause(self, query: str):
+        """Criterion on Product requiring every query term, or None"""
+        tokens = _query_tokens(query)
+        if not tokens:
+            return None
+
+        if self.dialect == 'sqlite':
+            expression = ' AND '.join(f'"{token}"*' for token in tokens)
+            return Product.id.in_(
+                text("SELECT rowid FROM products_fts WHERE products_fts MATCH :fts_query")
+                .bindparams(fts_query=expression)
+                .columns(column('rowid', Integer))
+            )
+
+        expression = ' & '.join(f'{token}:*' for token in tokens)
+        return text(f"({POSTGRES_DOCUMENT}) @@ to_tsquery('english', :fts_query)").bindparams(
+            fts_query=expression
+        )
+
+    def search(self, query: str, limit: int = 10) -> List[Product]:
+        """Return active products matching any query term, best match first"""
+        tokens = _query_tokens(query)
+        if not tokens:
+            return []
+
+        if self.dialect == 'sqlite':
+            expression = ' OR '.join(f'"{token}"*' for token in tokens)
+            rows = db.session.execute(text(
+                "SELECT products_fts.rowid FROM products_fts "
+                "JOIN products ON products.id = products_fts.rowid "
+                "WHERE products_fts MATCH :fts_query AND products.is_active = 1 "
+                "ORDER BY bm25(products_fts, 3.0, 2.0, 1.0) LIMIT :limit"
+            ), {'fts_query': expression, 'limit': limit}).all()
+        else:
+            expression = ' | '.join(f'{token}:*' for token in tokens)
+            rows = db.session.execute(text(
+                f"SELECT id FROM products "
+                f"WHERE is_active AND ({POSTGRES_DOCUMENT}) @@ to_tsquery('english', :fts_query) "
+                f"ORDER BY ts_rank(({POSTGRES_DOCUMENT}), to_tsquery('english', :fts_query)) DESC "
+                f"LIMIT :limit"
+            ), {'fts_query': expression, 'limit': limit}).all()
+
+        ids = [row[0] for row in rows]
+        if not ids:
+            return []
+        products = {product.id: product for product in Product.query.options(product_loading_plan()).filter(Product.id.in_(ids)).all()}
+        return [products[product_id] for product_id in ids if product_id in products]
+
+
+fulltext_search = FullTextSearch()
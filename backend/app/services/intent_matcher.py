@@ -0,0 +1,84 @@
+import re
+from typing import Dict, List
+
+
+INTENT_PATTERNS: Dict[str, List[str]] = {
+    'greeting': [
+        r'\b(hi|hello|hey|good morning|good afternoon|good evening)\b',
+        r'\bwhat\'s up\b',
+        r'\bhow are you\b'
+    ],
+    'search_product': [
+        r'\b(looking for|search|find|want|need|show me)\b.*\b(product|item|thing)\b',
+        r'\b(do you have|got any|sell)\b',
+        r'\b(price of|cost of|how much)\b'
+    ],
+    'category_browse': [
+        r'\b(category|categories|section|browse|explore)\b',
+        r'\b(electronics|books|clothing|home|garden|sports)\b'
+    ],
+    'product_details': [
+        r'\b(details|specifications|specs|features|info|information)\b',
+        r'\btell me (more )?about\b',
+        r'\bwhat is\b'
+    ],
+    'add_to_cart': [
+        r'\b(add to cart|buy|purchase|order|get this)\b',
+        r'\bi want (to buy|this)\b'
+    ],
+    'help': [
+        r'\b(help|assist|support|guide)\b',
+        r'\bwhat can you do\b',
+        r'\bhow does this work\b'
+    ],
+    'goodbye': [
+        r'\b(bye|goodbye|see you|thanks|thank you)\b',
+        r'\bthat\'s all\b',
+        r'\bi\'m done\b'
+    ]
+}
+
+
+class IntentMatcher:
+    """Detect chat intents with precompiled combined regexes.
+
+    All patterns are folded into one alternation where each intent is a named
+    group, ordered by priority. A scan reports the highest-priority intent
+    matching at the leftmost position; the scan then resumes just past that
+    position using a narrower pattern that only contains intents of higher
+    priority than the best one found so far. The result is identical to
+    trying every pattern in declaration order, without a ``re.search`` per
+    pattern.
+    """
+
+    def __init__(self, intent_patterns: Dict[str, List[str]], default: str = 'general'):
+        self.intents = list(intent_patterns)
+        self.default = default
+
+        groups = []
+        for index, patterns in enumerate(intent_patterns.values()):
+            alternatives = '|'.join(f'(?:{pattern})' for pattern in patterns)
+            groups.append(f'(?P<i{index}>{alternatives})')
+
+        # _patterns[k] only matches the k highest-priority intents
+        self._patterns = [None] + [
+            re.compile('|'.join(groups[:count]), re.IGNORECASE)
+            for count in range(1, len(groups) + 1)
+        ]
+        self.pattern = self._patterns[-1]
+
+    def detect(self, message: str) -> str:
+        """Return the highest-priority intent found in message"""
+        best = len(self.intents)
+        position = 0
+        while best:
+            match = self._patterns[best].search(message, position)
+            if match is None:
+                break
+            best = int(match.lastgroup[1:])
+            position = match.start() + 1
+        return self.intents[best] if best < len(self.intents) else self.default
+
+
+intent_matcher = IntentMatcher(INTENT_PATTERNS)
+
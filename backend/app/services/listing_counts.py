@@ -0,0 +1,55 @@
+import json
+from typing import Any, Dict
+from flask import current_app
+from app.services.catalog_summary import catalog_summary
+from app.utils.cache import LRUCache
+
+
+def normalize_filters(filters: Dict[str, Any]) -> str:
+    """Canonical key for a set of listing filters"""
+    normalized = {}
+    for name, value in filters.items():
+        if value is None or value == '':
+            continue
+        if isinstance(value, str):
+            value = ' '.join(value.lower().split())
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True)
+
+
+class ListingCountCache:
+    """Flask extension caching listing totals by normalized filter set.
+
+    Keys include the catalog version, so any committed product or category
+    write starts a fresh set of counts; the short TTL bounds staleness from
+    writes the version does not see (e.g. bulk UPDATE statements).
+    """
+
+    extension_key = 'listing_count_cache'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions[self.extension_key] = LRUCache(
+            max_entries=app.config.get('LISTING_COUNT_CACHE_SIZE', 1024),
+            ttl=app.config.get('LISTING_COUNT_CACHE_TTL', 30)
+        )
+
+    @property
+    def cache(self) -> LRUCache:
+        return current_app.extensions[self.extension_key]
+
+    def count(self, query, filters: Dict[str, Any]) -> int:
+        """Total rows of query, cached under its filters"""
+        key = f'{catalog_summary.version}:{normalize_filters(filters)}'
+        cached = self.cache.get(key)
+        if cached is not None:
+            return int(cached)
+        total = query.order_by(None).count()
+        self.cache.set(key, str(total))
+        return total
+
+
+listing_counts = ListingCountCache()
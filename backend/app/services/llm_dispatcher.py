@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterator
+
+
+class LLMOverloadedError(Exception):
+    """Raised when the dispatcher has no free slot for another LLM call"""
+
+
+class LLMTimeoutError(Exception):
+    """Raised when an LLM call does not finish within the dispatch timeout"""
+
+
+class LLMDispatcher:
+    """Runs LLM calls on a bounded worker pool, off the request thread.
+
+    At most ``max_concurrency`` calls run at once and at most ``max_queue``
+    more wait for a worker. Anything beyond that is rejected immediately
+    with LLMOverloadedError, so a slow LLM can only ever tie up a bounded
+    number of web workers; the rest stay free for catalog traffic. Callers
+    wait at most ``timeout`` seconds for a result. Requests waiting on a
+    call made for another request take a slot too (``slot``), since they
+    hold a web worker just the same.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 16, timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._slots = threading.BoundedSemaphore(max_concurrency + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._waiting = 0
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timeouts': 0}
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise LLMOverloadedError('LLM dispatcher is at capacity')
+        with self._lock:
+            self._queued += 1
+            self._counters['submitted'] += 1
+
+    @property
+    def full(self) -> bool:
+        """Whether a call made now would be rejected"""
+        with self._lock:
+            return self._queued + self._in_flight + self._waiting >= self.max_concurrency + self.max_queue
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot while waiting for a call made elsewhere; LLMOverloadedError if none is free"""
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise LLMOverloadedError('LLM dispatcher is at capacity')
+        with self._lock:
+            self._waiting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._waiting -= 1
+            self._slots.release()
+
+    def _run(self, fn: Callable, args, kwargs, submitted_at: float):
+        started_at = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._in_flight += 1
+            self._total_wait += started_at - submitted_at
+        try:
+            result = fn(*args, **kwargs)
+            self._count('completed')
+            return result
+        except Exception:
+            self._count('failed')
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._total_run += time.monotonic() - started_at
+            self._slots.release()
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on the LLM pool and wait for its result"""
+        self._acquire()
+        future = self._executor.submit(self._run, fn, args, kwargs, time.monotonic())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._count('timeouts')
+            raise LLMTimeoutError(f'LLM call did not finish within {self.timeout}s')
+
+    def stream(self, fn: Callable[..., Iterator], *args, **kwargs) -> Iterator:
+        """Iterate fn(*args) on the LLM pool, yielding items as they arrive.
+
+        The timeout applies to the gap between consecutive items.
+        """
+        self._acquire()
+        items = queue.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for item in fn(*args, **kwargs):
+                    items.put((item, None))
+            except Exception as e:
+                items.put((None, e))
+                raise
+            items.put((done, None))
+
+        self._executor.submit(self._run, produce, (), {}, time.monotonic())
+        while True:
+            try:
+                item, error = items.get(timeout=self.timeout)
+            except queue.Empty:
+                self._count('timeouts')
+                raise LLMTimeoutError(f'LLM stream stalled for more than {self.timeout}s')
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of pool utilization and call outcomes"""
+        with self._lock:
+            started = self._counters['completed'] + self._counters['failed'] + self._in_flight
+            finished = self._counters['completed'] + self._counters['failed']
+            return {
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queue_depth': self._queued,
+                'waiting': self._waiting,
+                **self._counters,
+                'avg_queue_wait_ms': round(self._total_wait / started * 1000, 2) if started else 0.0,
+                'avg_run_ms': round(self._total_run / finished * 1000, 2) if finished else 0.0
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
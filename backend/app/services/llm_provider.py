@@ -0,0 +1,304 @@
+import re
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+from app.services.llm_dispatcher import LLMDispatcher, LLMOverloadedError
+
+
+class LLMUnavailableError(Exception):
+    """Raised without calling the provider while its circuit breaker is open"""
+
+
+class LLMProvider:
+    """A text generation backend.
+
+    ``generate`` returns the full answer to a prompt and ``stream`` yields
+    it in pieces. Both should give up after ``timeout`` seconds.
+    """
+
+    name = 'provider'
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        yield self.generate(prompt, timeout)
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through the google-generativeai client"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key: str, model: str, api_endpoint: Optional[str] = None,
+                 transport: Optional[str] = None):
+        import google.generativeai as genai
+
+        options = {}
+        if api_endpoint:
+            options['client_options'] = {'api_endpoint': api_endpoint}
+        if transport:
+            options['transport'] = transport
+        genai.configure(api_key=api_key, **options)
+        self.model_name = model
+        self.model = genai.GenerativeModel(model_name=model)
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        return self.model.generate_content(prompt, request_options={'timeout': timeout}).text
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True, request_options={'timeout': timeout}):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. only safety ratings)
+                continue
+            if text:
+                yield text
+
+
+# Prompt lines LocalProvider answers from: the question and listed products
+_QUESTION_PATTERN = re.compile(r'The user asked: "(.*)"')
+_PRODUCT_PATTERN = re.compile(r'^- ([^|\n]+?) \|.*?(\$[\d.]+)', re.MULTILINE)
+
+
+class LocalProvider(LLMProvider):
+    """Deterministic offline stand-in for an LLM, for tests and benchmarks.
+
+    Answers from the prompt alone: it repeats the question and names the
+    first products listed in the prompt's store context. ``delay`` seconds
+    are spent on every call to mimic model latency.
+    """
+
+    name = 'local'
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        if self.delay:
+            time.sleep(min(self.delay, timeout))
+        question = _QUESTION_PATTERN.search(prompt)
+        products = _PRODUCT_PATTERN.findall(prompt)[:3]
+        answer = f"You asked: {question.group(1) if question else 'a question'}."
+        if products:
+            answer += ' You might like ' + ', '.join(f"{name} ({price})" for name, price in products) + '.'
+        else:
+            answer += " I couldn't find a matching product in our catalog."
+        return answer + ' Is there anything else I can help with?'
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        for word in re.findall(r'\S+\s*', self.generate(prompt, timeout)):
+            yield word
+
+
+class CircuitBreaker:
+    """Stops calls to a failing dependency for a while.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    ``allow`` refuses calls for ``reset_timeout`` seconds. Then one trial
+    call is let through (half-open): success closes the circuit, failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return 'open'
+            return 'half_open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def cancel_trial(self):
+        """Give back a half-open trial that ended without an outcome"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def _percentile(ordered, pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class ResilientLLM:
+    """Calls an LLMProvider on the dispatcher pool with timeouts, retries and a circuit breaker.
+
+    Every attempt is bounded by ``timeout`` seconds, both in the provider
+    request and in the wait for the pool. Failed attempts are retried up to
+    ``retries`` times after an exponential backoff with full jitter. Once
+    the breaker opens, calls fail at once with LLMUnavailableError so
+    callers can answer from rule-based handlers. A pool at capacity is
+    reported as LLMOverloadedError and is neither retried nor counted
+    against the provider.
+    """
+
+    def __init__(self, provider: LLMProvider, dispatcher: LLMDispatcher, timeout: float = 30.0,
+                 retries: int = 1, backoff: float = 0.2, breaker: Optional[CircuitBreaker] = None,
+                 latency_window: int = 1000):
+        self.provider = provider
+        self.dispatcher = dispatcher
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'succeeded': 0, 'failed': 0, 'attempt_errors': 0,
+                          'retries': 0, 'short_circuited': 0}
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _admit(self):
+        self._count('calls')
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise LLMUnavailableError(f'{self.name} circuit is open')
+
+    def _record(self, started_at: float, ok: bool):
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        with self._lock:
+            self._latencies.append(time.monotonic() - started_at)
+            if not ok:
+                self._counters['attempt_errors'] += 1
+
+    def _should_retry(self, attempt: int) -> bool:
+        if attempt >= self.retries or not self.breaker.allow():
+            return False
+        # allow() above may have claimed the half-open trial; the retry is that trial
+        self._count('retries')
+        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        return True
+
+    def generate(self, prompt: str) -> str:
+        """Full answer to prompt"""
+        self._admit()
+        attempt = 0
+        while True:
+            started_at = time.monotonic()
+            try:
+                text = self.dispatcher.call(self.provider.generate, prompt, self.timeout)
+            except LLMOverloadedError:
+                self.breaker.cancel_trial()
+                raise
+            except Exception:
+                self._record(started_at, ok=False)
+                if not self._should_retry(attempt):
+                    self._count('failed')
+                    raise
+                attempt += 1
+                continue
+            self._record(started_at, ok=True)
+            self._count('succeeded')
+            return text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Answer to prompt in pieces; only retried if nothing was yielded yet"""
+        self._admit()
+        attempt = 0
+        while True:
+            started_at = time.monotonic()
+            yielded = False
+            try:
+                for text in self.dispatcher.stream(self.provider.stream, prompt, self.timeout):
+                    yielded = True
+                    yield text
+            except GeneratorExit:
+                # The consumer stopped reading; not the provider's fault
+                self.breaker.cancel_trial()
+                raise
+            except LLMOverloadedError:
+                self.breaker.cancel_trial()
+                raise
+            except Exception:
+                self._record(started_at, ok=False)
+                if yielded or not self._should_retry(attempt):
+                    self._count('failed')
+                    raise
+                attempt += 1
+                continue
+            self._record(started_at, ok=True)
+            self._count('succeeded')
+            return
+
+    def metrics(self) -> Dict[str, Any]:
+        """Call outcomes and attempt latency percentiles of this provider"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self._counters)
+        attempts = counters['succeeded'] + counters['attempt_errors']
+        return {
+            'provider': self.name,
+            'circuit': self.breaker.state,
+            **counters,
+            'error_rate': round(counters['attempt_errors'] / attempts, 4) if attempts else 0.0,
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 2) if latencies else 0.0,
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 2) if latencies else 0.0,
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 2) if latencies else 0.0
+        }
+
+
+def create_provider(name: str, config) -> Optional[LLMProvider]:
+    """Build the LLM provider configured by name ('gemini' or 'local'), or None"""
+    if name == 'local':
+        return LocalProvider(delay=config.get('LLM_LOCAL_DELAY', 0.0))
+    if name != 'gemini':
+        raise ValueError(f'Unknown LLM provider: {name}')
+
+    api_key = config.get('GEMINI_API_KEY')
+    if not api_key:
+        print("Warning: GEMINI_API_KEY not found. Using fallback responses.")
+        return None
+    try:
+        provider = GeminiProvider(
+            api_key,
+            config.get('GEMINI_MODEL', 'gemini-2.0-flash-exp'),
+            api_endpoint=config.get('GEMINI_API_ENDPOINT'),
+            transport=config.get('GEMINI_TRANSPORT')
+        )
+    except Exception as e:
+        print(f"Error initializing Gemini AI: {str(e)}")
+        return None
+    print(f"Gemini AI initialized with model: {provider.model_name}")
+    return provider
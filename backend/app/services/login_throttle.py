@@ -0,0 +1,133 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+from flask import current_app
+
+
+class TokenBuckets:
+    """Per-key token buckets holding up to ``limit`` tokens, refilled over ``window`` seconds.
+
+    Only the ``max_keys`` most recently used keys are tracked; a forgotten
+    key starts again with a full bucket.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 10000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated_at = self._buckets.get(key, (self.limit, now))
+        return min(self.limit, tokens + (now - updated_at) * self.limit / self.window)
+
+    def _set(self, key: str, tokens: float, now: float):
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def take_if_available(self, key: str) -> float:
+        """Use up one token of key if it has one and return 0, else seconds until it has one"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens >= 1:
+                self._set(key, tokens - 1, now)
+                return 0.0
+        return (1 - tokens) * self.window / self.limit
+
+    def give_back(self, key: str):
+        """Return a token taken with take_if_available"""
+        now = time.monotonic()
+        with self._lock:
+            if key in self._buckets:
+                self._set(key, min(self.limit, self._tokens(key, now) + 1), now)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LoginThrottle:
+    """Flask extension admitting login attempts per client IP and per account.
+
+    Each IP may make LOGIN_IP_LIMIT attempts per LOGIN_IP_WINDOW seconds,
+    successful or not, which caps credential stuffing from one address.
+    Behind a reverse proxy, set TRUSTED_PROXY_COUNT so the IP is the
+    client's rather than the proxy's.
+    Each account may take LOGIN_ACCOUNT_LIMIT failed attempts per
+    LOGIN_ACCOUNT_WINDOW seconds; a successful login clears its count.
+    Refused attempts are turned away before any password is hashed.
+
+    ``admit`` reserves the account's token up front, so a concurrent burst
+    against one account cannot get more attempts in flight than the limit;
+    a successful attempt, or one that could not be checked, gets it back.
+    """
+
+    extension_key = 'login_throttle'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions[self.extension_key] = {
+            'ips': TokenBuckets(app.config.get('LOGIN_IP_LIMIT', 20), app.config.get('LOGIN_IP_WINDOW', 60)),
+            'accounts': TokenBuckets(app.config.get('LOGIN_ACCOUNT_LIMIT', 5), app.config.get('LOGIN_ACCOUNT_WINDOW', 300)),
+            'lock': threading.Lock(),
+            'counters': {'admitted': 0, 'ip_throttled': 0, 'account_throttled': 0, 'failures': 0}
+        }
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    def _count(self, state, name: str):
+        with state['lock']:
+            state['counters'][name] += 1
+
+    def admit(self, ip: str, account: str) -> float:
+        """0 if the attempt may go ahead (using up one of the IP's and one of the account's
+        attempts), else seconds to wait"""
+        state = self._state()
+        account = account.strip().lower()
+        retry_after = state['ips'].take_if_available(ip)
+        if retry_after:
+            self._count(state, 'ip_throttled')
+            return retry_after
+        retry_after = state['accounts'].take_if_available(account)
+        if retry_after:
+            # Refused attempts do not count against the IP
+            state['ips'].give_back(ip)
+            self._count(state, 'account_throttled')
+            return retry_after
+        self._count(state, 'admitted')
+        return 0.0
+
+    def record_failure(self, account: str):
+        # The account's token was taken by admit
+        self._count(self._state(), 'failures')
+
+    def record_success(self, account: str):
+        self._state()['accounts'].reset(account.strip().lower())
+
+    def release(self, account: str):
+        """Give back the account attempt admit reserved, for an attempt that could not be checked"""
+        self._state()['accounts'].give_back(account.strip().lower())
+
+    def metrics(self) -> Dict[str, Any]:
+        state = self._state()
+        with state['lock']:
+            return {
+                **state['counters'],
+                'tracked_ips': len(state['ips']),
+                'tracked_accounts': len(state['accounts'])
+            }
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,212 @@
+import uuid
+from collections import OrderedDict, defaultdict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models import Order, OrderItem, Product
+
+
+class OrderError(Exception):
+    """Raised when an order cannot be placed; carries the HTTP status to return"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class OrderResult:
+    """Outcome of one order of a batch: the created order or the reason it failed"""
+
+    __slots__ = ('order', 'error', 'lines', 'requested')
+
+    def __init__(self, lines=None, requested=None, error: Optional[OrderError] = None):
+        self.order: Optional[Order] = None
+        self.error = error
+        self.lines = lines
+        self.requested = requested
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# Attempts at taking stock before giving up on a batch whose stock keeps
+# changing underneath it (only possible where rows cannot be locked)
+STOCK_ATTEMPTS = 3
+
+# Declared on the stock UPDATEs so indexes over other product columns
+# (the facet index) know they are unaffected
+STOCK_COLUMNS = ('stock_quantity',)
+
+
+def _positive_int(value) -> bool:
+    # bool is an int subclass; true would otherwise be accepted as 1
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _parse_order(data) -> OrderResult:
+    """Validate one order payload into cart lines and per-product quantities"""
+    if not isinstance(data, dict):
+        return OrderResult(error=OrderError('Invalid order data'))
+
+    items = data.get('items')
+    if not items or not isinstance(items, list):
+        return OrderResult(error=OrderError('Order items are required'))
+
+    lines = []
+    for item_data in items:
+        product_id = item_data.get('product_id') if isinstance(item_data, dict) else None
+        quantity = item_data.get('quantity', 1) if isinstance(item_data, dict) else None
+        if not _positive_int(product_id) or not _positive_int(quantity):
+            return OrderResult(error=OrderError('Invalid item data'))
+        lines.append((product_id, quantity))
+
+    if not data.get('shipping_address'):
+        return OrderResult(error=OrderError('Shipping address is required'))
+
+    # Total quantity per product, in first-seen order
+    requested = OrderedDict()
+    for product_id, quantity in lines:
+        requested[product_id] = requested.get(product_id, 0) + quantity
+    return OrderResult(lines, requested)
+
+
+def _allocate(results: List[OrderResult], products: Dict[int, Product],
+              available: Dict[int, int]) -> Dict[int, int]:
+    """Accept orders in turn while stock lasts; return the units taken per product"""
+    taken: Dict[int, int] = {}
+    for result in results:
+        if result.requested is None:
+            continue
+        result.error = None
+        for product_id, quantity in result.requested.items():
+            product = products.get(product_id)
+            if not product or not product.is_active:
+                result.error = OrderError(f'Product {product_id} not found', 404)
+                break
+        else:
+            for product_id, quantity in result.requested.items():
+                if available[product_id] - taken.get(product_id, 0) < quantity:
+                    result.error = OrderError(f'Insufficient stock for {products[product_id].name}')
+                    break
+        if result.error is None:
+            for product_id, quantity in result.requested.items():
+                taken[product_id] = taken.get(product_id, 0) + quantity
+    return taken
+
+
+def _take_stock(taken: Dict[int, int]) -> bool:
+    """Decrement stock for every product, or for none if any ran short"""
+    applied = []
+    for product_id in sorted(taken):
+        quantity = taken[product_id]
+        result = db.session.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.stock_quantity >= quantity)
+            .values(stock_quantity=Product.stock_quantity - quantity)
+            .execution_options(updated_columns=STOCK_COLUMNS)
+        )
+        if result.rowcount != 1:
+            # Another checkout took the stock after our read; give back what
+            # this attempt already took
+            for applied_id, applied_quantity in applied:
+                db.session.execute(
+                    update(Product)
+                    .where(Product.id == applied_id)
+                    .values(stock_quantity=Product.stock_quantity + applied_quantity)
+                    .execution_options(updated_columns=STOCK_COLUMNS)
+                )
+            return False
+        applied.append((product_id, quantity))
+    return True
+
+
+def place_orders(user_id, orders_data: List[Dict[str, Any]]) -> List[OrderResult]:
+    """Create a batch of orders and reserve their stock in the current transaction.
+
+    All products of the batch are fetched in one query, locked with SELECT ...
+    FOR UPDATE on databases that support it (in id order, so concurrent
+    checkouts cannot deadlock). Orders are accepted in turn while stock lasts,
+    then stock is taken with one conditional ``UPDATE ... WHERE stock_quantity
+    >= :quantity`` per product, so two checkouts racing for the last units
+    cannot both succeed even where rows are not locked; if one of those
+    updates finds the stock gone, stock is re-read and the batch allocated
+    again. Orders are inserted together and their items in one executemany.
+
+    Returns one OrderResult per payload, in order. Nothing is committed; the
+    caller commits or rolls back.
+    """
+    results = [_parse_order(data) for data in orders_data]
+
+    product_ids = sorted({product_id for result in results if result.ok for product_id in result.requested})
+    products = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(product_ids))
+                                    .order_by(Product.id)
+                                    .with_for_update()
+    } if product_ids else {}
+    available = {product_id: product.stock_quantity for product_id, product in products.items()}
+
+    for attempt in range(STOCK_ATTEMPTS):
+        taken = _allocate(results, products, available)
+        if _take_stock(taken):
+            break
+        available = dict(
+            db.session.query(Product.id, Product.stock_quantity).filter(Product.id.in_(product_ids))
+        )
+    else:
+        for result in results:
+            if result.requested is not None and result.ok:
+                result.error = OrderError('Stock changed during checkout, please try again', 409)
+
+    accepted = [(result, data) for result, data in zip(results, orders_data) if result.ok]
+    if not accepted:
+        return results
+
+    for result, data in accepted:
+        total_amount = sum((products[product_id].price * quantity for product_id, quantity in result.lines),
+                           Decimal('0'))
+        result.order = Order(
+            user_id=user_id,
+            order_number=f'ORD-{uuid.uuid4().hex[:8].upper()}',
+            total_amount=total_amount,
+            shipping_address=data['shipping_address'],
+            billing_address=data.get('billing_address', data['shipping_address']),
+            payment_method=data.get('payment_method', 'card')
+        )
+    db.session.add_all([result.order for result, _ in accepted])
+    db.session.flush()
+
+    db.session.execute(insert(OrderItem), [
+        {
+            'order_id': result.order.id,
+            'product_id': product_id,
+            'quantity': quantity,
+            'unit_price': products[product_id].price,
+            'total_price': products[product_id].price * quantity
+        }
+        for result, _ in accepted
+        for product_id, quantity in result.lines
+    ])
+
+    # Attach the new items to their orders (their products are already in
+    # the session) so the orders serialize without further queries
+    items_by_order = defaultdict(list)
+    order_ids = [result.order.id for result, _ in accepted]
+    for item in OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.id):
+        items_by_order[item.order_id].append(item)
+    for result, _ in accepted:
+        set_committed_value(result.order, 'items', items_by_order[result.order.id])
+
+    return results
+
+
+def place_order(user_id, data: Dict[str, Any]) -> Order:
+    """Create one order and reserve its stock; raises OrderError if it cannot be placed"""
+    result = place_orders(user_id, [data])[0]
+    if not result.ok:
+        raise result.error
+    return result.order
@@ -0,0 +1,118 @@
+import time
+import threading
+import bcrypt
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict
+from flask import current_app
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the password hashing pool has no free slot for another hash"""
+
+
+class PasswordHasher:
+    """Flask extension running bcrypt on a small bounded pool, off the request thread.
+
+    bcrypt releases the GIL while it works, so a thread pool is enough to
+    cap how many CPU cores hashing can take: at most
+    PASSWORD_HASH_WORKERS hashes run at once and PASSWORD_HASH_QUEUE more
+    wait. Anything beyond that fails at once with PasswordHasherBusyError
+    instead of tying up another web worker, so a burst of logins cannot
+    starve catalog requests. New hashes use BCRYPT_ROUNDS; ``needs_rehash``
+    tells whether a stored hash was made with a different cost.
+    """
+
+    extension_key = 'password_hasher'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        app.extensions[self.extension_key] = {
+            'rounds': app.config.get('BCRYPT_ROUNDS', 12),
+            'timeout': app.config.get('PASSWORD_HASH_TIMEOUT', 10),
+            'workers': workers,
+            'max_queue': app.config.get('PASSWORD_HASH_QUEUE', 16),
+            'executor': ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt'),
+            'slots': threading.BoundedSemaphore(workers + app.config.get('PASSWORD_HASH_QUEUE', 16)),
+            'lock': threading.Lock(),
+            'counters': {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0, 'timeouts': 0},
+            'total_wait': 0.0,
+            'total_run': 0.0
+        }
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    def _count(self, state, name: str):
+        with state['lock']:
+            state['counters'][name] += 1
+
+    def _submit(self, fn: Callable, *args) -> Any:
+        state = self._state()
+        if not state['slots'].acquire(blocking=False):
+            self._count(state, 'rejected')
+            raise PasswordHasherBusyError('Password hashing pool is at capacity')
+
+        def run(submitted_at):
+            started_at = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                with state['lock']:
+                    state['total_wait'] += started_at - submitted_at
+                    state['total_run'] += time.monotonic() - started_at
+                state['slots'].release()
+
+        future = state['executor'].submit(run, time.monotonic())
+        try:
+            return future.result(timeout=state['timeout'])
+        except FutureTimeoutError:
+            self._count(state, 'timeouts')
+            raise PasswordHasherBusyError(f"Password hashing did not finish within {state['timeout']}s")
+
+    @property
+    def rounds(self) -> int:
+        return self._state()['rounds']
+
+    def hash(self, password: str) -> str:
+        """bcrypt hash of password at the configured cost"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        hashed = self._submit(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+        self._count(self._state(), 'hashed')
+        return hashed
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """Whether password matches the bcrypt hash"""
+        matches = self._submit(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+        self._count(self._state(), 'verified')
+        return matches
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Whether hashed was made with a different cost than BCRYPT_ROUNDS"""
+        # bcrypt hashes look like $2b$<rounds>$<salt and checksum>
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def record_rehash(self):
+        self._count(self._state(), 'rehashed')
+
+    def metrics(self) -> Dict[str, Any]:
+        state = self._state()
+        with state['lock']:
+            finished = state['counters']['hashed'] + state['counters']['verified']
+            return {
+                'rounds': state['rounds'],
+                'workers': state['workers'],
+                'max_queue': state['max_queue'],
+                **state['counters'],
+                'avg_queue_wait_ms': round(state['total_wait'] / finished * 1000, 2) if finished else 0.0,
+                'avg_run_ms': round(state['total_run'] / finished * 1000, 2) if finished else 0.0
+            }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,27 @@
+from typing import List
+from sqlalchemy import or_
+from app.models import Product
+from app.services.fulltext import fulltext_search
+from app.services.search_index import product_index
+
+
+def search_products(query: str, limit: int = 10) -> List[Product]:
+    """Ranked product search using the best available backend"""
+    if fulltext_search.available:
+        return fulltext_search.search(query, limit=limit)
+    return product_index.search(query, limit=limit)
+
+
+def search_filter(query: str):
+    """Criterion restricting a Product query to rows matching query"""
+    if fulltext_search.available:
+        clause = fulltext_search.filter_clause(query)
+        if clause is not None:
+            return clause
+
+    search_term = f'%{query}%'
+    return or_(
+        Product.name.ilike(search_term),
+        Product.description.ilike(search_term),
+        Product.brand.ilike(search_term)
+    )
@@ -0,0 +1,89 @@
+from typing import Dict, List
+from flask import current_app
+from app.models import Product, product_loading_plan
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog_summary import catalog_summary
+from app.services.conversation import clip_text
+from app.services.embedding_index import product_embeddings
+from app.services.product_search import search_products
+from app.services.search_index import tokenize
+
+
+def product_snippet(product: Product, description_chars: int = 60) -> str:
+    """One-line structured description of a product for an LLM prompt"""
+    fields = [product.name, product.brand, product.category.name if product.category else None,
+              f"${float(product.price):.2f}"]
+    if product.review_count:
+        fields.append(f"rated {product.rating:.1f}/5")
+    fields.append('in stock' if product.stock_quantity else 'out of stock')
+
+    specs = []
+    for key, value in (product.specifications or {}).items():
+        if isinstance(value, bool):
+            value = 'yes' if value else 'no'
+        specs.append(f"{key.replace('_', ' ')}: {value}")
+    if specs:
+        fields.append('; '.join(specs))
+    if product.description and description_chars:
+        fields.append(clip_text(product.description, description_chars))
+    return ' | '.join(field for field in fields if field)
+
+
+class CatalogContextBuilder:
+    """Builds the store context of an LLM prompt from products relevant to the message.
+
+    Up to ``product_limit`` products are retrieved for the message with the
+    semantic index when it is enabled, else (or when it finds nothing) with
+    the regular product search. Each is rendered as a one-line snippet,
+    cached per product in the catalog cache, so repeat questions about the
+    same products do not load or format them again.
+    """
+
+    def __init__(self, product_limit: int = 5, description_chars: int = 0, semantic: bool = True):
+        self.product_limit = product_limit
+        self.description_chars = description_chars
+        self.semantic = semantic and product_embeddings.enabled
+
+    def relevant_product_ids(self, message: str) -> List[int]:
+        """Ids of the catalog products most relevant to message, best first"""
+        if not tokenize(message):
+            return []
+        if self.semantic:
+            try:
+                ranked = product_embeddings.index.search(
+                    message, limit=self.product_limit,
+                    min_score=current_app.config.get('EMBEDDING_MIN_SCORE', 0.2)
+                )
+                if ranked:
+                    return [product_id for product_id, _ in ranked]
+            except Exception as e:
+                print(f"Embedding retrieval error: {str(e)}")
+        return [product.id for product in search_products(message, limit=self.product_limit)]
+
+    def _build_snippets(self, product_ids: List[int]) -> Dict[int, str]:
+        products = Product.query.options(product_loading_plan())\
+                                .filter(Product.id.in_(product_ids), Product.is_active == True)
+        return {product.id: product_snippet(product, self.description_chars) for product in products}
+
+    def snippets(self, message: str) -> List[str]:
+        """Snippets of the products relevant to message, best first"""
+        ids = self.relevant_product_ids(message)
+        if not ids:
+            return []
+        snippets = catalog_cache.get_or_build_snippets(ids, self._build_snippets)
+        return [snippets[product_id] for product_id in ids if product_id in snippets]
+
+    def build(self, message: str) -> str:
+        """Store context for a prompt answering message"""
+        departments = ', '.join(
+            category['name'] for category in catalog_summary.get()['categories'] if category['parent_id'] is None
+        )
+        lines = [f"DEPARTMENTS: {departments}", '']
+
+        snippets = self.snippets(message)
+        if snippets:
+            lines.append('PRODUCTS RELEVANT TO THE QUESTION (name | brand | category | price | details):')
+            lines.extend(f"- {snippet}" for snippet in snippets)
+        else:
+            lines.append('No catalog products matched the question.')
+        return '\n'.join(lines)
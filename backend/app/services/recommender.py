@@ -0,0 +1,377 @@
+import os
+import time
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Order, OrderItem, ChatSession, ChatMessage, Product, product_loading_plan
+from app.services.catalog_summary import catalog_summary
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional, only needed for co-occurrence recommendations
+    np = None
+    sparse = None
+
+
+# Weight of a pair of products shown together in one chat session, relative
+# to a pair bought in the same order
+CHAT_MENTION_WEIGHT = 0.25
+
+# Orders whose items say nothing about what goes together
+IGNORED_ORDER_STATUSES = ('cancelled',)
+
+# Most recent bot messages of a user read for their chat history
+USER_CHAT_HISTORY = 50
+
+
+def _mentioned_products(extra_data) -> List[int]:
+    """Ids of the products a bot message listed"""
+    if not isinstance(extra_data, dict):
+        return []
+    return [
+        product['id'] for product in extra_data.get('products') or ()
+        if isinstance(product, dict) and isinstance(product.get('id'), int)
+    ]
+
+
+class CooccurrenceModel:
+    """Item-item co-occurrence counts held in a sparse matrix.
+
+    ``counts[i, j]`` is the weighted number of baskets (orders, chat
+    sessions) holding both products i and j, and ``occurrences[i]`` the
+    weighted number of baskets holding product i. Scores are counts
+    normalized by the square root of both occurrences (cosine similarity),
+    so best sellers do not outrank everything.
+    """
+
+    def __init__(self):
+        self.product_ids = np.zeros(0, dtype=np.int64)
+        self.positions: Dict[int, int] = {}
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.occurrences = np.zeros(0, dtype=np.float32)
+        self.last_order_id = 0
+        self.last_message_id = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _position(self, product_id: int) -> int:
+        position = self.positions.get(product_id)
+        if position is None:
+            position = self.positions[product_id] = len(self.positions)
+        return position
+
+    def add_baskets(self, baskets: Iterable[Tuple[Iterable[int], float]]):
+        """Count every pair of distinct products in each (product ids, weight) basket
+
+        A negative weight takes a basket counted earlier out again.
+        """
+        rows, columns, values = [], [], []
+        occurrence_positions, occurrence_weights = [], []
+        for product_ids, weight in baskets:
+            positions = sorted({self._position(product_id) for product_id in product_ids})
+            for position in positions:
+                occurrence_positions.append(position)
+                occurrence_weights.append(weight)
+            for i, first in enumerate(positions):
+                for second in positions[i + 1:]:
+                    rows.extend((first, second))
+                    columns.extend((second, first))
+                    values.extend((weight, weight))
+
+        size = len(self.positions)
+        if size > len(self.product_ids):
+            self.product_ids = np.array(list(self.positions), dtype=np.int64)
+            self.occurrences = np.pad(self.occurrences, (0, size - len(self.occurrences)))
+            # New products get empty rows and columns
+            indptr = np.pad(self.counts.indptr, (0, size - self.counts.shape[0]), mode='edge')
+            self.counts = sparse.csr_matrix((self.counts.data, self.counts.indices, indptr), shape=(size, size))
+
+        if rows:
+            delta = sparse.coo_matrix((values, (rows, columns)), shape=(size, size), dtype=np.float32)
+            self.counts = (self.counts + delta.tocsr()).tocsr()
+        if occurrence_positions:
+            np.add.at(self.occurrences, occurrence_positions, np.asarray(occurrence_weights, dtype=np.float32))
+
+    def copy(self) -> 'CooccurrenceModel':
+        """Copy that can be updated while readers keep using this one"""
+        model = CooccurrenceModel()
+        model.product_ids = self.product_ids
+        model.positions = dict(self.positions)
+        model.counts = self.counts
+        model.occurrences = self.occurrences.copy()
+        model.last_order_id = self.last_order_id
+        model.last_message_id = self.last_message_id
+        return model
+
+    def scores(self, history: Dict[int, float]):
+        """Score of every product for weighted history, or None if none of it is known"""
+        positions = [self.positions[product_id] for product_id in history if product_id in self.positions]
+        if not positions:
+            return None
+        norms = np.sqrt(np.maximum(self.occurrences, 1.0))
+        weights = np.zeros(len(self.positions), dtype=np.float32)
+        for product_id, weight in history.items():
+            position = self.positions.get(product_id)
+            if position is not None:
+                weights[position] += weight
+        scores = self.counts.dot(weights / norms) / norms
+        # Never recommend what is already in the history
+        scores[positions] = 0.0
+        return scores
+
+    def top(self, history: Dict[int, float], limit: int) -> List[int]:
+        """Up to limit product ids with a positive score for history, best first"""
+        scores = self.scores(history)
+        if scores is None or limit <= 0:
+            return []
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.lexsort((self.product_ids[candidates], -scores[candidates]))]
+        return [int(product_id) for product_id in self.product_ids[candidates]]
+
+    def save(self, path: str):
+        sparse.save_npz(path, self.counts)
+        np.savez(
+            _meta_path(path),
+            product_ids=self.product_ids,
+            occurrences=self.occurrences,
+            watermarks=np.array([self.last_order_id, self.last_message_id], dtype=np.int64)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'CooccurrenceModel':
+        model = cls()
+        model.counts = sparse.load_npz(path).tocsr().astype(np.float32)
+        with np.load(_meta_path(path)) as meta:
+            model.product_ids = meta['product_ids']
+            model.occurrences = meta['occurrences'].astype(np.float32)
+            model.last_order_id, model.last_message_id = (int(value) for value in meta['watermarks'])
+        model.positions = {int(product_id): position for position, product_id in enumerate(model.product_ids)}
+        return model
+
+
+def _meta_path(path: str) -> str:
+    root, _ = os.path.splitext(path)
+    return f'{root}.meta.npz'
+
+
+def _order_baskets(after_id: int) -> Tuple[List[Tuple[List[int], float]], int]:
+    """Products of each order placed after after_id, and the last order id seen"""
+    baskets: Dict[int, List[int]] = {}
+    last_id = after_id
+    rows = db.session.query(OrderItem.order_id, OrderItem.product_id, Order.status)\
+                     .join(Order, Order.id == OrderItem.order_id)\
+                     .filter(OrderItem.order_id > after_id)
+    for order_id, product_id, status in rows:
+        last_id = max(last_id, order_id)
+        if status not in IGNORED_ORDER_STATUSES:
+            baskets.setdefault(order_id, []).append(product_id)
+    return [(products, 1.0) for products in baskets.values()], last_id
+
+
+def _chat_baskets(after_id: int) -> Tuple[List[Tuple[List[int], float]], int]:
+    """Changes to the products listed together per chat session since message after_id, and the last message id seen
+
+    A session is one basket of everything it listed, so a session with new
+    messages is read whole: its basket as counted before is taken out again
+    (negative weight) and the complete one counted in.
+    """
+    is_bot = ChatMessage.message_type == 'bot'
+    last_id = max(db.session.query(func.max(ChatMessage.id)).filter(is_bot).scalar() or 0, after_id)
+    if last_id == after_id:
+        return [], last_id
+    updated = db.session.query(ChatMessage.session_id)\
+                        .filter(ChatMessage.id > after_id, ChatMessage.id <= last_id, is_bot)
+    rows = db.session.query(ChatMessage.id, ChatMessage.session_id, ChatMessage.extra_data)\
+                     .filter(ChatMessage.session_id.in_(updated), ChatMessage.id <= last_id, is_bot)
+    counted: Dict[int, List[int]] = {}
+    baskets: Dict[int, List[int]] = {}
+    for message_id, session_id, extra_data in rows:
+        products = _mentioned_products(extra_data)
+        if products:
+            baskets.setdefault(session_id, []).extend(products)
+            if message_id <= after_id:
+                counted.setdefault(session_id, []).extend(products)
+    return ([(products, CHAT_MENTION_WEIGHT) for products in baskets.values()] +
+            [(products, -CHAT_MENTION_WEIGHT) for products in counted.values()]), last_id
+
+
+class Recommender:
+    """Flask extension recommending products from order and chat co-occurrence.
+
+    The model is loaded from RECOMMENDER_MODEL_PATH when that file exists
+    (written offline by ``python run.py build-recommender``), otherwise built
+    from the database on first use. Every RECOMMENDER_REFRESH_INTERVAL
+    seconds it is brought up to date with orders added since and chat
+    sessions with new messages, without recounting the rest. Without numpy
+    and scipy, or for users with no known history, recommendations fall
+    back to the most popular products.
+    """
+
+    extension_key = 'recommender'
+
+    def __init__(self, app=None):
+        self._refresh_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if np is None:
+            print("Warning: numpy/scipy not installed. Recommendations fall back to popular products.")
+        app.extensions[self.extension_key] = {
+            'path': app.config.get('RECOMMENDER_MODEL_PATH') or os.path.join(app.instance_path, 'recommender.npz'),
+            'model': None,
+            'refreshed_at': 0.0,
+            'popular': None,
+            'stats': {'personalized': 0, 'popular': 0, 'refreshes': 0}
+        }
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def enabled(self) -> bool:
+        return np is not None
+
+    def build(self) -> Optional['CooccurrenceModel']:
+        """Count every order and chat session into a fresh model and swap it in"""
+        if not self.enabled:
+            return None
+        model = CooccurrenceModel()
+        self._update(model)
+        state = self._state()
+        state['model'] = model
+        state['refreshed_at'] = time.monotonic()
+        return model
+
+    def save(self):
+        """Write the current model to RECOMMENDER_MODEL_PATH for other processes to load"""
+        state = self._state()
+        os.makedirs(os.path.dirname(state['path']) or '.', exist_ok=True)
+        state['model'].save(state['path'])
+        return state['path']
+
+    def _update(self, model: 'CooccurrenceModel'):
+        baskets, model.last_order_id = _order_baskets(model.last_order_id)
+        model.add_baskets(baskets)
+        baskets, model.last_message_id = _chat_baskets(model.last_message_id)
+        model.add_baskets(baskets)
+
+    def model(self) -> Optional['CooccurrenceModel']:
+        """The current model, loaded or built on first use and refreshed when due"""
+        if not self.enabled:
+            return None
+        state = self._state()
+        interval = current_app.config.get('RECOMMENDER_REFRESH_INTERVAL', 300)
+        if state['model'] is not None and time.monotonic() - state['refreshed_at'] < interval:
+            return state['model']
+
+        # One request refreshes while the others keep using the current model
+        blocking = state['model'] is None
+        if not self._refresh_lock.acquire(blocking=blocking):
+            return state['model']
+        try:
+            if state['model'] is None:
+                if os.path.exists(state['path']):
+                    state['model'] = CooccurrenceModel.load(state['path'])
+                else:
+                    return self.build()
+            if time.monotonic() - state['refreshed_at'] >= interval:
+                model = state['model'].copy()
+                self._update(model)
+                state['model'] = model
+                state['refreshed_at'] = time.monotonic()
+                state['stats']['refreshes'] += 1
+            return state['model']
+        finally:
+            self._refresh_lock.release()
+
+    def _user_history(self, user_id: int) -> Dict[int, float]:
+        """Products the user ordered or was shown in chat, weighted like the model's baskets"""
+        history: Dict[int, float] = {}
+        ordered = db.session.query(OrderItem.product_id)\
+                            .join(Order, Order.id == OrderItem.order_id)\
+                            .filter(Order.user_id == user_id, Order.status.notin_(IGNORED_ORDER_STATUSES))
+        for (product_id,) in ordered:
+            history[product_id] = history.get(product_id, 0.0) + 1.0
+
+        messages = db.session.query(ChatMessage.extra_data)\
+                             .join(ChatSession, ChatSession.id == ChatMessage.session_id)\
+                             .filter(ChatSession.user_id == user_id, ChatMessage.message_type == 'bot')\
+                             .order_by(ChatMessage.id.desc())\
+                             .limit(USER_CHAT_HISTORY)
+        for (extra_data,) in messages:
+            for product_id in _mentioned_products(extra_data):
+                history[product_id] = history.get(product_id, 0.0) + CHAT_MENTION_WEIGHT
+        return history
+
+    def _popular_ids(self) -> List[int]:
+        """Active product ids by rating, cached until the catalog changes"""
+        state = self._state()
+        version = catalog_summary.version
+        popular = state['popular']
+        if popular is None or popular[0] != version:
+            limit = current_app.config.get('RECOMMENDER_POPULAR_SIZE', 100)
+            ids = [
+                row.id for row in Product.query.with_entities(Product.id)
+                                              .filter_by(is_active=True)
+                                              .order_by(Product.rating.desc(), Product.review_count.desc())
+                                              .limit(limit)
+            ]
+            popular = state['popular'] = (version, ids)
+        return popular[1]
+
+    def _load_products(self, ids: List[int], limit: int) -> List[Product]:
+        """Active, in-stock products for ids, in that order"""
+        if not ids:
+            return []
+        products = {
+            product.id: product for product in Product.query.options(product_loading_plan())
+                                                            .filter(Product.id.in_(ids),
+                                                                    Product.is_active == True,
+                                                                    Product.stock_quantity > 0)
+        }
+        return [products[product_id] for product_id in ids if product_id in products][:limit]
+
+    def _ranked(self, history: Dict[int, float], limit: int) -> List[int]:
+        model = self.model()
+        if model is None:
+            return []
+        # Over-fetch so inactive or sold out products can be dropped
+        return model.top(history, limit * 2)
+
+    def recommend(self, user_id: int, limit: int = 10) -> List[Product]:
+        """Products for user_id, best first, topped up with popular ones"""
+        history = self._user_history(user_id)
+        ranked = self._ranked(history, limit)
+        seen = set(history) | set(ranked)
+        popular = [product_id for product_id in self._popular_ids() if product_id not in seen][:limit * 2]
+
+        # Personalized and popular candidates in one query, personalized first
+        products = self._load_products(ranked + popular, limit)
+        personalized = bool(products) and products[0].id in ranked
+        self._state()['stats']['personalized' if personalized else 'popular'] += 1
+        return products
+
+    def similar(self, product_ids: Iterable[int], limit: int = 3) -> List[Product]:
+        """Products often bought or browsed with product_ids; empty if none are known"""
+        history = {product_id: 1.0 for product_id in product_ids}
+        return self._load_products(self._ranked(history, limit), limit)
+
+    def metrics(self):
+        state = self._state()
+        model = state['model']
+        return {
+            'enabled': self.enabled,
+            'products': len(model) if model is not None else 0,
+            'pairs': int(model.counts.nnz // 2) if model is not None else 0,
+            **state['stats']
+        }
+
+
+recommender = Recommender()
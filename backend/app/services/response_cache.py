@@ -0,0 +1,144 @@
+import re
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+from app.services.search_index import tokenize
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return ' '.join(re.findall(r'[a-z0-9]+', query.lower()))
+
+
+# Conversational filler that does not change what an answer should say
+FILLER_WORDS = frozenset([
+    'about', 'can', 'could', 'get', 'how', 'looking', 'need', 'please', 'recommend',
+    'should', 'suggest', 'tell', 'want', 'what', 'whats', 'which', 'would'
+])
+
+
+def query_shingles(query: str) -> FrozenSet[str]:
+    """Content words of a query, used for near-duplicate matching"""
+    return frozenset(token for token in tokenize(query) if len(token) > 1 and token not in FILLER_WORDS)
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM answers keyed by normalized query and catalog version.
+
+    Lookups first try the exact normalized query. If similarity matching is
+    enabled (threshold above 0), a miss falls back to a cached query with
+    exactly the same content words, worded differently (filler words, word
+    order, plurals). Queries that differ by a content word never share an
+    answer in either direction: a constraint such as "for students" must
+    not be answered without, and an answer narrowed to "red ... under $50"
+    must not be served for the broader question.
+    Entries built from an older catalog version are never returned and are
+    dropped as soon as a newer version is seen.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, similarity_threshold: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: 'OrderedDict[str, Tuple[Dict[str, Any], float, FrozenSet[str]]]' = OrderedDict()
+        self._by_shingle: Dict[str, set] = defaultdict(set)
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'similar_hits': 0, 'misses': 0, 'evictions': 0,
+                       'expirations': 0, 'invalidations': 0}
+
+    def _sync_version(self, catalog_version) -> bool:
+        """Drop entries from older catalog versions; False if catalog_version is stale"""
+        if self._version is not None and catalog_version < self._version:
+            return False
+        if catalog_version != self._version:
+            if self._entries:
+                self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._by_shingle.clear()
+            self._version = catalog_version
+        return True
+
+    def _discard(self, key: str):
+        _, _, shingles = self._entries.pop(key)
+        for shingle in shingles:
+            keys = self._by_shingle.get(shingle)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_shingle[shingle]
+
+    def _live(self, key: str, now: float) -> bool:
+        if self._entries[key][1] <= now:
+            self._discard(key)
+            self._stats['expirations'] += 1
+            return False
+        return True
+
+    def _most_similar(self, shingles: FrozenSet[str], now: float) -> Optional[str]:
+        # Every entry with the same content words is indexed under any one of them
+        for key in list(self._by_shingle.get(next(iter(shingles)), ())):
+            if self._entries[key][2] == shingles and self._live(key, now):
+                return key
+        return None
+
+    def get(self, query: str, catalog_version) -> Optional[Dict[str, Any]]:
+        """Return a cached response for query, or None"""
+        key = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            if not self._sync_version(catalog_version):
+                self._stats['misses'] += 1
+                return None
+
+            if key in self._entries and self._live(key, now):
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._entries[key][0]
+
+            if self.similarity_threshold > 0:
+                shingles = query_shingles(query)
+                similar = self._most_similar(shingles, now) if shingles else None
+                if similar is not None:
+                    self._entries.move_to_end(similar)
+                    self._stats['similar_hits'] += 1
+                    return self._entries[similar][0]
+
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, query: str, catalog_version, response: Dict[str, Any]):
+        """Cache response for query under catalog_version"""
+        key = normalize_query(query)
+        if not key:
+            return
+        shingles = query_shingles(query)
+        with self._lock:
+            if not self._sync_version(catalog_version):
+                return
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (response, time.monotonic() + self.ttl, shingles)
+            for shingle in shingles:
+                self._by_shingle[shingle].add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_shingle.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['similar_hits'] + self._stats['misses']
+            hits = self._stats['hits'] + self._stats['similar_hits']
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                **self._stats,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+            }
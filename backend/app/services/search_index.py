@@ -0,0 +1,252 @@
+import re
+import math
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Tuple, Optional
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import Product, product_loading_plan
+
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'any', 'are', 'do', 'for', 'have', 'i', 'in', 'is', 'it',
+    'me', 'my', 'of', 'on', 'or', 'show', 'some', 'the', 'to', 'with', 'you'
+])
+
+# Relative weight of each indexed product field when computing term frequency
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'brand': 2.0,
+    'description': 1.0
+}
+
+
+def _fold_plural(token: str) -> str:
+    """Cheap plural folding so 'laptops' and 'laptop' share a term"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase search tokens, dropping stopwords"""
+    if not text:
+        return []
+    return [_fold_plural(token) for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in STOPWORDS]
+
+
+class SearchIndex:
+    """Thread-safe inverted index with BM25 ranking and prefix expansion.
+
+    Each document is a mapping of field name to text. Term frequencies are
+    weighted per field (BM25F style) so a hit in a product name outranks the
+    same word buried in a description.
+    """
+
+    def __init__(self, field_weights: Dict[str, float] = None, k1: float = 1.2, b: float = 0.75,
+                 prefix_weight: float = 0.5, max_prefix_expansions: int = 50):
+        self.field_weights = field_weights or FIELD_WEIGHTS
+        self.k1 = k1
+        self.b = b
+        self.prefix_weight = prefix_weight
+        self.max_prefix_expansions = max_prefix_expansions
+
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.doc_terms: Dict[int, List[str]] = {}
+        self.doc_lengths: Dict[int, float] = {}
+        self.vocabulary: List[str] = []
+        self.total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def add(self, doc_id: int, fields: Dict[str, Optional[str]]):
+        """Index a document, replacing any previous version"""
+        frequencies: Dict[str, float] = defaultdict(float)
+        length = 0.0
+        for field, weight in self.field_weights.items():
+            for token in tokenize(fields.get(field)):
+                frequencies[token] += weight
+                length += weight
+
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in frequencies.items():
+                posting = self.postings[term]
+                if not posting:
+                    insort(self.vocabulary, term)
+                posting[doc_id] = frequency
+            self.doc_terms[doc_id] = list(frequencies)
+            self.doc_lengths[doc_id] = length
+            self.total_length += length
+
+    def remove(self, doc_id: int):
+        """Drop a document from the index"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: int):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+                index = bisect_left(self.vocabulary, term)
+                if index < len(self.vocabulary) and self.vocabulary[index] == term:
+                    del self.vocabulary[index]
+
+    def clear(self):
+        with self._lock:
+            self.postings.clear()
+            self.doc_terms.clear()
+            self.doc_lengths.clear()
+            self.vocabulary = []
+            self.total_length = 0.0
+
+    def _expand(self, token: str, prefix: bool) -> List[Tuple[str, float]]:
+        """Return (term, weight) pairs matching a query token"""
+        terms = []
+        if token in self.postings:
+            terms.append((token, 1.0))
+        if prefix:
+            index = bisect_left(self.vocabulary, token)
+            expansions = 0
+            while index < len(self.vocabulary) and expansions < self.max_prefix_expansions:
+                term = self.vocabulary[index]
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    terms.append((term, self.prefix_weight))
+                    expansions += 1
+                index += 1
+        return terms
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> List[Tuple[int, float]]:
+        """Return up to limit (doc_id, score) pairs ranked by BM25 score"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return []
+            average_length = self.total_length / doc_count or 1.0
+
+            scores: Dict[int, float] = defaultdict(float)
+            for token in dict.fromkeys(tokens):
+                for term, weight in self._expand(token, prefix):
+                    posting = self.postings[term]
+                    idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for doc_id, frequency in posting.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                        scores[doc_id] += weight * idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+def _product_fields(product: Product) -> Dict[str, Optional[str]]:
+    return {field: getattr(product, field) for field in FIELD_WEIGHTS}
+
+
+class ProductSearchIndex:
+    """Flask extension keeping an in-memory SearchIndex of active products.
+
+    The index is built on first use (or eagerly via ``build``) and then kept
+    current by SQLAlchemy session events: product rows flushed in a
+    transaction are re-indexed once that transaction commits.
+    """
+
+    extension_key = 'product_search_index'
+
+    def __init__(self, app=None):
+        self._build_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions[self.extension_key] = {'index': SearchIndex(), 'built': False}
+        if not event.contains(Session, 'after_flush', _collect_product_changes):
+            event.listen(Session, 'after_flush', _collect_product_changes)
+            event.listen(Session, 'after_commit', _apply_product_changes)
+            event.listen(Session, 'after_rollback', _discard_product_changes)
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    @property
+    def index(self) -> SearchIndex:
+        """The current app's index, built from the database on first access"""
+        state = self._state()
+        if not state['built']:
+            self.build()
+        return state['index']
+
+    def build(self):
+        """(Re)build the index from all active products"""
+        state = self._state()
+        with self._build_lock:
+            # Build into a fresh index and swap it in so readers never see a partial one
+            index = SearchIndex()
+            rows = Product.query.with_entities(
+                Product.id, Product.name, Product.brand, Product.description
+            ).filter(Product.is_active == True).all()
+            for row in rows:
+                index.add(row.id, {'name': row.name, 'brand': row.brand, 'description': row.description})
+            state['index'] = index
+            state['built'] = True
+
+    def search(self, query: str, limit: int = 10) -> List[Product]:
+        """Return active products matching query, best match first"""
+        ranked = self.index.search(query, limit=limit)
+        if not ranked:
+            return []
+        ids = [doc_id for doc_id, _ in ranked]
+        products = {product.id: product for product in Product.query.options(product_loading_plan()).filter(Product.id.in_(ids)).all()}
+        return [products[doc_id] for doc_id in ids if doc_id in products]
+
+
+def _collect_product_changes(session, flush_context):
+    pending = session.info.setdefault('product_index_pending', {})
+    for product in session.new | session.dirty:
+        if isinstance(product, Product) and product.id is not None:
+            pending[product.id] = _product_fields(product) if product.is_active is not False else None
+    for product in session.deleted:
+        if isinstance(product, Product) and product.id is not None:
+            pending[product.id] = None
+
+
+def _apply_product_changes(session):
+    pending = session.info.pop('product_index_pending', None)
+    if not pending or not has_app_context():
+        return
+    state = current_app.extensions.get(ProductSearchIndex.extension_key)
+    if not state or not state['built']:
+        return
+    index = state['index']
+    for product_id, fields in pending.items():
+        if fields is None:
+            index.remove(product_id)
+        else:
+            index.add(product_id, fields)
+
+
+def _discard_product_changes(session):
+    session.info.pop('product_index_pending', None)
+
+
+product_index = ProductSearchIndex()
@@ -0,0 +1,100 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class Flight:
+    """One in-progress call; followers wait on it for the leader's outcome"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._error: Optional[BaseException] = None
+        self.followers = 0
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Result of the call, re-raising its error; TimeoutError if it takes longer than timeout"""
+        if not self._done.wait(timeout):
+            raise TimeoutError('shared call did not finish in time')
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one.
+
+    The first caller for a key becomes the leader and makes the call; any
+    caller arriving with the same key while it runs becomes a follower and
+    gets the leader's result (or exception) instead of calling again. Once
+    the call finishes the key is free, so later callers start a new call.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, Flight] = {}
+        self._lock = threading.Lock()
+        self._counters = {'leaders': 0, 'followers': 0, 'failed': 0, 'max_followers': 0}
+
+    def begin(self, key: Hashable) -> Tuple[Flight, bool]:
+        """Flight for key and whether the caller leads it; a leader must finish it with resolve or fail"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._counters['followers'] += 1
+                self._counters['max_followers'] = max(self._counters['max_followers'], flight.followers)
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self._counters['leaders'] += 1
+            return flight, True
+
+    def _finish(self, key: Hashable, flight: Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight._done.set()
+
+    def resolve(self, key: Hashable, flight: Flight, result: Any):
+        flight._result = result
+        self._finish(key, flight)
+
+    def fail(self, key: Hashable, flight: Flight, error: BaseException):
+        flight._error = error
+        with self._lock:
+            self._counters['failed'] += 1
+        self._finish(key, flight)
+
+    def abandon(self, key: Hashable, flight: Flight) -> bool:
+        """Drop a flight nobody follows; False if followers wait, in which case the leader must still finish it"""
+        with self._lock:
+            if flight.followers:
+                return False
+            # Nobody can join once the key is free
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight._error = RuntimeError('the shared call was abandoned')
+        flight._done.set()
+        return True
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Result of fn(), shared with concurrent callers of key, and whether it came from another caller"""
+        flight, leader = self.begin(key)
+        if not leader:
+            return flight.wait(timeout), True
+        try:
+            result = fn()
+        except Exception as e:
+            self.fail(key, flight, e)
+            raise
+        self.resolve(key, flight, result)
+        return result, False
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._counters['leaders'] + self._counters['followers']
+            return {
+                'in_flight': len(self._flights),
+                **self._counters,
+                # Every follower is an LLM call that was not made
+                'calls_saved': self._counters['followers'],
+                'saved_rate': round(self._counters['followers'] / calls, 4) if calls else 0.0
+            }
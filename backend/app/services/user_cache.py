@@ -0,0 +1,116 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User
+from app.utils.cache import create_cache
+from app.utils.write_behind import WriteBehindQueue
+
+
+class UserCache:
+    """Flask extension caching user profiles by id and deferring last_login writes.
+
+    ``profile`` answers from the cache (the catalog cache backend, so Redis
+    when that is configured) for up to USER_CACHE_TTL seconds, and entries
+    are dropped when a transaction that changed the user commits.
+
+    ``record_login`` does not write to the database: logins are collected
+    in a write-behind queue and their last_login times written in one
+    UPDATE every LAST_LOGIN_FLUSH_INTERVAL seconds, so a login costs a
+    single read.
+    """
+
+    extension_key = 'user_cache'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = create_cache(
+            app.config.get('CATALOG_CACHE_BACKEND', 'memory'),
+            url=app.config.get('CATALOG_CACHE_URL'),
+            prefix='user:',
+            max_entries=app.config.get('USER_CACHE_SIZE', 4096),
+            ttl=app.config.get('USER_CACHE_TTL', 300)
+        )
+        logins = WriteBehindQueue(
+            app, _write_last_logins,
+            interval=app.config.get('LAST_LOGIN_FLUSH_INTERVAL', 5),
+            name='last-login-writer'
+        )
+        app.extensions[self.extension_key] = {'backend': backend, 'logins': logins}
+        if not event.contains(Session, 'after_flush', _track_user_writes):
+            event.listen(Session, 'after_flush', _track_user_writes)
+            event.listen(Session, 'after_commit', _invalidate_user_writes)
+            event.listen(Session, 'after_rollback', _discard_user_writes)
+
+    def _state(self):
+        return current_app.extensions[self.extension_key]
+
+    def profile(self, user_id) -> Optional[Dict[str, Any]]:
+        """to_dict() of the user, or None if there is no such user"""
+        backend = self._state()['backend']
+        cached = backend.get(str(user_id))
+        if cached is not None:
+            return json.loads(cached)
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        profile = user.to_dict()
+        backend.set(str(user.id), json.dumps(profile))
+        return profile
+
+    def invalidate(self, *user_ids):
+        self._state()['backend'].delete(*(str(user_id) for user_id in user_ids))
+
+    def record_login(self, user_id: int, logged_in_at: datetime):
+        """Queue last_login = logged_in_at for the user"""
+        state = self._state()
+        state['logins'].put((user_id, logged_in_at), key=user_id)
+        # Keep a cached profile in step until the write lands
+        cached = state['backend'].get(str(user_id))
+        if cached is not None:
+            state['backend'].set(str(user_id), json.dumps({**json.loads(cached), 'last_login': logged_in_at.isoformat()}))
+
+    def flush_logins(self) -> int:
+        """Write queued last_login times now"""
+        return self._state()['logins'].flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        state = self._state()
+        return {**state['backend'].metrics(), 'last_login_writes': state['logins'].metrics()}
+
+
+def _write_last_logins(logins: List[Tuple[int, datetime]]):
+    # Core executemany: users deleted since their login are skipped rather than failing the batch
+    users = User.__table__
+    db.session.execute(
+        users.update().where(users.c.id == bindparam('user_id')).values(last_login=bindparam('logged_in_at')),
+        [{'user_id': user_id, 'logged_in_at': logged_in_at} for user_id, logged_in_at in logins]
+    )
+    db.session.commit()
+    # Bulk updates bypass the flush events
+    user_cache.invalidate(*(user_id for user_id, _ in logins))
+
+
+def _track_user_writes(session, flush_context):
+    for instance in session.dirty | session.deleted:
+        if isinstance(instance, User) and instance.id is not None:
+            session.info.setdefault('user_cache_writes', set()).add(instance.id)
+
+
+def _invalidate_user_writes(session):
+    user_ids = session.info.pop('user_cache_writes', None)
+    if user_ids and has_app_context() and UserCache.extension_key in current_app.extensions:
+        user_cache.invalidate(*user_ids)
+
+
+def _discard_user_writes(session):
+    session.info.pop('user_cache_writes', None)
+
+
+user_cache = UserCache()
@@ -0,0 +1,141 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import redis
+except ImportError:  # optional, only needed for the shared backend
+    redis = None
+
+
+class LRUCache:
+    """In-process LRU cache of string values with an optional TTL.
+
+    Each worker process has its own entries, so invalidations only reach the
+    process that made the write; use a shared backend when running several
+    workers. Also serves as the local stand-in for the shared backend.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key: str, value: str):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._stats['invalidations'] += 1
+
+    def clear(self, prefix: str = ''):
+        """Drop every entry whose key starts with prefix"""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+                self._stats['invalidations'] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'backend': 'memory',
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0
+            }
+
+
+class RedisCache:
+    """Cache shared by every worker process, stored in Redis under a key prefix"""
+
+    def __init__(self, url: str, prefix: str = 'cache:', ttl: Optional[float] = None):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'errors': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.client.get(self.prefix + key)
+        except redis.RedisError:
+            # An unreachable cache is a miss, not a failed request
+            self._count('errors')
+            return None
+        self._count('hits' if value is not None else 'misses')
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key: str, value: str):
+        try:
+            self.client.set(self.prefix + key, value, ex=int(self.ttl) if self.ttl else None)
+        except redis.RedisError:
+            self._count('errors')
+
+    def delete(self, *keys: str):
+        try:
+            if keys:
+                self.client.delete(*(self.prefix + key for key in keys))
+        except redis.RedisError:
+            self._count('errors')
+
+    def clear(self, prefix: str = ''):
+        """Drop every entry whose key starts with prefix"""
+        try:
+            keys = list(self.client.scan_iter(match=f'{self.prefix}{prefix}*'))
+            if keys:
+                self.client.delete(*keys)
+        except redis.RedisError:
+            self._count('errors')
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'backend': 'redis',
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0
+            }
+
+
+def create_cache(backend: str = 'memory', url: Optional[str] = None, prefix: str = 'cache:',
+                 max_entries: int = 1024, ttl: Optional[float] = None):
+    """Build a cache backend by name ('memory' or 'redis')"""
+    if backend == 'redis':
+        if redis is None:
+            print("Warning: redis package not installed. Using in-process cache.")
+        elif not url:
+            print("Warning: no cache URL configured for redis. Using in-process cache.")
+        else:
+            return RedisCache(url, prefix=prefix, ttl=ttl)
+    elif backend != 'memory':
+        raise ValueError(f'Unknown cache backend: {backend}')
+    return LRUCache(max_entries=max_entries, ttl=ttl)
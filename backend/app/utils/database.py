@@ -0,0 +1,95 @@
+import threading
+from typing import Any, Dict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from app import db
+
+
+def engine_options(config) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database and DB_POOL_* settings"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            # One shared connection (StaticPool), nothing to size
+            return {}
+        # A local file: no server to drop idle connections, so no pre-ping or recycling
+        return {
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 10)
+        }
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', False)
+    }
+
+
+class EnginePool:
+    """Flask extension tuning new database connections and counting pool activity.
+
+    Every new SQLite connection gets the SQLITE_* PRAGMAs: WAL journaling so
+    readers do not block the writer, synchronous NORMAL (safe with WAL; a
+    power loss can drop the last commits but not corrupt the file), a busy
+    timeout so a writer waits for the lock instead of failing with
+    "database is locked", and memory-mapped reads.
+
+    ``metrics`` reports the pool's current use together with counts of
+    connections opened, checkouts and invalidated connections; connections
+    opened steadily growing under constant load means the pool is too small
+    for the number of threads using it.
+    """
+
+    extension_key = 'engine_pool'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        pragmas = {
+            'journal_mode': app.config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+            'synchronous': app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'busy_timeout': int(app.config.get('SQLITE_BUSY_TIMEOUT', 5000)),
+            'mmap_size': int(app.config.get('SQLITE_MMAP_SIZE', 0))
+        }
+        counters = {'connects': 0, 'checkouts': 0, 'invalidated': 0}
+        lock = threading.Lock()
+
+        def count(name):
+            with lock:
+                counters[name] += 1
+
+        def on_connect(dbapi_connection, connection_record):
+            count('connects')
+            if engine.dialect.name == 'sqlite':
+                cursor = dbapi_connection.cursor()
+                for name, value in pragmas.items():
+                    if value:
+                        cursor.execute(f'PRAGMA {name}={value}')
+                cursor.close()
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'connect', on_connect)
+        event.listen(engine, 'checkout', lambda *args: count('checkouts'))
+        event.listen(engine, 'invalidate', lambda *args: count('invalidated'))
+        app.extensions[self.extension_key] = {'engine': engine, 'counters': counters, 'lock': lock}
+
+    def metrics(self) -> Dict[str, Any]:
+        state = current_app.extensions[self.extension_key]
+        pool = state['engine'].pool
+        with state['lock']:
+            counters = dict(state['counters'])
+        status = {'pool': type(pool).__name__}
+        # Only queue pools have a size; StaticPool and friends do not
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            if hasattr(pool, name):
+                status[name] = getattr(pool, name)()
+        return {**status, **counters}
+
+
+engine_pool = EnginePool()
@@ -0,0 +1,31 @@
+import hmac
+from typing import Any, Callable, Dict
+from flask import current_app, request
+
+
+def register_metrics(app, name: str, source: Callable[[], Dict[str, Any]]):
+    """Register a callable whose snapshot is reported under name by /api/metrics"""
+    app.extensions.setdefault('metrics_sources', {})[name] = source
+
+
+def collect_metrics() -> Dict[str, Any]:
+    """Snapshot every registered metrics source of the current app"""
+    metrics = {}
+    for name, source in current_app.extensions.get('metrics_sources', {}).items():
+        try:
+            metrics[name] = source()
+        except Exception as e:
+            metrics[name] = {'error': str(e)}
+    return metrics
+
+
+def metrics_authorized() -> bool:
+    """Whether the current request may read /api/metrics.
+
+    Requires the METRICS_TOKEN setting in an X-Metrics-Token header. Without
+    a token configured, metrics are only served by the debug server.
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return current_app.debug
+    return hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token)
@@ -0,0 +1,90 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+from flask import request
+from sqlalchemy import and_, or_
+from sqlalchemy.types import DateTime, Numeric
+
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that cannot be decoded"""
+
+
+def page_size(default: int, maximum: int = 100) -> int:
+    """The per_page request argument, clamped like Flask-SQLAlchemy's paginate():
+    default when missing or below 1, at most maximum"""
+    per_page = request.args.get('per_page', default, type=int)
+    return default if per_page < 1 else min(per_page, maximum)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _decode_value(column, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Numeric):
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque cursor token for a row's sort key"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """Sort key values of a cursor made by encode_cursor for the same columns"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('cursor does not match the sort order')
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+
+
+def _after(columns: Sequence, values: Sequence[Any], descending: bool):
+    """Rows strictly after the given sort key: (c1, c2, ...) > (v1, v2, ...)"""
+    clauses = []
+    for position, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(position)]
+        beyond = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, columns: Sequence, cursor: Optional[str], per_page: int,
+                    descending: bool = False) -> Tuple[list, Optional[str]]:
+    """Return one page of query ordered by columns, and the cursor of the next page.
+
+    Rather than skipping ``offset`` rows, each page starts right after the sort
+    key of the previous page's last row, so with an index on the sort columns
+    every page costs the same as the first. The last column must be unique
+    (normally the primary key) and sort columns must not be NULL. Fetching one
+    extra row tells whether there is a next page without a COUNT query.
+    """
+    if per_page < 1:
+        raise ValueError('per_page must be at least 1')
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns), descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(None).order_by(*ordering).limit(per_page + 1).all()
+
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
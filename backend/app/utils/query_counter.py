@@ -0,0 +1,67 @@
+import threading
+from contextlib import contextmanager
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryCounter:
+    """Collects the SQL statements executed on this thread while active"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        if not hasattr(_local, 'counters'):
+            _local.counters = []
+        _local.counters.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.counters.remove(self)
+        return False
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in getattr(_local, 'counters', ()):
+        counter.statements.append(statement)
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Fail if the wrapped block executes more than limit SQL statements.
+
+    Usage in tests:
+        with assert_max_queries(3):
+            client.get('/api/orders', headers=auth_headers)
+    """
+    with QueryCounter() as counter:
+        yield counter
+    if counter.count > limit:
+        statements = '\n'.join(f'  {statement}' for statement in counter.statements)
+        raise AssertionError(
+            f'Expected at most {limit} SQL statements, got {counter.count}:\n{statements}'
+        )
+
+
+def init_query_counter(app):
+    """Report the per-request statement count in an X-Query-Count header"""
+
+    @app.before_request
+    def start_query_count():
+        g.query_count = 0
+
+    @app.after_request
+    def add_query_count_header(response):
+        if 'query_count' in g:
+            response.headers['X-Query-Count'] = str(g.query_count)
+        return response
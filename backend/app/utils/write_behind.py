@@ -0,0 +1,167 @@
+import atexit
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from sqlalchemy.exc import DataError, IntegrityError
+
+# Errors caused by a particular row; anything else (a lost connection, a
+# locked database) would fail every item alike
+ITEM_ERRORS = (IntegrityError, DataError)
+
+
+class WriteBehindQueue:
+    """Buffers writes in memory and applies them in batches on a background thread.
+
+    ``put`` returns at once. Every ``interval`` seconds, or as soon as
+    ``max_batch`` items are waiting, a daemon thread passes the pending
+    items, oldest first, to ``apply`` inside an app context; ``apply``
+    writes and commits them. Items put under the same key replace each
+    other, so only the latest one is written. When a batch's ``apply``
+    raises one of ``ITEM_ERRORS``, its items are applied one at a time, so
+    one bad item cannot hold back the rest; on any other error the whole
+    batch waits for the next round. Items that fail are retried up to
+    ``max_retries`` times, then dropped and passed to ``on_drop``.
+
+    Whatever is pending is flushed at interpreter exit, but items buffered
+    in a process that is killed are lost, so only use this for writes that
+    may be delayed by ``interval`` and, rarely, lost.
+    """
+
+    def __init__(self, app, apply: Callable[[List[Any]], None], interval: float = 1.0,
+                 max_batch: int = 500, max_retries: int = 3, name: str = 'write-behind',
+                 on_drop: Optional[Callable[[List[Any]], None]] = None):
+        self.app = app
+        self.apply = apply
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.name = name
+        self.on_drop = on_drop
+
+        self._pending: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._attempts: Dict[Hashable, int] = {}
+        self._counters = {'queued': 0, 'coalesced': 0, 'written': 0, 'batches': 0,
+                          'failed_batches': 0, 'dropped': 0}
+
+    def put(self, item: Any, key: Optional[Hashable] = None):
+        """Queue item for writing, replacing any pending item with the same key"""
+        with self._lock:
+            if key is None:
+                key = ('item', next(self._sequence))
+            elif key in self._pending:
+                del self._pending[key]
+                self._counters['coalesced'] += 1
+            self._pending[key] = item
+            self._counters['queued'] += 1
+            full = len(self._pending) >= self.max_batch
+            if self._thread is None:
+                self._start()
+        if full:
+            self._wake.set()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _take(self) -> 'OrderedDict[Hashable, Any]':
+        with self._lock:
+            keys = list(itertools.islice(self._pending, self.max_batch))
+            return OrderedDict((key, self._pending.pop(key)) for key in keys)
+
+    def flush(self) -> int:
+        """Write everything pending now, on the calling thread; the number of items written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take()
+                if not batch:
+                    return written
+                error = self._apply(batch)
+                if error is None:
+                    written += self._written(batch)
+                    continue
+                failed = batch
+                if len(batch) > 1 and isinstance(error, ITEM_ERRORS):
+                    # Find the items that fail on their own and write the others
+                    failed = OrderedDict()
+                    items = iter(batch.items())
+                    for key, item in items:
+                        single = OrderedDict([(key, item)])
+                        item_error = self._apply(single)
+                        if item_error is None:
+                            written += self._written(single)
+                            continue
+                        failed[key], error = item, item_error
+                        if not isinstance(item_error, ITEM_ERRORS):
+                            # The database itself failed meanwhile; retry the rest later too
+                            failed.update(items)
+                            break
+                if failed:
+                    self._retry(failed, error)
+                    return written
+
+    def _apply(self, batch: 'OrderedDict[Hashable, Any]') -> Optional[Exception]:
+        try:
+            with self.app.app_context():
+                self.apply(list(batch.values()))
+        except Exception as e:
+            return e
+        return None
+
+    def _written(self, batch: 'OrderedDict[Hashable, Any]') -> int:
+        with self._lock:
+            for key in batch:
+                self._attempts.pop(key, None)
+            self._counters['written'] += len(batch)
+            self._counters['batches'] += 1
+        return len(batch)
+
+    def _retry(self, failed: 'OrderedDict[Hashable, Any]', error: Exception):
+        dropped = []
+        with self._lock:
+            self._counters['failed_batches'] += 1
+            # Back in front of newer items, unless a newer item replaced it meanwhile
+            for key in reversed(failed):
+                attempts = self._attempts.pop(key, 0) + 1
+                if key in self._pending:
+                    continue
+                if attempts > self.max_retries:
+                    dropped.append(failed[key])
+                    continue
+                self._attempts[key] = attempts
+                self._pending[key] = failed[key]
+                self._pending.move_to_end(key, last=False)
+            self._counters['dropped'] += len(dropped)
+
+        if len(dropped) < len(failed):
+            print(f"Warning: {self.name} write of {len(failed) - len(dropped)} items failed, retrying: {str(error)}")
+        if dropped:
+            dropped.reverse()
+            print(f"Error: {self.name} dropped {len(dropped)} writes after {self.max_retries} retries: {str(error)}")
+            if self.on_drop is not None:
+                try:
+                    with self.app.app_context():
+                        self.on_drop(dropped)
+                except Exception as e:
+                    print(f"Error: {self.name} drop handler failed: {str(e)}")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'interval': self.interval,
+                **self._counters
+            }
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for per-message chat overhead.
+
+Compares the old per-request path (a new ChatService for every message plus
+the sequential ``re.search`` intent loop) with the shared ChatService and the
+precompiled intent matcher. No network calls are made: a dummy Gemini API key
+is configured so client construction cost is included, but nothing is sent.
+
+Usage:
+    python benchmarks/bench_chat_overhead.py [iterations]
+"""
+
+import os
+import re
+import sys
+import timeit
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark-dummy-key')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from app import create_app
+from app.services.chat_service import ChatService, get_chat_service
+from app.services.intent_matcher import INTENT_PATTERNS, intent_matcher
+
+
+MESSAGES = [
+    "hello there",
+    "do you have any wireless headphones?",
+    "show me the electronics section",
+    "tell me more about the kindle",
+    "what's a good laptop for college students on a budget",
+    "I want to buy this",
+    "thanks, that's all",
+    "is it waterproof and does it come in blue",
+]
+
+
+def legacy_detect_intent(message):
+    """Intent detection as it was before the precompiled matcher"""
+    for intent, patterns in INTENT_PATTERNS.items():
+        for pattern in patterns:
+            if re.search(pattern, message, re.IGNORECASE):
+                return intent
+    return 'general'
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = create_app('testing')
+
+    # Sanity check: both detectors must agree on every sample message
+    for message in MESSAGES:
+        assert legacy_detect_intent(message) == intent_matcher.detect(message), message
+
+    with app.app_context():
+        # Silence the initialization banner printed by every ChatService()
+        devnull = open(os.devnull, 'w')
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            def before():
+                for message in MESSAGES:
+                    ChatService()
+                    legacy_detect_intent(message.lower().strip())
+
+            def after():
+                for message in MESSAGES:
+                    service = get_chat_service()
+                    service._detect_intent(message.lower().strip())
+
+            before_time = min(timeit.repeat(before, number=iterations // 10, repeat=5))
+            after_time = min(timeit.repeat(after, number=iterations // 10, repeat=5))
+            detect_before = min(timeit.repeat(
+                lambda: [legacy_detect_intent(m) for m in MESSAGES], number=iterations, repeat=5))
+            detect_after = min(timeit.repeat(
+                lambda: [intent_matcher.detect(m) for m in MESSAGES], number=iterations, repeat=5))
+        finally:
+            sys.stdout = stdout
+            devnull.close()
+
+    per_batch = iterations // 10 * len(MESSAGES)
+    per_detect = iterations * len(MESSAGES)
+    print(f"Per-message overhead ({per_batch} messages, service + intent):")
+    print(f"  before: {before_time / per_batch * 1e6:8.2f} us")
+    print(f"  after:  {after_time / per_batch * 1e6:8.2f} us")
+    print(f"Intent detection only ({per_detect} messages):")
+    print(f"  before: {detect_before / per_detect * 1e6:8.2f} us")
+    print(f"  after:  {detect_after / per_detect * 1e6:8.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat message throughput with synchronous and write-behind persistence.
+
+Seeds a temporary SQLite database, then has N clients (threads, one user
+and chat session each) send messages answered without the LLM
+(POST /api/chat/message) as fast as they can, once with CHAT_PERSISTENCE
+'sync' and once with 'write_behind'. Reports messages per second and
+response latency, and checks that every message is in each session's
+history right after its response (read-your-writes) and in the database
+after the final flush.
+
+Usage:
+    python benchmarks/bench_chat_writes.py [--clients 8] [--messages 50]
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import statistics
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['LLM_PROVIDER'] = 'local'
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import ChatMessage, User
+from app.services.chat_writer import chat_writer
+
+MESSAGES = ['hello', 'show me categories', 'help', 'thanks']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(mode, args):
+    app = create_app('production')
+    app.config['CHAT_PERSISTENCE'] = mode
+    chat_writer.init_app(app)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.utils.sample_data import create_sample_data
+            create_sample_data()
+        users = User.query.limit(args.clients).all()
+        tokens = [create_access_token(identity=str(user.id)) for user in users]
+
+    latencies = []
+    stale_reads = []
+    barrier = threading.Barrier(len(tokens))
+
+    def client(token):
+        headers = {'Authorization': f'Bearer {token}'}
+        http = app.test_client()
+        session_token = None
+        barrier.wait()
+        for index in range(args.messages):
+            started = time.perf_counter()
+            response = http.post('/api/chat/message', json={
+                'message': MESSAGES[index % len(MESSAGES)], 'session_token': session_token
+            }, headers=headers).get_json()
+            latencies.append((time.perf_counter() - started) * 1000)
+            session_token = response['session_token']
+        history = http.get(f'/api/chat/history?session_token={session_token}', headers=headers).get_json()
+        if len(history['messages']) != args.messages * 2:
+            stale_reads.append(len(history['messages']))
+
+    threads = [threading.Thread(target=client, args=(token,)) for token in tokens]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        chat_writer.flush()
+        written = ChatMessage.query.count()
+        metrics = chat_writer.metrics()
+
+    sent = len(tokens) * args.messages
+    print(f"\n== {mode} ==")
+    print(f"{sent} messages from {len(tokens)} clients in {elapsed:.2f}s: {sent / elapsed:.0f} messages/s")
+    print(f"latency ms: p50={statistics.median(latencies):.1f} p95={percentile(latencies, 95):.1f} "
+          f"p99={percentile(latencies, 99):.1f}")
+    print(f"rows written: {written} (expected {sent * 2}), sessions with incomplete history: {len(stale_reads)}")
+    print(f"writer: {metrics}")
+    return written == sent * 2 and not stale_reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--messages', type=int, default=50, help='messages per client')
+    args = parser.parse_args()
+
+    try:
+        ok = all([run('sync', args), run('write_behind', args)])
+    finally:
+        os.unlink(database_file.name)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Latency and recall benchmark for chat product retrieval.
+
+Compares the keyword guesser (hard-coded keyword list, else the first words
+of the message, searched with BM25) with the semantic embedding index on
+natural-language queries labelled with the category they are about. The
+catalog is the sample data in an in-memory SQLite database; no network is
+used.
+
+Recall@K is the share of a query's relevant products (those in its
+category) found in the top K, out of at most K.
+
+Usage:
+    python benchmarks/bench_embedding_retrieval.py [repeats] [k]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.pop('GEMINI_API_KEY', None)
+# No prebuilt index: embed the sample catalog in-process
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from app import create_app, db
+from app.models import Category, Product
+from app.services.chat_service import get_chat_service
+from app.services.embedding_index import product_embeddings
+
+
+# (query, category its products belong to)
+QUERIES = [
+    ("noise cancelling headphones for flights", 'Headphones'),
+    ("something to listen to music on the train", 'Headphones'),
+    ("wireless earbuds", 'Headphones'),
+    ("a portable computer for college", 'Laptops'),
+    ("intel i7 notebook with a 1tb ssd", 'Laptops'),
+    ("a new mobile phone with a great camera", 'Smartphones'),
+    ("cell phone with 256gb of storage", 'Smartphones'),
+    ("comfortable footwear for everyday", 'Shoes'),
+    ("sneakers", 'Shoes'),
+    ("a good novel to read on vacation", 'Fiction'),
+    ("casual shirt for men", "Men's Clothing"),
+    ("warm hoodie", "Men's Clothing"),
+]
+
+
+def recall(ranked_ids, relevant_ids, k):
+    if not relevant_ids:
+        return 1.0
+    found = len(set(ranked_ids[:k]) & relevant_ids)
+    return found / min(k, len(relevant_ids))
+
+
+def measure(retrieve, relevant, repeats, k):
+    timings = []
+    recalls = []
+    for query, category in QUERIES:
+        ids = [product.id for product in retrieve(query)]
+        recalls.append(recall(ids, relevant[category], k))
+        for _ in range(repeats):
+            start = time.perf_counter()
+            retrieve(query)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'recall': sum(recalls) / len(recalls),
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p95_ms': timings[int(len(timings) * 0.95) - 1] * 1000
+    }
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    app = create_app('production')
+
+    if not product_embeddings.enabled:
+        print("numpy and scipy are required for this benchmark.")
+        sys.exit(1)
+
+    with app.app_context():
+        devnull = open(os.devnull, 'w')
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            db.create_all()
+            from app.utils.sample_data import create_sample_data
+            create_sample_data()
+            service = get_chat_service()
+        finally:
+            sys.stdout = stdout
+            devnull.close()
+
+        categories = {category.name: category.id for category in Category.query.all()}
+        relevant = {
+            name: {product.id for product in Product.query.filter_by(category_id=categories[name], is_active=True)}
+            for _, name in QUERIES
+        }
+
+        start = time.perf_counter()
+        index = product_embeddings.index
+        build_ms = (time.perf_counter() - start) * 1000
+
+        keyword = measure(
+            lambda query: service._search_products(service._extract_product_keywords(query))[:k],
+            relevant, repeats, k
+        )
+        embedding = measure(lambda query: product_embeddings.search(query, limit=k), relevant, repeats, k)
+
+    print(f"Catalog: {len(index)} products, {index.encoder.dimensions} dimensions, built in {build_ms:.1f} ms")
+    print(f"{len(QUERIES)} queries, recall@{k}, latency over {repeats} runs each:")
+    for name, result in (('keyword', keyword), ('embedding', embedding)):
+        print(f"  {name:10s} recall {result['recall']:.2f}   "
+              f"mean {result['mean_ms']:7.3f} ms   p95 {result['p95_ms']:7.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one POST /api/orders per order versus POST /api/orders/batch.
+
+Places the same set of orders both ways against a temporary SQLite database
+and reports wall time, orders per second and SQL statements per order.
+
+Usage:
+    python benchmarks/bench_order_batch.py [--orders 50] [--lines 4]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import Category, Product, User
+from app.utils.query_counter import QueryCounter
+
+
+def seed(product_count):
+    db.create_all()
+    user = User(username='buyer', email='buyer@example.com', first_name='Bulk', last_name='Buyer')
+    user.set_password('buyer-password')
+    category = Category(name='Wholesale', description='Bulk products')
+    db.session.add_all([user, category])
+    db.session.flush()
+    db.session.add_all([
+        Product(name=f'Wholesale Item {index}', price=9.99 + index, category_id=category.id,
+                sku=f'BULK-{index:04d}', stock_quantity=10 ** 6)
+        for index in range(product_count)
+    ])
+    db.session.commit()
+    return user.id, [product.id for product in Product.query.all()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=50, help='orders per run')
+    parser.add_argument('--lines', type=int, default=4, help='cart lines per order')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    with app.app_context():
+        user_id, product_ids = seed(40)
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    rng = random.Random(7)
+    orders = [{
+        'items': [{'product_id': product_id, 'quantity': rng.randint(1, 5)}
+                  for product_id in rng.sample(product_ids, args.lines)],
+        'shipping_address': {'street': '1 Warehouse Way', 'city': 'Depot', 'zip': '11111'}
+    } for _ in range(args.orders)]
+    client = app.test_client()
+
+    with app.app_context():
+        with QueryCounter() as counter:
+            started = time.perf_counter()
+            for order in orders:
+                assert client.post('/api/orders', json=order, headers=headers).status_code == 201
+            single_time = time.perf_counter() - started
+        single_queries = counter.count
+
+        with QueryCounter() as counter:
+            started = time.perf_counter()
+            response = client.post('/api/orders/batch', json={'orders': orders}, headers=headers)
+            batch_time = time.perf_counter() - started
+        batch_queries = counter.count
+        assert response.status_code == 201, response.get_json()
+
+    print(f"{args.orders} orders x {args.lines} lines")
+    print(f"one request per order: {single_time * 1000:8.1f} ms  {args.orders / single_time:7.0f} orders/s  "
+          f"{single_queries / args.orders:5.1f} queries/order")
+    print(f"one batch request:     {batch_time * 1000:8.1f} ms  {args.orders / batch_time:7.0f} orders/s  "
+          f"{batch_queries / args.orders:5.1f} queries/order")
+
+    os.unlink(database_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of the production server against the development server.
+
+Seeds a temporary SQLite database, then serves the app with gunicorn
+(gunicorn.conf.py, `wsgi:app`) and with the threaded Werkzeug development
+server, with the local LLM provider standing in for Gemini (answering after
+--llm-delay seconds). For --duration seconds, catalog clients request
+GET /api/products and chat clients send distinct questions to
+POST /api/chat/message, each over a keep-alive connection. Reports requests
+per second and latency per endpoint.
+
+Usage:
+    python benchmarks/bench_serving.py [--workers 2] [--threads 8]
+                                       [--catalog-clients 16] [--chat-clients 8]
+                                       [--llm-delay 0.2] [--duration 10]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import itertools
+import threading
+import contextlib
+import statistics
+import subprocess
+import http.client
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['LLM_PROVIDER'] = 'local'
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, args):
+    env = {**os.environ, 'LLM_LOCAL_DELAY': str(args.llm_delay), 'FLASK_ENV': 'production'}
+    if kind == 'gunicorn':
+        env.update(GUNICORN_BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(args.workers),
+                   GUNICORN_THREADS=str(args.threads), GUNICORN_ACCESS_LOG='', GUNICORN_LOG_LEVEL='warning')
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, '-c',
+                   f"from wsgi import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    server = subprocess.Popen(command, cwd=backend_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'{kind} did not start')
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(kind, args, token):
+    port = free_port()
+    server = start_server(kind, port, args)
+    stop = threading.Event()
+    results = {'catalog': [], 'chat': []}
+    errors = {'catalog': 0, 'chat': 0}
+    questions = itertools.count()
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+
+    def client(endpoint):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                if endpoint == 'catalog':
+                    connection.request('GET', '/api/products?per_page=20')
+                else:
+                    # Distinct questions, so neither the response cache nor coalescing answers them
+                    body = json.dumps({'message': f'what would you suggest for a rainy weekend {next(questions)}'})
+                    connection.request('POST', '/api/chat/message', body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                ok = False
+            if ok:
+                results[endpoint].append((time.perf_counter() - started) * 1000)
+            else:
+                errors[endpoint] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=('catalog',)) for _ in range(args.catalog_clients)]
+    threads += [threading.Thread(target=client, args=('chat',)) for _ in range(args.chat_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    server.terminate()
+    server.wait(timeout=60)
+
+    label = f'gunicorn ({args.workers} workers x {args.threads} threads)' if kind == 'gunicorn' \
+        else 'werkzeug development server (threaded)'
+    print(f"\n== {label} ==")
+    for endpoint, latencies in results.items():
+        if latencies:
+            print(f"{endpoint:8} {len(latencies) / args.duration:7.1f} req/s  "
+                  f"p50={statistics.median(latencies):.1f} ms  p99={percentile(latencies, 99):.1f} ms  "
+                  f"errors={errors[endpoint]}")
+        else:
+            print(f"{endpoint:8} no successful requests, errors={errors[endpoint]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gunicorn worker')
+    parser.add_argument('--catalog-clients', type=int, default=16)
+    parser.add_argument('--chat-clients', type=int, default=8)
+    parser.add_argument('--llm-delay', type=float, default=0.2, help='stub LLM latency in seconds')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per server')
+    parser.add_argument('--servers', default='werkzeug,gunicorn', help='comma-separated servers to run')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.utils.sample_data import create_sample_data
+            create_sample_data()
+        token = create_access_token(identity=str(User.query.first().id))
+
+    try:
+        for kind in args.servers.split(','):
+            run(kind, args, token)
+    finally:
+        os.unlink(database_file.name)
+
+
+if __name__ == '__main__':
+    main()
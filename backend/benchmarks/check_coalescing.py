@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Check that concurrent identical chat messages share one LLM call.
+
+Seeds a temporary database with the sample catalog and sends the same
+general question from N threads at once through the shared ChatService,
+with the local LLM provider taking --delay seconds per answer. Fails
+(exit code 1) unless the provider answered exactly once, every thread got
+the same answer and the coalescing metrics count the N - 1 saved calls.
+The same burst is then sent with coalescing turned off for comparison.
+
+Finally a streaming request leads the call and its client goes away after
+the first chunk while N - 1 requests wait on it; they must still get the
+complete answer.
+
+Usage:
+    python benchmarks/check_coalescing.py [--requests 20] [--delay 0.5]
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['LLM_PROVIDER'] = 'local'
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from app import create_app, db
+from app.services.chat_service import get_chat_service
+from app.services.llm_provider import LocalProvider
+
+QUESTION = "what would you suggest for a rainy weekend"
+
+
+class CountingProvider(LocalProvider):
+    """Local provider that counts the prompts it answers"""
+
+    def __init__(self, delay):
+        super().__init__(delay)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout):
+        with self._lock:
+            self.calls += 1
+        return super().generate(prompt, timeout)
+
+
+def burst(app, service, requests):
+    """Send QUESTION from requests threads at once; their answers and the wall time"""
+    barrier = threading.Barrier(requests)
+    answers = [None] * requests
+
+    def send(index):
+        with app.app_context():
+            barrier.wait()
+            answers[index] = service.process_message(QUESTION, None)
+
+    threads = [threading.Thread(target=send, args=(index,)) for index in range(requests)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return answers, time.perf_counter() - started_at
+
+
+def abandoned_stream(app, service, followers, delay):
+    """Stream QUESTION, drop the stream after its first chunk while followers wait; their answers and the chunk"""
+    answers = [None] * followers
+    first_chunk = []
+
+    def lead():
+        with app.app_context():
+            stream = service.stream_message(QUESTION, None)
+            first_chunk.append(next(stream)['delta'])
+            stream.close()
+
+    def follow(index):
+        with app.app_context():
+            answers[index] = service.process_message(QUESTION, None)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    # Join while the leader is still waiting for the provider
+    time.sleep(delay / 4)
+    threads = [threading.Thread(target=follow, args=(index,)) for index in range(followers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads + [leader]:
+        thread.join()
+    return answers, first_chunk[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds the stub provider takes per answer')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    # Room for the whole burst when every request calls the provider
+    app.config.update(LLM_MAX_CONCURRENCY=args.requests, LLM_MAX_QUEUE=0)
+    failures = 0
+
+    with app.app_context():
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.create_all()
+            from app.utils.sample_data import create_sample_data
+            create_sample_data()
+        service = get_chat_service()
+        assert service._detect_intent(QUESTION) == 'general'
+
+        for coalesce in (True, False):
+            service.coalesce = coalesce
+            service.response_cache.clear()
+            provider = service.llm.provider = CountingProvider(args.delay)
+            before = service.in_flight.metrics()['calls_saved']
+
+            answers, elapsed = burst(app, service, args.requests)
+            contents = {answer['content'] for answer in answers}
+            types = {answer['metadata']['type'] for answer in answers}
+            saved = service.in_flight.metrics()['calls_saved'] - before
+
+            label = 'coalesced' if coalesce else 'independent'
+            print(f"{label}: {args.requests} requests in {elapsed:.2f}s, provider calls: {provider.calls}, "
+                  f"calls saved: {saved}, distinct answers: {len(contents)}, types: {sorted(types)}")
+            if coalesce:
+                ok = (provider.calls == 1 and saved == args.requests - 1
+                      and len(contents) == 1 and types == {'gemini_response'})
+                failures += not ok
+                print('ok' if ok else 'FAIL')
+
+        service.coalesce = True
+        service.response_cache.clear()
+        provider = service.llm.provider = CountingProvider(args.delay)
+        answers, first_chunk = abandoned_stream(app, service, args.requests - 1, args.delay)
+        contents = {answer['content'] for answer in answers}
+        types = {answer['metadata']['type'] for answer in answers}
+        print(f"abandoned stream: {len(answers)} waiting requests, provider calls: {provider.calls}, "
+              f"distinct answers: {len(contents)}, types: {sorted(types)}")
+        ok = (provider.calls == 1 and len(contents) == 1 and types == {'gemini_response'}
+              and len(contents.pop()) > len(first_chunk))
+        failures += not ok
+        print('ok' if ok else 'FAIL')
+
+        print(f"coalescing metrics: {service.in_flight.metrics()}")
+
+    os.unlink(database_file.name)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
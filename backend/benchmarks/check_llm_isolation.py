@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Check that slow LLM calls cannot take every request thread.
+
+Serves the app from a WSGI server with WEB_THREADS worker threads (like
+one gunicorn gthread worker), with the local LLM provider taking --delay
+seconds per answer. More distinct chat questions than there are threads
+are sent at once; while they wait on the LLM, GET /api/products must be
+answered within --catalog-budget seconds, and the chat requests beyond
+LLM_MAX_CONCURRENCY + LLM_MAX_QUEUE must get a 503. Fails (exit code 1)
+otherwise. For comparison, the same burst is then sent with LLM limits
+as large as the thread count.
+
+Usage:
+    python benchmarks/check_llm_isolation.py [--threads 8] [--delay 2]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import logging
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['LLM_PROVIDER'] = 'local'
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from werkzeug.serving import BaseWSGIServer
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+
+
+class BoundedThreadWSGIServer(BaseWSGIServer):
+    """WSGI server handling requests on a fixed-size thread pool"""
+
+    def __init__(self, host, port, app, workers):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def request(url, data=None, headers=None):
+    """Status code of a request"""
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json', **(headers or {})})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run(label, args, **limits):
+    app = create_app('production')
+    app.config.update(WEB_THREADS=args.threads, LLM_LOCAL_DELAY=args.delay, **limits)
+    with app.app_context():
+        token = create_access_token(identity=str(User.query.first().id))
+        slots = app.config['LLM_MAX_CONCURRENCY'] + app.config['LLM_MAX_QUEUE']
+
+    server = BoundedThreadWSGIServer('127.0.0.1', 0, app, args.threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/api'
+    headers = {'Authorization': f'Bearer {token}'}
+
+    chats = args.threads + 2
+    statuses = Counter()
+
+    def chat(index):
+        status = request(f'{base_url}/chat/message',
+                         {'message': f'what would you suggest for a rainy weekend {index}'}, headers)
+        statuses[status] += 1
+
+    threads = [threading.Thread(target=chat, args=(index,)) for index in range(chats)]
+    for thread in threads:
+        thread.start()
+    # Let the chat requests reach the LLM
+    time.sleep(min(0.5, args.delay / 4))
+    started = time.perf_counter()
+    catalog_status = request(f'{base_url}/products?per_page=20')
+    catalog_seconds = time.perf_counter() - started
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    print(f"\n== {label}: {args.threads} threads, {slots} LLM slots ==")
+    print(f"catalog request during {chats} chat requests: {catalog_status} in {catalog_seconds:.2f}s")
+    print(f"chat responses by status: {dict(statuses)}")
+    return catalog_status, catalog_seconds, statuses, slots, chats
+
+
+def main():
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8, help='request threads')
+    parser.add_argument('--delay', type=float, default=2.0, help='seconds the stub LLM takes per answer')
+    parser.add_argument('--catalog-budget', type=float, default=1.0, help='seconds the catalog request may take')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.utils.sample_data import create_sample_data
+            create_sample_data()
+
+    try:
+        catalog_status, catalog_seconds, statuses, slots, chats = run(
+            'limits derived from the thread count', args,
+            LLM_MAX_CONCURRENCY=max(1, args.threads // 2), LLM_MAX_QUEUE=args.threads // 4)
+        ok = (catalog_status == 200 and catalog_seconds < args.catalog_budget
+              and statuses[200] == slots and statuses[503] == chats - slots)
+        print('ok' if ok else 'FAIL')
+        run('limits as large as the thread count', args, LLM_MAX_CONCURRENCY=args.threads, LLM_MAX_QUEUE=0)
+    finally:
+        os.unlink(database_file.name)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
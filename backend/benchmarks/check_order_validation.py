@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Check that order items with a malformed product_id or quantity are rejected.
+
+Seeds a temporary database with the sample catalog and posts orders whose
+only item has a bad product_id or quantity (a string, list, object, bool,
+float, zero or negative number) to POST /api/orders and, as one order of
+a batch, to POST /api/orders/batch. Every one must be refused with
+"Invalid item data" and no order created; a well-formed order is then
+placed to show the check is not refusing everything. Fails (exit code 1)
+otherwise.
+
+Usage:
+    python benchmarks/check_order_validation.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+import contextlib
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import Order, Product, User
+
+BAD_VALUES = ['1', [1], {'id': 1}, True, False, 1.0, 0, -3, None]
+
+
+def main():
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.utils.sample_data import create_sample_data
+            create_sample_data()
+        token = create_access_token(identity=str(User.query.first().id))
+        product_id = Product.query.filter(Product.stock_quantity > 0).first().id
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    failures = 0
+    try:
+        payloads = [('product_id', value, {'product_id': value, 'quantity': 1}) for value in BAD_VALUES]
+        payloads += [('quantity', value, {'product_id': product_id, 'quantity': value})
+                     for value in BAD_VALUES if value is not None]
+        for field, value, item in payloads:
+            order = {'items': [item], 'shipping_address': '1 Main St'}
+            single = client.post('/api/orders', json=order, headers=headers)
+            batch = client.post('/api/orders/batch', json={'orders': [order]}, headers=headers)
+            batch_errors = [result.get('error') for result in (batch.get_json() or {}).get('results', [])]
+            ok = (single.status_code == 400 and single.get_json().get('error') == 'Invalid item data'
+                  and batch_errors == ['Invalid item data'])
+            failures += not ok
+            print(f"{field}={value!r}: single {single.status_code}, batch {batch.status_code} "
+                  f"{batch_errors} {'ok' if ok else 'FAIL'}")
+
+        with app.app_context():
+            created = Order.query.count()
+        valid = client.post('/api/orders', json={'items': [{'product_id': product_id, 'quantity': 1}],
+                                                 'shipping_address': '1 Main St'}, headers=headers)
+        ok = created == 0 and valid.status_code == 201
+        failures += not ok
+        print(f"orders created by bad payloads: {created}, valid order: {valid.status_code} "
+              f"{'ok' if ok else 'FAIL'}")
+    finally:
+        os.unlink(database_file.name)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
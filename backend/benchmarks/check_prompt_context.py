@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Relevance and size check for the store context of Gemini prompts.
+
+Seeds an in-memory database with the sample catalog and answers general
+questions through the shared ChatService with the local LLM provider,
+recording each prompt instead of calling Gemini. Fails (exit code 1) unless every
+prompt lists a product from the category the question is about, and a
+repeat of the same question renders its products from the snippet cache
+without loading them. Prompt sizes are compared with the old prompt
+built around the first 5 categories and 5 sample products.
+
+Usage:
+    python benchmarks/check_prompt_context.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+import contextlib
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['LLM_PROVIDER'] = 'local'
+# No prebuilt index: embed the sample catalog in-process
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from app import create_app, db
+from app.models import Category, Product
+from app.services.catalog_summary import catalog_summary
+from app.services.chat_service import get_chat_service
+from app.services.conversation import estimate_tokens
+from app.services.llm_provider import LocalProvider
+from app.utils.query_counter import QueryCounter
+
+
+# (question routed to the LLM, category a relevant product belongs to)
+QUESTIONS = [
+    ("which noise cancelling headphones are best for long flights", 'Headphones'),
+    ("is a laptop with an intel i7 and 16gb ram good for programming", 'Laptops'),
+    ("I'd like a phone with a really good camera", 'Smartphones'),
+    ("comfortable sneakers for walking all day", 'Shoes'),
+]
+
+
+class RecordingProvider(LocalProvider):
+    """Local provider that keeps every prompt it answers"""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate(self, prompt, timeout):
+        self.prompts.append(prompt)
+        return super().generate(prompt, timeout)
+
+
+def legacy_prompt(message):
+    """Prompt as it was before retrieval: first 5 categories, 5 sample products"""
+    summary = catalog_summary.get()
+    category_info = [f"- {category['name']}: {category['product_count']} products"
+                     for category in summary['categories'][:5]]
+    product_info = [f"- {product['name']}: ${product['price']:.2f}" for product in summary['sample_products']]
+    context = f"""
+STORE CATEGORIES:
+{chr(10).join(category_info)}
+
+SAMPLE PRODUCTS:
+{chr(10).join(product_info)}
+
+We have over 100 products across multiple categories including electronics, books, clothing, and more.
+"""
+    return f"""You are a helpful e-commerce shopping assistant. The user asked: "{message}"
+
+Here's information about our store:
+{context}
+
+
+Please provide a helpful, friendly response. If the user is asking about products:
+1. Suggest relevant products from our inventory
+2. Include specific product names and prices when possible
+3. Ask follow-up questions to better help them
+4. Keep responses conversational and under 200 words
+
+If the user is asking general questions, provide helpful shopping advice while staying focused on our e-commerce store."""
+
+
+def main():
+    app = create_app('production')
+    failures = 0
+
+    with app.app_context():
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.create_all()
+            from app.utils.sample_data import create_sample_data
+            create_sample_data()
+            service = get_chat_service()
+
+        model = RecordingProvider()
+        service.llm.provider = model
+        categories = {category.name: category.id for category in Category.query.all()}
+
+        for question, category in QUESTIONS:
+            assert service._detect_intent(question.lower()) == 'general', question
+            service.process_message(question, None)
+            prompt = model.prompts[-1]
+            context = service._get_shop_context(question)
+
+            names = [product.name for product in Product.query.filter_by(category_id=categories[category])]
+            relevant = any(name in context for name in names)
+
+            # The same question again must not load any product
+            with QueryCounter() as counter:
+                service._get_shop_context(question)
+            loaded = [statement for statement in counter.statements if 'FROM products' in statement]
+
+            ok = relevant and not loaded
+            failures += not ok
+            legacy_tokens = estimate_tokens(legacy_prompt(question))
+            print(f"{'ok' if ok else 'FAIL':4} {question!r}")
+            print(f"     prompt {estimate_tokens(prompt)} tokens (with fixed sample products: {legacy_tokens}), "
+                  f"relevant product: {'yes' if relevant else 'no'}, product loads on repeat: {len(loaded)}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
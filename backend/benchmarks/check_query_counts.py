@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+SQL statement budget check for the catalog, order and auth endpoints.
+
+Seeds an in-memory database, then calls each endpoint and fails (exit code 1)
+if it runs more statements than its budget. The budgets do not depend on page
+size, so an N+1 lazy load introduced in a to_dict() shows up as a failure.
+
+Usage:
+    python benchmarks/check_query_counts.py
+"""
+
+import io
+import os
+import sys
+import contextlib
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+# Keep deferred last_login writes out of the counted requests
+os.environ['LAST_LOGIN_FLUSH_INTERVAL'] = '3600'
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import Product, User
+from app.utils.query_counter import assert_max_queries
+
+
+# endpoint -> maximum number of SQL statements
+BUDGETS = {
+    '/api/products?per_page=100': 2,
+    '/api/products/{product_id}': 1,
+    '/api/products/search?q=pro': 1,
+    '/api/products/recommendations?limit=20': 3,
+    '/api/orders?per_page=100': 3,
+    '/api/orders/{order_id}': 2,
+}
+
+# Requests with a JSON body: (method, endpoint, body) -> maximum number of SQL statements
+REQUEST_BUDGETS = {
+    ('POST', '/api/auth/login', (('username', '{username}'), ('password', 'password123'))): 1,
+    # Profile cached by the previous request's warmup
+    ('GET', '/api/auth/me', None): 0,
+}
+
+
+def seed(client, headers):
+    """Create a few multi-line orders for the benchmark user"""
+    products = Product.query.filter(Product.stock_quantity > 10).limit(30).all()
+    order_id = None
+    for start in range(0, len(products), 5):
+        items = [{'product_id': product.id, 'quantity': 1} for product in products[start:start + 5]]
+        response = client.post('/api/orders', json={
+            'items': items,
+            'shipping_address': {'street': '1 Main St', 'city': 'Springfield'}
+        }, headers=headers)
+        order_id = response.get_json()['order']['id']
+    return order_id
+
+
+def main():
+    app = create_app('development')
+    client = app.test_client()
+    failures = 0
+
+    with app.app_context():
+        from app.utils.sample_data import create_sample_data
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_sample_data()
+
+        user = User.query.first()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        order_id = seed(client, headers)
+        product_id = Product.query.filter_by(is_active=True).first().id
+
+        # Warm lazily built structures so they are not counted against a request
+        client.get('/api/products/search?q=warmup')
+        client.get('/api/products/recommendations?limit=1', headers=headers)
+        client.get('/api/auth/me', headers=headers)
+
+        requests = [('GET', endpoint, None, budget) for endpoint, budget in BUDGETS.items()]
+        requests += [(method, endpoint, body, budget) for (method, endpoint, body), budget in REQUEST_BUDGETS.items()]
+        for method, endpoint, body, budget in requests:
+            url = endpoint.format(product_id=product_id, order_id=order_id)
+            json = {key: value.format(username=user.username) for key, value in body} if body else None
+            try:
+                with assert_max_queries(budget) as counter:
+                    response = client.open(url, method=method, json=json, headers=headers)
+                status = 'ok'
+            except AssertionError as e:
+                status = 'FAIL'
+                failures += 1
+                print(e)
+            print(f'{status:4} {counter.count:3d}/{budget:<3d} {response.status_code} {method} {url}')
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
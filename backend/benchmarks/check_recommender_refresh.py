@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Check that refreshing the recommender gives the same model as rebuilding it.
+
+Seeds a temporary database with the sample catalog, a few orders and
+chat sessions whose bot messages list products, and builds the
+co-occurrence model. Then more messages are added, some to the sessions
+already counted and some to new sessions, together with a new order.
+The model brought up to date by the periodic refresh must hold the same
+pair counts and occurrences as one built from scratch. Fails (exit
+code 1) otherwise.
+
+Usage:
+    python benchmarks/check_recommender_refresh.py [--sessions 20] [--seed 7]
+"""
+
+import io
+import os
+import sys
+import uuid
+import random
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+os.environ['RECOMMENDER_MODEL_PATH'] = os.path.join(tempfile.mkdtemp(), 'recommender.npz')
+
+from app import create_app, db
+from app.models import ChatMessage, ChatSession, Order, OrderItem, Product, User
+from app.services.recommender import recommender
+
+
+def add_messages(rng, sessions, product_ids):
+    for session in sessions:
+        listed = rng.sample(product_ids, rng.randint(1, 3))
+        db.session.add(ChatMessage(session_id=session.id, message_type='bot', content='Here you go',
+                                   extra_data={'products': [{'id': product_id} for product_id in listed]}))
+    db.session.commit()
+
+
+def add_order(rng, user, product_ids):
+    order = Order(user_id=user.id, order_number=f'ORD-{uuid.uuid4().hex[:8].upper()}', total_amount=0,
+                  shipping_address='1 Main St')
+    db.session.add(order)
+    db.session.flush()
+    for product_id in rng.sample(product_ids, 3):
+        db.session.add(OrderItem(order_id=order.id, product_id=product_id, quantity=1, unit_price=0, total_price=0))
+    db.session.commit()
+
+
+def new_sessions(user, count):
+    sessions = [ChatSession(user_id=user.id, session_token=uuid.uuid4().hex) for _ in range(count)]
+    db.session.add_all(sessions)
+    db.session.commit()
+    return sessions
+
+
+def as_dict(model):
+    """Pair counts and occurrences keyed by product id, without zero entries"""
+    ids = [int(product_id) for product_id in model.product_ids]
+    counts = model.counts.tocoo()
+    pairs = {(ids[i], ids[j]): float(value) for i, j, value in zip(counts.row, counts.col, counts.data) if value}
+    occurrences = {ids[i]: float(value) for i, value in enumerate(model.occurrences) if value}
+    return pairs, occurrences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    app = create_app('production')
+    try:
+        with app.app_context():
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.create_all()
+                from app.utils.sample_data import create_sample_data
+                create_sample_data()
+            if not recommender.enabled:
+                print('numpy/scipy not installed, nothing to check')
+                sys.exit(0)
+            user = User.query.first()
+            product_ids = [product.id for product in Product.query.with_entities(Product.id).limit(30)]
+
+            sessions = new_sessions(user, args.sessions)
+            add_messages(rng, sessions, product_ids)
+            add_order(rng, user, product_ids)
+            recommender.model()
+
+            add_messages(rng, sessions[:args.sessions // 2], product_ids)
+            add_messages(rng, new_sessions(user, args.sessions // 4), product_ids)
+            add_order(rng, user, product_ids)
+            recommender._state()['refreshed_at'] = 0.0
+            refreshed = as_dict(recommender.model())
+            rebuilt = as_dict(recommender.build())
+
+            differing = {pair for pair in set(refreshed[0]) | set(rebuilt[0])
+                         if abs(refreshed[0].get(pair, 0.0) - rebuilt[0].get(pair, 0.0)) > 1e-6}
+            ok = not differing and refreshed[1] == rebuilt[1]
+            print(f"refreshed: {len(refreshed[0]) // 2} pairs, rebuilt: {len(rebuilt[0]) // 2} pairs, "
+                  f"differing pairs: {len(differing) // 2}, occurrences equal: {refreshed[1] == rebuilt[1]}, "
+                  f"refreshes: {recommender.metrics()['refreshes']}")
+            print('ok' if ok else 'FAIL')
+    finally:
+        os.unlink(database_file.name)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Check which cached answers the response cache reuses for a new question.
+
+With similarity matching on, each case caches an answer for one question
+and looks up another. A question worded differently with the same content
+words must get the cached answer; a broader question must not get the
+answer to a more constrained one, nor a more constrained question the
+answer to a broader one. Fails (exit code 1) otherwise.
+
+Usage:
+    python benchmarks/check_response_cache.py
+"""
+
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.response_cache import ResponseCache
+
+# (cached question, new question, whether the cached answer may be reused)
+CASES = [
+    ('red running shoes under $50', 'running shoes', False),
+    ('running shoes', 'red running shoes under $50', False),
+    ('which gaming laptop is best under 500 dollars', 'which gaming laptop is best for students under 500 dollars', False),
+    ('which gaming laptop is best for students under 500 dollars', 'which gaming laptop is best under 500 dollars', False),
+    ('what would you suggest for a rainy weekend', 'rainy weekend: what would you recommend?', True),
+    ('Running shoes for trail', 'could you suggest trail running shoes please', True),
+]
+
+
+def main():
+    failures = 0
+    for cached, asked, expected in CASES:
+        cache = ResponseCache(similarity_threshold=0.75)
+        cache.put(cached, 1, {'content': cached})
+        reused = cache.get(asked, 1) is not None
+        ok = reused == expected
+        failures += not ok
+        print(f"{'reused' if reused else 'missed'}: {asked!r} after {cached!r} {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
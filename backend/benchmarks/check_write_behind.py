@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Check how WriteBehindQueue handles a failing batch.
+
+Queues --items items and flushes them through an ``apply`` that records
+its calls. When ``apply`` raises OperationalError (the database is
+unavailable), the batch must be tried once and requeued whole, not item
+by item. When it raises IntegrityError for one bad item, the other items
+must be written and only the bad one requeued. Fails (exit code 1)
+otherwise.
+
+Usage:
+    python benchmarks/check_write_behind.py [--items 50]
+"""
+
+import io
+import os
+import sys
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['EMBEDDING_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'embeddings')
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app import create_app
+from app.utils.write_behind import WriteBehindQueue
+
+
+class RecordingApply:
+    """An apply callback that records its calls and fails as told"""
+
+    def __init__(self, fail):
+        self.fail = fail
+        self.calls = []
+        self.written = []
+
+    def __call__(self, items):
+        self.calls.append(list(items))
+        error = self.fail(items)
+        if error is not None:
+            raise error
+        self.written.extend(items)
+
+
+def flush(app, apply, items):
+    queue = WriteBehindQueue(app, apply, name='check-write-behind')
+    # Put without starting the background thread, so flush below is the only writer
+    queue._thread = object()
+    for item in range(items):
+        queue.put(item)
+    with contextlib.redirect_stdout(io.StringIO()):
+        written = queue.flush()
+    return written, queue.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app('production')
+    failures = 0
+    try:
+        unavailable = RecordingApply(lambda items: OperationalError('INSERT', {}, Exception('database is locked')))
+        written, metrics = flush(app, unavailable, args.items)
+        print(f"OperationalError: apply called {len(unavailable.calls)} times, written {written}, "
+              f"pending {metrics['pending']}")
+        ok = len(unavailable.calls) == 1 and written == 0 and metrics['pending'] == args.items
+        failures += not ok
+        print('ok' if ok else 'FAIL')
+
+        bad = args.items // 2
+        one_bad = RecordingApply(lambda items: IntegrityError('INSERT', {}, Exception('constraint failed'))
+                                 if bad in items else None)
+        written, metrics = flush(app, one_bad, args.items)
+        print(f"IntegrityError on item {bad}: apply called {len(one_bad.calls)} times, written {written}, "
+              f"pending {metrics['pending']}")
+        ok = (written == args.items - 1 and bad not in one_bad.written
+              and metrics['pending'] == 1 and len(one_bad.calls) == 1 + args.items)
+        failures += not ok
+        print('ok' if ok else 'FAIL')
+    finally:
+        os.unlink(database_file.name)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Load test: catalog latency while the LLM is slow.
+
+Starts a local fake Gemini server that answers generateContent after a fixed
+delay, and serves the app from a WSGI server with a fixed number of worker
+threads (like gunicorn's gthread worker). Chat clients keep sending messages
+that fall through to the LLM while a catalog client measures GET /api/products
+latency. The run is repeated with an effectively unbounded LLM pool and with
+the bounded dispatcher, to show that bounding LLM concurrency keeps worker
+threads free for catalog reads.
+
+Usage:
+    python benchmarks/load_test_llm.py [--workers 8] [--chat-clients 24]
+                                       [--llm-delay 1.0] [--duration 8]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import statistics
+import logging
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ.setdefault('GEMINI_API_KEY', 'load-test-key')
+os.environ['GEMINI_TRANSPORT'] = 'rest'
+os.environ['METRICS_TOKEN'] = 'load-test'
+
+from werkzeug.serving import BaseWSGIServer
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers generateContent requests after a configurable delay"""
+
+    delay = 1.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.delay)
+        body = json.dumps({'candidates': [{
+            'content': {'parts': [{'text': 'This is a canned answer from the fake model.'}], 'role': 'model'},
+            'finishReason': 'STOP',
+            'index': 0
+        }]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BoundedThreadWSGIServer(BaseWSGIServer):
+    """WSGI server handling requests on a fixed-size thread pool"""
+
+    def __init__(self, host, port, app, workers):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def request(url, data=None, headers=None):
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json', **(headers or {})})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b'{}')
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_scenario(name, args, gemini_url, max_concurrency, max_queue):
+    app = create_app('production')
+    app.config.update(
+        GEMINI_API_ENDPOINT=gemini_url,
+        LLM_MAX_CONCURRENCY=max_concurrency,
+        LLM_MAX_QUEUE=max_queue,
+        LLM_TIMEOUT=60
+    )
+    with app.app_context():
+        user = User.query.first()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    server = BoundedThreadWSGIServer('127.0.0.1', 0, app, args.workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/api'
+
+    stop = threading.Event()
+    chat_outcomes = []
+    errors = []
+    catalog_latencies = []
+
+    def chat_client():
+        while not stop.is_set():
+            response = request(f'{base_url}/chat/message',
+                               {'message': 'what would you suggest for a rainy weekend'}, headers)
+            if 'bot_response' in response:
+                chat_outcomes.append(response['bot_response']['extra_data'].get('type'))
+            else:
+                chat_outcomes.append('error')
+                errors.append(response.get('details'))
+
+    def catalog_client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            request(f'{base_url}/products?per_page=20')
+            catalog_latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=chat_client) for _ in range(args.chat_clients)]
+    threads.append(threading.Thread(target=catalog_client))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    metrics = request(f'{base_url}/metrics', headers={'X-Metrics-Token': 'load-test'})['llm_dispatcher']
+    server.shutdown()
+
+    print(f"\n== {name}: LLM max_concurrency={max_concurrency}, max_queue={max_queue} ==")
+    print(f"catalog requests: {len(catalog_latencies)}")
+    if catalog_latencies:
+        print(f"catalog latency ms: p50={statistics.median(catalog_latencies):.1f} "
+              f"p95={percentile(catalog_latencies, 95):.1f} p99={percentile(catalog_latencies, 99):.1f} "
+              f"max={max(catalog_latencies):.1f}")
+    answered = chat_outcomes.count('gemini_response')
+    fallbacks = len(chat_outcomes) - answered - len(errors)
+    print(f"chat responses: {len(chat_outcomes)} ({answered} from LLM, {fallbacks} fast fallbacks, {len(errors)} errors)")
+    if errors:
+        print(f"chat errors: {len(errors)}, e.g. {errors[0]}")
+    print(f"dispatcher: {metrics}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help='WSGI worker threads')
+    parser.add_argument('--chat-clients', type=int, default=24, help='concurrent chat clients')
+    parser.add_argument('--llm-delay', type=float, default=1.0, help='fake LLM latency in seconds')
+    parser.add_argument('--duration', type=float, default=8.0, help='seconds per scenario')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    FakeGeminiHandler.delay = args.llm_delay
+    gemini = ThreadingHTTPServer(('127.0.0.1', 0), FakeGeminiHandler)
+    threading.Thread(target=gemini.serve_forever, daemon=True).start()
+    gemini_url = f'http://127.0.0.1:{gemini.server_address[1]}'
+
+    app = create_app('production')
+    with app.app_context():
+        from app.utils.sample_data import create_sample_data
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_sample_data()
+
+    try:
+        run_scenario('unbounded', args, gemini_url, max_concurrency=args.chat_clients * 2, max_queue=args.chat_clients)
+        run_scenario('bounded', args, gemini_url, max_concurrency=max(1, args.workers // 2), max_queue=0)
+    finally:
+        gemini.shutdown()
+        os.unlink(database_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Load test: login and catalog latency under a burst of logins.
+
+Serves the app from a WSGI server with a fixed number of worker threads
+(like gunicorn's gthread worker). Login clients keep logging in as the
+sample users while a catalog client measures GET /api/products latency.
+Scenarios:
+
+- unbounded: as many hashing threads as login clients, so bcrypt runs on
+  every busy worker at once, as it did on the request thread
+- bounded: the default small hashing pool; logins beyond it get a quick 503
+- stuffing: the bounded pool with the default login limits, all clients
+  guessing wrong passwords from one address
+
+Usage:
+    python benchmarks/load_test_login.py [--workers 8] [--login-clients 16]
+                                         [--duration 8] [--rounds 12]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+import statistics
+import logging
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+os.environ['METRICS_TOKEN'] = 'load-test'
+
+from werkzeug.serving import BaseWSGIServer
+from app import create_app, db
+from app.models import User
+from app.services.passwords import password_hasher
+from app.services.login_throttle import login_throttle
+
+
+class BoundedThreadWSGIServer(BaseWSGIServer):
+    """WSGI server handling requests on a fixed-size thread pool"""
+
+    def __init__(self, host, port, app, workers):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def request(url, data=None, headers=None):
+    """(status code, JSON body) of a request"""
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json', **(headers or {})})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'{}')
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def latency_line(latencies):
+    if not latencies:
+        return 'none'
+    return (f"p50={statistics.median(latencies):.1f} p95={percentile(latencies, 95):.1f} "
+            f"p99={percentile(latencies, 99):.1f} max={max(latencies):.1f}")
+
+
+def run_scenario(name, args, usernames, **overrides):
+    app = create_app('production')
+    app.config.update(BCRYPT_ROUNDS=args.rounds, **overrides)
+    # Both extensions read their limits when initialized
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+
+    server = BoundedThreadWSGIServer('127.0.0.1', 0, app, args.workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/api'
+    wrong_passwords = name == 'stuffing'
+
+    stop = threading.Event()
+    login_latencies = []
+    login_statuses = Counter()
+    catalog_latencies = []
+
+    def login_client():
+        while not stop.is_set():
+            password = f'guess{random.randrange(10 ** 6)}' if wrong_passwords else 'password123'
+            started = time.perf_counter()
+            status, _ = request(f'{base_url}/auth/login', {'username': random.choice(usernames), 'password': password})
+            if status == 200:
+                login_latencies.append((time.perf_counter() - started) * 1000)
+            login_statuses[status] += 1
+
+    def catalog_client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            request(f'{base_url}/products?per_page=20')
+            catalog_latencies.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=login_client) for _ in range(args.login_clients)]
+    threads.append(threading.Thread(target=catalog_client))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    _, metrics = request(f'{base_url}/metrics', headers={'X-Metrics-Token': 'load-test'})
+    server.shutdown()
+
+    print(f"\n== {name}: hashing workers={app.config['PASSWORD_HASH_WORKERS']}, "
+          f"queue={app.config['PASSWORD_HASH_QUEUE']}, bcrypt rounds={args.rounds} ==")
+    print(f"catalog requests: {len(catalog_latencies)}, latency ms: {latency_line(catalog_latencies)}")
+    print(f"successful login latency ms: {latency_line(login_latencies)}")
+    print(f"login responses by status: {dict(sorted(login_statuses.items()))}")
+    print(f"password hasher: {metrics['password_hasher']}")
+    print(f"login throttle: {metrics['login_throttle']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help='WSGI worker threads')
+    parser.add_argument('--login-clients', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--duration', type=float, default=8.0, help='seconds per scenario')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost of the sample users')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app = create_app('production')
+    app.config['BCRYPT_ROUNDS'] = args.rounds
+    password_hasher.init_app(app)
+    with app.app_context():
+        from app.utils.sample_data import create_sample_data
+        db.create_all()
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_sample_data()
+        usernames = [user.username for user in User.query.all()]
+
+    # Limits high enough not to interfere, so the first two runs compare the pools alone
+    no_throttle = dict(LOGIN_IP_LIMIT=10 ** 6, LOGIN_ACCOUNT_LIMIT=10 ** 6)
+    try:
+        run_scenario('unbounded', args, usernames, PASSWORD_HASH_WORKERS=args.login_clients,
+                     PASSWORD_HASH_QUEUE=args.login_clients, **no_throttle)
+        run_scenario('bounded', args, usernames, PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_QUEUE=2, **no_throttle)
+        run_scenario('stuffing', args, usernames, PASSWORD_HASH_WORKERS=2, PASSWORD_HASH_QUEUE=2)
+    finally:
+        os.unlink(database_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for order creation.
+
+Many threads try to buy the same SKU at once through POST /api/orders. The
+product starts with a fixed stock; afterwards the script checks that no more
+units were sold than were in stock, that the remaining stock matches the units
+sold, and that every successful order has its items. Exits with status 1 on an
+oversell or inconsistency.
+
+Runs against a temporary SQLite database by default; set DATABASE_URL to run
+against another database (e.g. PostgreSQL, where rows are locked FOR UPDATE).
+The database must be empty, as the script creates its own tables and data.
+
+Usage:
+    python benchmarks/stress_orders.py [--threads 32] [--orders-per-thread 10]
+                                       [--stock 100] [--quantity 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+database_file = None
+if 'DATABASE_URL' not in os.environ:
+    database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_file.name}'
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import Category, Order, OrderItem, Product, User
+
+
+def seed(stock):
+    """Create a user and the single contended product"""
+    db.create_all()
+    user = User(username='stress', email='stress@example.com', first_name='Stress', last_name='Test')
+    user.set_password('stress-password')
+    category = Category(name='Stress', description='Contended products')
+    db.session.add_all([user, category])
+    db.session.flush()
+    product = Product(name='Limited Edition Widget', price=19.99, category_id=category.id,
+                      sku='STRESS-0001', stock_quantity=stock)
+    db.session.add(product)
+    db.session.commit()
+    return user.id, product.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent buyers')
+    parser.add_argument('--orders-per-thread', type=int, default=10, help='orders each buyer attempts')
+    parser.add_argument('--stock', type=int, default=100, help='initial stock of the SKU')
+    parser.add_argument('--quantity', type=int, default=3, help='units per order')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    with app.app_context():
+        user_id, product_id = seed(args.stock)
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    outcomes = Counter()
+    errors = []
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def buyer():
+        client = app.test_client()
+        start.wait()
+        for _ in range(args.orders_per_thread):
+            response = client.post('/api/orders', headers=headers, json={
+                'items': [{'product_id': product_id, 'quantity': args.quantity}],
+                'shipping_address': {'street': '1 Stress Lane', 'city': 'Load', 'zip': '00000'}
+            })
+            with lock:
+                outcomes[response.status_code] += 1
+                if response.status_code >= 500:
+                    errors.append(response.get_json().get('details'))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=buyer) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        remaining = db.session.get(Product, product_id).stock_quantity
+        orders = Order.query.count()
+        units_sold = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)).scalar()
+
+    attempts = args.threads * args.orders_per_thread
+    print(f"{attempts} order attempts from {args.threads} threads in {elapsed:.2f}s "
+          f"({attempts / elapsed:.0f} orders/s)")
+    print(f"responses: {dict(sorted(outcomes.items()))}")
+    print(f"stock: initial={args.stock} remaining={remaining} units sold={units_sold} orders={orders}")
+    if errors:
+        print(f"server errors: {len(errors)}, e.g. {errors[0]}")
+
+    failures = []
+    if units_sold > args.stock or remaining < 0:
+        failures.append('oversold')
+    if remaining != args.stock - units_sold:
+        failures.append('remaining stock does not match units sold')
+    if outcomes[201] != orders or units_sold != orders * args.quantity:
+        failures.append('successful responses do not match stored orders')
+    if args.stock // args.quantity <= attempts and outcomes[201] != args.stock // args.quantity:
+        failures.append(f'expected {args.stock // args.quantity} orders to succeed')
+
+    if database_file is not None:
+        os.unlink(database_file.name)
+
+    if failures:
+        print('FAIL: ' + '; '.join(failures))
+        sys.exit(1)
+    print('OK: no oversell')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,24 +7,149 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///ecommerce_chatbot.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Connection pool per process (size it to at least GUNICORN_THREADS); recycling
+    # and pre-ping only apply to database servers
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() == 'true'
+    
+    # PRAGMAs set on every SQLite connection; busy timeout in milliseconds,
+    # mmap size in bytes (0 turns memory-mapped reads off)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', 3600))
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
     
+    # Use SQLite FTS5 / PostgreSQL tsvector search instead of the in-memory index
+    FULLTEXT_SEARCH = os.environ.get('FULLTEXT_SEARCH', 'false').lower() == 'true'
+    
+    # Chat product retrieval: 'embedding' (semantic, needs numpy and scipy) or 'keyword'
+    CHAT_RETRIEVAL = os.environ.get('CHAT_RETRIEVAL', 'embedding')
+    # Product vectors written by `python run.py build-embeddings` (default: instance/embeddings)
+    EMBEDDING_INDEX_PATH = os.environ.get('EMBEDDING_INDEX_PATH')
+    EMBEDDING_DIMENSIONS = int(os.environ.get('EMBEDDING_DIMENSIONS', 32))
+    EMBEDDING_MIN_SCORE = float(os.environ.get('EMBEDDING_MIN_SCORE', 0.2))
+    
+    # Products retrieved into each Gemini prompt; descriptions are left out unless given a length
+    PROMPT_PRODUCT_LIMIT = int(os.environ.get('PROMPT_PRODUCT_LIMIT', 5))
+    PROMPT_DESCRIPTION_CHARS = int(os.environ.get('PROMPT_DESCRIPTION_CHARS', 0))
+    
     # Gemini AI Configuration
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash-exp')
     MAX_CONVERSATION_HISTORY = int(os.environ.get('MAX_CONVERSATION_HISTORY', 20))
+    # Estimated tokens of conversation per prompt, part of it kept for the summary of older turns
+    CONVERSATION_TOKEN_BUDGET = int(os.environ.get('CONVERSATION_TOKEN_BUDGET', 800))
+    CONVERSATION_SUMMARY_TOKENS = int(os.environ.get('CONVERSATION_SUMMARY_TOKENS', 200))
+    # Optional overrides, e.g. to point the client at a local fake server
+    GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT')
+    GEMINI_TRANSPORT = os.environ.get('GEMINI_TRANSPORT')
+    
+    # Request threads per process (gunicorn.conf.py reads the same variable)
+    WEB_THREADS = int(os.environ.get('GUNICORN_THREADS', 8))
+    
+    # LLM dispatch: calls run on a bounded pool so they cannot pin every web worker.
+    # A chat request's thread waits for its LLM call, so running plus queued calls
+    # must stay below WEB_THREADS to leave threads for catalog and order requests;
+    # chat beyond that gets a 503
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', max(1, WEB_THREADS // 2)))
+    LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', WEB_THREADS // 4))
+    LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 30))
+    
+    # LLM provider: 'gemini', or 'local' for a deterministic offline stand-in
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'gemini')
+    LLM_LOCAL_DELAY = float(os.environ.get('LLM_LOCAL_DELAY', 0))
+    # Failed calls are retried with jittered backoff; after LLM_CIRCUIT_FAILURES
+    # failures in a row chat falls back to rule-based answers for LLM_CIRCUIT_RESET seconds
+    LLM_RETRIES = int(os.environ.get('LLM_RETRIES', 1))
+    LLM_RETRY_BACKOFF = float(os.environ.get('LLM_RETRY_BACKOFF', 0.2))
+    LLM_CIRCUIT_FAILURES = int(os.environ.get('LLM_CIRCUIT_FAILURES', 5))
+    LLM_CIRCUIT_RESET = float(os.environ.get('LLM_CIRCUIT_RESET', 30))
+    # Concurrent requests with the same prompt and catalog version share one LLM call
+    LLM_COALESCE = os.environ.get('LLM_COALESCE', 'true').lower() == 'true'
+    
+    # Cache of Gemini answers, exact (normalized) questions only by default; a
+    # similarity above 0 also reuses answers to questions with the same content
+    # words in other wording
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+    RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+    RESPONSE_CACHE_SIMILARITY = float(os.environ.get('RESPONSE_CACHE_SIMILARITY', 0))
+    
+    # Cache of product detail and category responses: 'memory' (per process) or
+    # 'redis' (shared by all workers, needs the redis package and CATALOG_CACHE_URL)
+    CATALOG_CACHE_BACKEND = os.environ.get('CATALOG_CACHE_BACKEND', 'memory')
+    CATALOG_CACHE_URL = os.environ.get('CATALOG_CACHE_URL')
+    CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 2048))
+    CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', 300))
+    
+    # Product listing totals reused for the same filters for this many seconds
+    LISTING_COUNT_CACHE_SIZE = int(os.environ.get('LISTING_COUNT_CACHE_SIZE', 1024))
+    LISTING_COUNT_CACHE_TTL = float(os.environ.get('LISTING_COUNT_CACHE_TTL', 30))
+    
+    # Co-occurrence recommender: model file written by `python run.py build-recommender`,
+    # refreshed with newer orders and chat messages every RECOMMENDER_REFRESH_INTERVAL seconds
+    # (default: recommender.npz in the instance folder)
+    RECOMMENDER_MODEL_PATH = os.environ.get('RECOMMENDER_MODEL_PATH')
+    RECOMMENDER_REFRESH_INTERVAL = float(os.environ.get('RECOMMENDER_REFRESH_INTERVAL', 300))
+    RECOMMENDER_POPULAR_SIZE = int(os.environ.get('RECOMMENDER_POPULAR_SIZE', 100))
+    
+    # Password hashing: bcrypt cost and the bounded pool hashes run on
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Login attempts allowed per client IP, and failed attempts per account, per window (seconds)
+    LOGIN_IP_LIMIT = int(os.environ.get('LOGIN_IP_LIMIT', 20))
+    LOGIN_IP_WINDOW = float(os.environ.get('LOGIN_IP_WINDOW', 60))
+    LOGIN_ACCOUNT_LIMIT = int(os.environ.get('LOGIN_ACCOUNT_LIMIT', 5))
+    LOGIN_ACCOUNT_WINDOW = float(os.environ.get('LOGIN_ACCOUNT_WINDOW', 300))
+    # Reverse proxies in front of the app (nginx, a load balancer); their
+    # X-Forwarded-For gives the client IP that login limits are counted by.
+    # Leave at 0 when clients connect directly, or they could forge the header
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    
+    # User profiles cached by id; last_login times written in batches this often (seconds)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 300))
+    LAST_LOGIN_FLUSH_INTERVAL = float(os.environ.get('LAST_LOGIN_FLUSH_INTERVAL', 5))
+    
+    # Chat message persistence: 'sync' (committed by each request) or 'write_behind'
+    # (queued and inserted in batches by a background thread; a killed process
+    # loses up to CHAT_WRITE_BEHIND_INTERVAL seconds of messages)
+    CHAT_PERSISTENCE = os.environ.get('CHAT_PERSISTENCE', 'sync')
+    CHAT_WRITE_BEHIND_INTERVAL = float(os.environ.get('CHAT_WRITE_BEHIND_INTERVAL', 0.5))
+    CHAT_WRITE_BEHIND_BATCH = int(os.environ.get('CHAT_WRITE_BEHIND_BATCH', 500))
+    CHAT_WRITE_BEHIND_MAX_PENDING = int(os.environ.get('CHAT_WRITE_BEHIND_MAX_PENDING', 10000))
+    
+    # Shared secret for GET /api/metrics (X-Metrics-Token header); when unset,
+    # metrics are only served in debug mode
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Largest number of orders accepted by POST /api/orders/batch
+    ORDER_BATCH_MAX_ORDERS = int(os.environ.get('ORDER_BATCH_MAX_ORDERS', 100))
     
 class DevelopmentConfig(Config):
     DEBUG = True
+    QUERY_COUNT_HEADER = True
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
     
 class ProductionConfig(Config):
     DEBUG = False
+    # Database servers and proxies close idle connections; check before use
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
     
 class TestingConfig(Config):
     TESTING = True
+    QUERY_COUNT_HEADER = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    BCRYPT_ROUNDS = 4
     
 config = {
     'development': DevelopmentConfig,
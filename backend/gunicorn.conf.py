@@ -0,0 +1,64 @@
+"""
+gunicorn settings for `gunicorn wsgi:app`, overridable through the environment.
+
+Worker model: a few processes with several threads each (gthread). Chat
+requests spend most of their time waiting on the LLM and catalog requests
+are short, so threads keep requests moving while a process is blocked on
+I/O. Each process holds its own copy of the in-process caches and indexes,
+so fewer, wider processes use less memory than many single-threaded ones.
+
+Graceful reload:
+    kill -HUP <master pid>     re-read this file and replace every worker,
+                               letting in-flight requests finish
+    kill -USR2 <master pid>    start a new master with new code, then
+    kill -QUIT <old pid>       stop the old one once the new one is up
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+# Chat requests hold their thread while the LLM answers. The app reads the
+# same GUNICORN_THREADS (as WEB_THREADS) and by default allows half of them
+# to run LLM calls and a quarter to queue for one, so a quarter always stays
+# free for catalog and order requests; set LLM_MAX_CONCURRENCY and
+# LLM_MAX_QUEUE together with this and keep their sum below it
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Seconds an idle keep-alive connection is held open (behind a load balancer,
+# make this longer than the balancer's own idle timeout)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Long enough for a streamed LLM answer; LLM_TIMEOUT bounds each call
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then to bound memory growth (0 disables)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Build the app and its catalog indexes once, before forking, so workers
+# share those pages copy-on-write and start warm
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Empty GUNICORN_ACCESS_LOG turns the access log off
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Start each worker with its own database connections
+    from wsgi import app
+    from app import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # Write what write-behind persistence still holds before the process goes
+    from wsgi import app, flush_writes
+
+    flush_writes(app)
@@ -0,0 +1,37 @@
+"""Full-text GIN index on products (PostgreSQL only)
+
+Revision ID: 3f1c2b7d9a64
+Revises: 606a0a13bf93
+Create Date: 2026-10-16 23:40:12.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2b7d9a64'
+down_revision = '606a0a13bf93'
+branch_labels = None
+depends_on = None
+
+
+# Must stay the same expression as POSTGRES_DOCUMENT in app/services/fulltext.py
+DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(products.name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(products.brand, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(products.description, '')), 'C')"
+)
+
+
+def upgrade():
+    # SQLite full-text search uses an FTS5 table set up by the app instead
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_products_fulltext ON products USING GIN (({DOCUMENT}))")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_products_fulltext")
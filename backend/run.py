@@ -1,6 +1,7 @@
 import os
 import sys
 from flask import Flask
+from flask_migrate import stamp
 from app import create_app, db
 
 def init_database():
@@ -11,19 +12,70 @@ def init_database():
     
     # Create all tables
     db.create_all()
+    if db.engine.dialect.name == 'postgresql':
+        from app.services.fulltext import fulltext_search
+        fulltext_search.install()
     print("Database tables created.")
     
+    # The tables match the latest migration, so later upgrades start from here
+    stamp()
+    
     # Create sample data
     create_sample_data()
     print("Sample data created successfully!")
 
+def build_embeddings():
+    """Embed all active products into the semantic retrieval index"""
+    from app.services.embedding_index import product_embeddings
+    
+    if not product_embeddings.enabled:
+        print("numpy and scipy are required to build the embedding index.")
+        sys.exit(1)
+    
+    index = product_embeddings.build()
+    print(f"Embedded {len(index)} products into {index.encoder.dimensions} dimensions.")
+    print(f"Saved to {product_embeddings.save(index)}")
+
+def build_recommender():
+    """Count all orders and chat sessions into the recommender model file"""
+    from app.services.recommender import recommender
+    
+    if not recommender.enabled:
+        print("numpy and scipy are required to build the recommender.")
+        sys.exit(1)
+    
+    model = recommender.build()
+    print(f"Recommender built: {len(model)} products, {model.counts.nnz // 2} product pairs.")
+    print(f"Saved to {recommender.save()}")
+
+def serve():
+    """Replace this process with gunicorn serving wsgi:app (settings in gunicorn.conf.py)"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(backend_dir)
+    os.execv(sys.executable, [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'] + sys.argv[2:])
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve()
+    
     app = create_app(os.getenv('FLASK_ENV', 'development'))
     
     if len(sys.argv) > 1 and sys.argv[1] == 'init-db':
         with app.app_context():
             init_database()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'build-embeddings':
+        with app.app_context():
+            build_embeddings()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'build-recommender':
+        with app.app_context():
+            build_recommender()
     else:
+        with app.app_context():
+            from app.services.search_index import product_index
+            from app.services.fulltext import fulltext_search
+            if not fulltext_search.available:
+                product_index.build()
+        
         print("Starting Flask development server...")
         print("API will be available at: http://localhost:5000")
         print("API documentation at: http://localhost:5000/api/health")
@@ -0,0 +1,52 @@
+"""
+Production WSGI entry point.
+
+Serve with gunicorn from the backend directory, which picks up
+gunicorn.conf.py:
+
+    gunicorn wsgi:app
+
+or `python run.py serve`. With preload (the default) the app and its catalog
+indexes are built once in the master process before the workers are forked.
+"""
+
+import os
+from app import create_app, db
+
+
+def warm_up(app):
+    """Build the lazily built catalog structures now instead of on the first requests"""
+    from app.services.search_index import product_index
+    from app.services.fulltext import fulltext_search
+    from app.services.facet_index import product_facets
+    from app.services.catalog_summary import catalog_summary
+    from app.services.embedding_index import product_embeddings
+    from app.services.recommender import recommender
+
+    with app.app_context():
+        if not fulltext_search.available:
+            product_index.build()
+        product_facets.index
+        catalog_summary.get()
+        if product_embeddings.enabled:
+            product_embeddings.index
+        recommender.model()
+        # Connections opened here must not be shared with forked workers
+        db.session.remove()
+        db.engine.dispose()
+
+
+def flush_writes(app):
+    """Write everything queued by write-behind persistence (chat messages, logins)"""
+    from app.services.chat_writer import chat_writer
+    from app.services.user_cache import user_cache
+
+    with app.app_context():
+        chat_writer.flush()
+        user_cache.flush_logins()
+
+
+app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+if os.getenv('WSGI_WARM_UP', 'true').lower() == 'true':
+    warm_up(app)
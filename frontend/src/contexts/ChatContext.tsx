@@ -17,6 +17,8 @@ type ChatAction =
   | { type: 'SET_TYPING'; payload: boolean }
   | { type: 'SET_ERROR'; payload: string | null }
   | { type: 'ADD_MESSAGE'; payload: ChatMessage }
+  | { type: 'APPEND_MESSAGE_CONTENT'; payload: { id: number; content: string } }
+  | { type: 'REPLACE_MESSAGE'; payload: { id: number; message: ChatMessage } }
   | { type: 'SET_MESSAGES'; payload: ChatMessage[] }
   | { type: 'SET_SESSION'; payload: { session: ChatSession | null; token: string | null } }
   | { type: 'SET_SUGGESTED_PRODUCTS'; payload: Product[] }
@@ -51,6 +53,20 @@ function chatReducer(state: ChatState, action: ChatAction): ChatState {
       return { ...state, error: action.payload };
     case 'ADD_MESSAGE':
       return { ...state, messages: [...state.messages, action.payload] };
+    case 'APPEND_MESSAGE_CONTENT':
+      return {
+        ...state,
+        messages: state.messages.map((msg) =>
+          msg.id === action.payload.id ? { ...msg, content: msg.content + action.payload.content } : msg
+        ),
+      };
+    case 'REPLACE_MESSAGE':
+      return {
+        ...state,
+        messages: state.messages.map((msg) =>
+          msg.id === action.payload.id ? action.payload.message : msg
+        ),
+      };
     case 'SET_MESSAGES':
       return { ...state, messages: action.payload };
     case 'SET_SESSION':
@@ -93,8 +109,28 @@ export function ChatProvider({ children }: { children: ReactNode }) {
       // Show typing indicator
       dispatch({ type: 'SET_TYPING', payload: true });
 
-      // Send message to API
-      const response = await chatAPI.sendMessage(message, state.sessionToken || undefined);
+      // Stream the bot response, rendering chunks as they arrive
+      const streamingId = Date.now() + 1; // Temporary ID until the stream completes
+      let streamStarted = false;
+
+      const response = await chatAPI.streamMessage(message, state.sessionToken || undefined, (content) => {
+        if (!streamStarted) {
+          streamStarted = true;
+          dispatch({ type: 'SET_TYPING', payload: false });
+          dispatch({
+            type: 'ADD_MESSAGE',
+            payload: {
+              id: streamingId,
+              session_id: 0,
+              message_type: 'bot',
+              content,
+              timestamp: new Date().toISOString(),
+            },
+          });
+        } else {
+          dispatch({ type: 'APPEND_MESSAGE_CONTENT', payload: { id: streamingId, content } });
+        }
+      });
 
       // Update session token if new
       if (response.session_token !== state.sessionToken) {
@@ -104,8 +140,12 @@ export function ChatProvider({ children }: { children: ReactNode }) {
         });
       }
 
-      // Add bot response
-      dispatch({ type: 'ADD_MESSAGE', payload: response.bot_response });
+      // Replace the streamed draft with the saved bot response
+      if (streamStarted) {
+        dispatch({ type: 'REPLACE_MESSAGE', payload: { id: streamingId, message: response.bot_response } });
+      } else {
+        dispatch({ type: 'ADD_MESSAGE', payload: response.bot_response });
+      }
 
       // Extract and set suggested products from metadata
       const metadata: MessageMetadata = response.bot_response.metadata || {};
@@ -157,9 +157,9 @@ const Chat: React.FC = () => {
           </div>
         )}
 
-        {messages.map((message) => (
+        {messages.map((message, index) => (
           <ChatMessageComponent
-            key={message.id}
+            key={message.id ?? `pending-${index}`}
             message={message}
             onAddToCart={handleAddToCart}
           />
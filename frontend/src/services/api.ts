@@ -118,6 +118,91 @@ export const chatAPI = {
     return response.data;
   },
 
+  streamMessage: async (
+    message: string,
+    sessionToken: string | undefined,
+    onChunk: (content: string) => void
+  ): Promise<ChatResponse> => {
+    const data: any = { message };
+    if (sessionToken) {
+      data.session_token = sessionToken;
+    }
+
+    // axios cannot read a response body incrementally in the browser, so use fetch
+    const token = localStorage.getItem('token');
+    const response = await fetch(`${API_BASE_URL}/chat/message/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify(data),
+    });
+
+    if (!response.ok || !response.body) {
+      if (response.status === 401) {
+        localStorage.removeItem('token');
+        localStorage.removeItem('user');
+        window.location.href = '/login';
+      }
+      const body = await response.json().catch(() => ({}));
+      throw { response: { status: response.status, data: body } };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const result: Partial<ChatResponse> = {};
+    let buffer = '';
+
+    const handleEvent = (raw: string) => {
+      let event = 'message';
+      let payload = '';
+      raw.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          payload += line.slice(5).trim();
+        }
+      });
+      if (!payload) return;
+
+      const eventData = JSON.parse(payload);
+      switch (event) {
+        case 'session':
+          result.session_token = eventData.session_token;
+          result.user_message = eventData.user_message;
+          break;
+        case 'chunk':
+          onChunk(eventData.content);
+          break;
+        case 'done':
+          result.session_token = eventData.session_token;
+          result.bot_response = eventData.bot_response;
+          break;
+        case 'error':
+          throw { response: { data: eventData } };
+      }
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        handleEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+
+    if (!result.bot_response) {
+      throw new Error('Chat stream ended before the response was complete');
+    }
+    return result as ChatResponse;
+  },
+
   getChatHistory: async (sessionToken: string): Promise<{ session: ChatSession; messages: ChatMessage[] }> => {
     const response = await api.get(`/chat/history?session_token=${sessionToken}`);
     return response.data;